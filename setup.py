@@ -26,10 +26,14 @@ setup(name='pipelinewise-tap-mysql',
           'tzlocal==2.1',
       ],
       extras_require={
+          'parquet': [
+              'pyarrow>=8.0.0'
+          ],
           'test': [
               'nose==1.3.*',
               'pylint==2.13.2',
-              'nose-cov==1.6'
+              'nose-cov==1.6',
+              'pyarrow>=8.0.0'
           ]
       },
       entry_points='''
@@ -1,15 +1,22 @@
-# pylint: disable=missing-docstring,too-many-locals
-import copy
+# pylint: disable=missing-docstring,too-many-locals,too-many-arguments
 import pymysql
 import singer
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
-from singer import metadata, get_logger
+from singer import get_logger
 from singer import metrics
 from singer.catalog import Catalog
 
-from tap_mysql.connection import connect_with_backoff, MySQLConnection, fetch_server_id, MYSQL_ENGINE
-from tap_mysql.discover_utils import discover_catalog, resolve_catalog
+from tap_mysql.connection import borrow_connection, clone_connection, MySQLConnection, fetch_server_id, \
+    MYSQL_ENGINE
+from tap_mysql import preflight, scheduler
+from tap_mysql.catalog_index import CatalogIndex, compile_catalog, get_stream_index
+from tap_mysql.discover_utils import discover_catalog, dump_catalog_entries, iter_catalog_entries, resolve_catalog
+from tap_mysql.discovery_cache import DiscoveryCache
+from tap_mysql.snapshot import ConsistentSnapshot
 from tap_mysql.stream_utils import write_schema_message
 from tap_mysql.sync_strategies import binlog
 from tap_mysql.sync_strategies import common
@@ -27,37 +34,44 @@ REQUIRED_CONFIG_KEYS = [
 
 
 def do_discover(mysql_conn, config):
-    discover_catalog(mysql_conn, config.get('filter_dbs')).dump()
+    cache = DiscoveryCache.from_config(config)
+    catalog_entries = iter_catalog_entries(mysql_conn, config.get('filter_dbs'), cache=cache)
 
+    if cache is not None:
+        catalog_entries = report_changed_entries(cache, catalog_entries, config.get('discover_changed_only'))
 
-def log_engine(mysql_conn, catalog_entry):
+    dump_catalog_entries(catalog_entries)
+
+    if cache is not None:
+        cache.save()
+
+
+def report_changed_entries(cache, catalog_entries, changed_only):
+    for catalog_entry in catalog_entries:
+        if not changed_only or cache.is_changed(catalog_entry):
+            cache.mark_reported([catalog_entry])
+
+            yield catalog_entry
+
+
+def log_engine(catalog_entry):
     is_view = common.get_is_view(catalog_entry)
     database_name = common.get_database_name(catalog_entry)
 
     if is_view:
         LOGGER.info("Beginning sync for view %s.%s", database_name, catalog_entry.table)
     else:
-        with connect_with_backoff(mysql_conn) as open_conn:
-            with open_conn.cursor() as cur:
-                cur.execute("""
-                    SELECT engine
-                      FROM information_schema.tables
-                     WHERE table_schema = %s
-                       AND table_name   = %s
-                """, (database_name, catalog_entry.table))
-
-                row = cur.fetchone()
+        table_metadata = preflight.get_table_metadata(catalog_entry)
 
-                if row:
-                    LOGGER.info("Beginning sync for %s table %s.%s",
-                                row[0],
-                                database_name,
-                                catalog_entry.table)
+        if table_metadata:
+            LOGGER.info("Beginning sync for %s table %s.%s",
+                        table_metadata.engine,
+                        database_name,
+                        catalog_entry.table)
 
 
 def is_valid_currently_syncing_stream(selected_stream, state):
-    stream_metadata = metadata.to_map(selected_stream.metadata)
-    replication_method = stream_metadata.get((), {}).get('replication-method')
+    replication_method = get_stream_index(selected_stream).replication_method
 
     if replication_method != 'LOG_BASED':
         return True
@@ -95,7 +109,17 @@ def binlog_stream_requires_historical(catalog_entry, state):
     return True
 
 
-def get_non_binlog_streams(mysql_conn, catalog, config, state):
+def discover_selected_tables(mysql_conn, catalog, config):
+    """
+    Discovers the tables of the streams selected in the catalog only, instead of every table of filter_dbs
+    """
+    return discover_catalog(mysql_conn,
+                            config.get('filter_dbs'),
+                            schema_tables=common.get_selected_tables(catalog),
+                            cache=DiscoveryCache.from_config(config))
+
+
+def get_non_binlog_streams(mysql_conn, catalog, config, state, discovered=None):
     """
     Returns the Catalog of data we're going to sync for all SELECT-based
     streams (i.e. INCREMENTAL, FULL_TABLE, and LOG_BASED that require a historical
@@ -111,12 +135,15 @@ def get_non_binlog_streams(mysql_conn, catalog, config, state):
     "selected" that currently exist in the database. Columns marked as "selected"
     and those labeled "automatic" (e.g. primary keys and replication keys) will be
     included. Streams will be prioritized in the following order:
-      1. currently_syncing if it is SELECT-based
+      1. currently_syncing, or every stream of currently_syncing_streams, if it is SELECT-based
       2. any streams that do not have state
       3. any streams that do not have a replication method of LOG_BASED
 
+    The CatalogIndex of the freshly discovered Catalog can be given as discovered, otherwise the selected
+    tables are discovered.
     """
-    discovered = discover_catalog(mysql_conn, config.get('filter_dbs'))
+    if discovered is None:
+        discovered = CatalogIndex(discover_selected_tables(mysql_conn, catalog, config))
 
     # Filter catalog to include only selected streams
     selected_streams = list(filter(common.stream_is_selected, catalog.streams))
@@ -124,8 +151,7 @@ def get_non_binlog_streams(mysql_conn, catalog, config, state):
     streams_without_state = []
 
     for stream in selected_streams:
-        stream_metadata = metadata.to_map(stream.metadata)
-        replication_method = stream_metadata.get((), {}).get('replication-method')
+        replication_method = get_stream_index(stream).replication_method
         stream_state = state.get('bookmarks', {}).get(stream.tap_stream_id)
 
         if not stream_state:
@@ -149,35 +175,43 @@ def get_non_binlog_streams(mysql_conn, catalog, config, state):
     # If the state says we were in the middle of processing a stream, skip
     # to that stream. Then process streams without prior state and finally
     # move onto streams with state (i.e. have been synced in the past)
-    currently_syncing = singer.get_currently_syncing(state)
+    # streams that were synced concurrently are all listed in currently_syncing_streams
+    currently_syncing = state.get('currently_syncing_streams') or []
+
+    if not currently_syncing and singer.get_currently_syncing(state):
+        currently_syncing = [singer.get_currently_syncing(state)]
 
     # prioritize streams that have not been processed
     ordered_streams = streams_without_state + streams_with_state
 
     if currently_syncing:
         currently_syncing_stream = list(filter(
-            lambda s: s.tap_stream_id == currently_syncing and is_valid_currently_syncing_stream(s, state),
+            lambda s: s.tap_stream_id in currently_syncing and is_valid_currently_syncing_stream(s, state),
             streams_with_state))
 
-        non_currently_syncing_streams = list(filter(lambda s: s.tap_stream_id != currently_syncing, ordered_streams))
+        non_currently_syncing_streams = list(filter(lambda s: s.tap_stream_id not in currently_syncing,
+                                                    ordered_streams))
 
         streams_to_sync = currently_syncing_stream + non_currently_syncing_streams
     else:
         # prioritize streams that have not been processed
         streams_to_sync = ordered_streams
 
+    if int(config.get('table_parallelism', 1)) > 1:
+        streams_to_sync = scheduler.order_longest_first(streams_to_sync, discovered, state, currently_syncing)
+
     return resolve_catalog(discovered, streams_to_sync)
 
 
-def get_binlog_streams(mysql_conn, catalog, config, state):
-    discovered = discover_catalog(mysql_conn, config.get('filter_dbs'))
+def get_binlog_streams(mysql_conn, catalog, config, state, discovered=None):
+    if discovered is None:
+        discovered = CatalogIndex(discover_selected_tables(mysql_conn, catalog, config))
 
     selected_streams = list(filter(common.stream_is_selected, catalog.streams))
     binlog_streams = []
 
     for stream in selected_streams:
-        stream_metadata = metadata.to_map(stream.metadata)
-        replication_method = stream_metadata.get((), {}).get('replication-method')
+        replication_method = get_stream_index(stream).replication_method
 
         if replication_method == 'LOG_BASED' and not binlog_stream_requires_historical(stream, state):
             binlog_streams.append(stream)
@@ -185,11 +219,10 @@ def get_binlog_streams(mysql_conn, catalog, config, state):
     return resolve_catalog(discovered, binlog_streams)
 
 
-def do_sync_incremental(mysql_conn, catalog_entry, state, columns):
+def do_sync_incremental(mysql_conn, catalog_entry, state, columns, config):
     LOGGER.info("Stream %s is using incremental replication", catalog_entry.stream)
 
-    md_map = metadata.to_map(catalog_entry.metadata)
-    replication_key = md_map.get((), {}).get('replication-key')
+    replication_key = get_stream_index(catalog_entry).replication_key
 
     if not replication_key:
         raise Exception(
@@ -198,13 +231,15 @@ def do_sync_incremental(mysql_conn, catalog_entry, state, columns):
     write_schema_message(catalog_entry=catalog_entry,
                          bookmark_properties=[replication_key])
 
-    incremental.sync_table(mysql_conn, catalog_entry, state, columns)
+    incremental.sync_table(mysql_conn, catalog_entry, state, columns, config)
+
+    common.write_state_message(state, [catalog_entry.tap_stream_id])
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
 
+def do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, config: Dict, snapshot=None):
+    use_gtid = config['use_gtid']
+    engine = config['engine']
 
-# pylint: disable=too-many-arguments
-def do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, use_gtid: bool, engine: str):
     binlog.verify_binlog_config(mysql_conn)
 
     if use_gtid and engine == MYSQL_ENGINE:
@@ -239,7 +274,7 @@ def do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, use_gti
 
     if max_pk_values and ((use_gtid and gtid) or (log_file and log_pos)):
         LOGGER.info("Resuming initial full table sync for LOG_BASED stream %s", catalog_entry.tap_stream_id)
-        full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version)
+        full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version, config, snapshot)
     else:
         LOGGER.info("Performing initial full table sync for LOG_BASED stream %s", catalog_entry.tap_stream_id)
 
@@ -248,20 +283,24 @@ def do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, use_gti
                                       'initial_binlog_complete',
                                       False)
 
-        current_log_file, current_log_pos = binlog.fetch_current_log_file_and_pos(mysql_conn)
+        if snapshot is not None:
+            # the table is read from the snapshot, consistent with its binlog coordinates
+            current_log_file, current_log_pos, current_gtid = snapshot.log_file, snapshot.log_pos, snapshot.gtid
+        else:
+            current_log_file, current_log_pos = binlog.fetch_current_log_file_and_pos(mysql_conn)
 
-        current_gtid = None
-        if use_gtid:
-            current_gtid = binlog.fetch_current_gtid_pos(mysql_conn, engine)
+            current_gtid = None
+            if use_gtid:
+                current_gtid = binlog.fetch_current_gtid_pos(mysql_conn, engine)
 
         state = singer.write_bookmark(state,
                                       catalog_entry.tap_stream_id,
                                       'version',
                                       stream_version)
 
-        if full_table.pks_are_auto_incrementing(mysql_conn, catalog_entry):
-            # We must save log_file, log_pos, gtid across FULL_TABLE syncs when using
-            # an incrementing PK
+        if full_table.is_resumable(catalog_entry, columns):
+            # We must save log_file, log_pos, gtid across FULL_TABLE syncs when the
+            # table is extracted in key order and can be resumed
             state = singer.write_bookmark(state,
                                           catalog_entry.tap_stream_id,
                                           'log_file',
@@ -278,10 +317,10 @@ def do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, use_gti
                                               'gtid',
                                               current_gtid)
 
-            full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version)
+            full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version, config, snapshot)
 
         else:
-            full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version)
+            full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version, config, snapshot)
             state = singer.write_bookmark(state,
                                           catalog_entry.tap_stream_id,
                                           'log_file',
@@ -299,14 +338,14 @@ def do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, use_gti
                                               current_gtid)
 
 
-def do_sync_full_table(mysql_conn, catalog_entry, state, columns):
+def do_sync_full_table(mysql_conn, catalog_entry, state, columns, config, snapshot=None):
     LOGGER.info("Stream %s is using full table replication", catalog_entry.stream)
 
     write_schema_message(catalog_entry)
 
     stream_version = common.get_stream_version(catalog_entry.tap_stream_id, state)
 
-    full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version)
+    full_table.sync_table(mysql_conn, catalog_entry, state, columns, stream_version, config, snapshot)
 
     # Prefer initial_full_table_complete going forward
     singer.clear_bookmark(state, catalog_entry.tap_stream_id, 'version')
@@ -316,45 +355,135 @@ def do_sync_full_table(mysql_conn, catalog_entry, state, columns):
                                   'initial_full_table_complete',
                                   True)
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
-
+    common.write_state_message(state, [catalog_entry.tap_stream_id])
 
-def sync_non_binlog_streams(mysql_conn, non_binlog_catalog, state, use_gtid, engine):
-    for catalog_entry in non_binlog_catalog.streams:
-        columns = list(catalog_entry.schema.properties.keys())
 
-        if not columns:
-            LOGGER.warning('There are no columns selected for stream %s, skipping it.', catalog_entry.stream)
-            continue
+def open_consistent_snapshot(mysql_conn, non_binlog_catalog, config):
+    """
+    Opens the consistent snapshot that FULL_TABLE and initial LOG_BASED syncs read from, if enabled and needed
+    """
+    if not config.get('consistent_snapshot'):
+        return None
 
-        state = singer.set_currently_syncing(state, catalog_entry.tap_stream_id)
+    if not any(get_stream_index(catalog_entry).replication_method in {'FULL_TABLE', 'LOG_BASED'}
+               for catalog_entry in non_binlog_catalog.streams):
+        return None
 
-        # Emit a state message to indicate that we've started this stream
-        singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    # every table worker may extract its table with full_table_parallelism connections
+    return ConsistentSnapshot(mysql_conn,
+                              max(int(config.get('table_parallelism', 1)), 1) *
+                              max(int(config.get('full_table_parallelism', 1)), 1),
+                              config.get('use_gtid', False),
+                              config.get('engine', MYSQL_ENGINE)).open()
 
-        md_map = metadata.to_map(catalog_entry.metadata)
 
-        replication_method = md_map.get((), {}).get('replication-method')
+def sync_non_binlog_streams(mysql_conn, non_binlog_catalog, config, state):
+    snapshot = open_consistent_snapshot(mysql_conn, non_binlog_catalog, config)
+    table_parallelism = int(config.get('table_parallelism', 1))
 
-        database_name = common.get_database_name(catalog_entry)
+    try:
+        if table_parallelism > 1:
+            sync_non_binlog_streams_concurrently(mysql_conn, non_binlog_catalog, config, state, snapshot)
+        else:
+            for catalog_entry in non_binlog_catalog.streams:
+                if not catalog_entry.schema.properties:
+                    LOGGER.warning('There are no columns selected for stream %s, skipping it.', catalog_entry.stream)
+                    continue
 
-        with metrics.job_timer('sync_table') as timer:
-            timer.tags['database'] = database_name
-            timer.tags['table'] = catalog_entry.table
+                state = singer.set_currently_syncing(state, catalog_entry.tap_stream_id)
+                # streams left in flight by an earlier concurrent sync are no longer the ones being synced
+                state.pop('currently_syncing_streams', None)
 
-            log_engine(mysql_conn, catalog_entry)
+                # Emit a state message to indicate that we've started this stream
+                common.write_state_message(state, [catalog_entry.tap_stream_id])
 
-            if replication_method == 'INCREMENTAL':
-                do_sync_incremental(mysql_conn, catalog_entry, state, columns)
-            elif replication_method == 'LOG_BASED':
-                do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, use_gtid, engine)
-            elif replication_method == 'FULL_TABLE':
-                do_sync_full_table(mysql_conn, catalog_entry, state, columns)
-            else:
-                raise Exception("only INCREMENTAL, LOG_BASED, and FULL TABLE replication methods are supported")
+                sync_non_binlog_stream(mysql_conn, catalog_entry, config, state, snapshot)
+    finally:
+        if snapshot is not None:
+            snapshot.close()
 
     state = singer.set_currently_syncing(state, None)
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    state.pop('currently_syncing_streams', None)
+    common.write_state_message(state)
+
+
+def sync_non_binlog_stream(mysql_conn, catalog_entry, config, state, snapshot=None):
+    columns = list(catalog_entry.schema.properties.keys())
+
+    replication_method = get_stream_index(catalog_entry).replication_method
+
+    database_name = common.get_database_name(catalog_entry)
+
+    with metrics.job_timer('sync_table') as timer:
+        timer.tags['database'] = database_name
+        timer.tags['table'] = catalog_entry.table
+
+        log_engine(catalog_entry)
+
+        if replication_method == 'INCREMENTAL':
+            do_sync_incremental(mysql_conn, catalog_entry, state, columns, config)
+        elif replication_method == 'LOG_BASED':
+            do_sync_historical_binlog(mysql_conn, catalog_entry, state, columns, config, snapshot)
+        elif replication_method == 'FULL_TABLE':
+            do_sync_full_table(mysql_conn, catalog_entry, state, columns, config, snapshot)
+        else:
+            raise Exception("only INCREMENTAL, LOG_BASED, and FULL TABLE replication methods are supported")
+
+
+def sync_non_binlog_streams_concurrently(mysql_conn, non_binlog_catalog, config, state, snapshot=None):
+    """
+    Syncs up to table_parallelism streams at the same time, each worker using its own connection.
+
+    Every stream is synced with its own StreamState, whose STATE messages are merged into the state of the
+    run by a single ConcurrentStateWriter. Streams still in flight when the sync fails are listed in the
+    currently_syncing_streams key of the state, and are resumed first by the next sync.
+    """
+    table_parallelism = int(config.get('table_parallelism', 1))
+    state_writer = common.ConcurrentStateWriter(state)
+    failed = threading.Event()
+
+    def sync_stream(catalog_entry):
+        if failed.is_set():
+            return
+
+        stream_state = state_writer.start_stream(catalog_entry.tap_stream_id)
+        start_time = time.monotonic()
+
+        try:
+            sync_non_binlog_stream(clone_connection(mysql_conn), catalog_entry, config, stream_state, snapshot)
+        except Exception:
+            failed.set()
+            state_writer.merge(stream_state)
+            raise
+
+        # used to schedule the longest streams first in the next runs
+        scheduler.record_sync_stats(stream_state, catalog_entry, time.monotonic() - start_time)
+        state_writer.finish_stream(stream_state)
+
+    streams = []
+
+    for catalog_entry in non_binlog_catalog.streams:
+        if not catalog_entry.schema.properties:
+            LOGGER.warning('There are no columns selected for stream %s, skipping it.', catalog_entry.stream)
+        else:
+            streams.append(catalog_entry)
+
+    LOGGER.info('Syncing %s streams using %s workers', len(streams), table_parallelism)
+
+    with ThreadPoolExecutor(max_workers=table_parallelism) as executor:
+        futures = [executor.submit(sync_stream, catalog_entry) for catalog_entry in streams]
+
+        try:
+            for future in futures:
+                future.result()
+        except Exception:
+            # streams not started yet are skipped, the ones in flight stay listed in the state for the next run
+            for future in futures:
+                future.cancel()
+
+            raise
+
+    state_writer.close()
 
 
 def sync_binlog_streams(mysql_conn, binlog_catalog, config, state):
@@ -373,20 +502,22 @@ def do_sync(mysql_conn, config, catalog, state):
     config['use_gtid'] = config.get('use_gtid', False)
     config['engine'] = config.get('engine', MYSQL_ENGINE).lower()
 
-    non_binlog_catalog = get_non_binlog_streams(mysql_conn, catalog, config, state)
-    binlog_catalog = get_binlog_streams(mysql_conn, catalog, config, state)
+    preflight.run_preflight(mysql_conn, catalog)
 
-    sync_non_binlog_streams(mysql_conn,
-                            non_binlog_catalog,
-                            state,
-                            config['use_gtid'],
-                            config['engine']
-                            )
+    compile_catalog(catalog)
+
+    # the selected tables are discovered once for both the SELECT based and the binlog streams
+    discovered = CatalogIndex(discover_selected_tables(mysql_conn, catalog, config))
+
+    non_binlog_catalog = get_non_binlog_streams(mysql_conn, catalog, config, state, discovered)
+    binlog_catalog = get_binlog_streams(mysql_conn, catalog, config, state, discovered)
+
+    sync_non_binlog_streams(mysql_conn, non_binlog_catalog, config, state)
     sync_binlog_streams(mysql_conn, binlog_catalog, config, state)
 
 
 def log_server_params(mysql_conn):
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         try:
             with open_conn.cursor() as cur:
                 cur.execute('''
@@ -420,19 +551,23 @@ def main_impl():
     args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
 
     mysql_conn = MySQLConnection(args.config)
-    log_server_params(mysql_conn)
-
-    if args.discover:
-        do_discover(mysql_conn, args.config)
-    elif args.catalog:
-        state = args.state or {}
-        do_sync(mysql_conn, args.config, args.catalog, state)
-    elif args.properties:
-        catalog = Catalog.from_dict(args.properties)
-        state = args.state or {}
-        do_sync(mysql_conn, args.config, catalog, state)
-    else:
-        raise ValueError("Hmm I don't know what to do! Neither discovery nor sync mode was selected.")
+
+    try:
+        log_server_params(mysql_conn)
+
+        if args.discover:
+            do_discover(mysql_conn, args.config)
+        elif args.catalog:
+            state = args.state or {}
+            do_sync(mysql_conn, args.config, args.catalog, state)
+        elif args.properties:
+            catalog = Catalog.from_dict(args.properties)
+            state = args.state or {}
+            do_sync(mysql_conn, args.config, catalog, state)
+        else:
+            raise ValueError("Hmm I don't know what to do! Neither discovery nor sync mode was selected.")
+    finally:
+        mysql_conn.pool.close()
 
 
 def main():
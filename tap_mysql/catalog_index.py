@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+Catalog metadata compiled once per run
+
+Reading a value of the metadata of a stream with singer.metadata.to_map converts its whole metadata list, and
+Catalog.get_stream scans every stream, which makes resolving a catalog of thousands of streams quadratic.
+The metadata of every stream is compiled instead into a StreamIndex, and streams are indexed by tap_stream_id.
+"""
+from typing import Dict, Optional
+
+import singer
+
+from singer import metadata
+
+# StreamIndexes of the catalog of the run compiled by compile_catalog, keyed by tap_stream_id. They are only
+# returned for the metadata list they were compiled from, which resolved catalog entries share with the entries
+# they were resolved from.
+_STREAM_INDEXES: Dict[str, 'StreamIndex'] = {}
+
+
+class StreamIndex:
+    """
+    Metadata of a stream read once from its metadata list
+    """
+    __slots__ = ('metadata', 'md_map', 'stream_metadata', 'database_name', 'replication_method', 'key_properties')
+
+    def __init__(self, catalog_entry):
+        self.metadata = catalog_entry.metadata
+        self.md_map = metadata.to_map(catalog_entry.metadata)
+        self.stream_metadata = self.md_map.get((), {})
+
+        self.database_name = self.stream_metadata.get('database-name')
+        self.replication_method = self.stream_metadata.get('replication-method')
+
+        if self.is_view:
+            self.key_properties = self.stream_metadata.get('view-key-properties', [])
+        else:
+            self.key_properties = self.stream_metadata.get('table-key-properties', [])
+
+    @property
+    def is_view(self):
+        return self.stream_metadata.get('is-view')
+
+    @property
+    def selected(self):
+        return self.stream_metadata.get('selected')
+
+    @property
+    def replication_key(self):
+        return self.stream_metadata.get('replication-key')
+
+    def is_property_selected(self, property_name) -> bool:
+        property_metadata = self.md_map.get(('properties', property_name), {})
+
+        return singer.should_sync_field(property_metadata.get('inclusion'), property_metadata.get('selected'), True)
+
+
+class CatalogIndex:
+    """
+    Streams of a catalog indexed by tap_stream_id, with their compiled metadata
+    """
+    __slots__ = ('catalog_entries', 'stream_indexes')
+
+    def __init__(self, catalog):
+        self.catalog_entries = {}
+        self.stream_indexes = {}
+
+        for catalog_entry in catalog.streams:
+            stream_index = StreamIndex(catalog_entry)
+
+            self.catalog_entries[catalog_entry.tap_stream_id] = catalog_entry
+            self.stream_indexes[catalog_entry.tap_stream_id] = stream_index
+
+    def get_stream(self, tap_stream_id):
+        """
+        Returns the catalog entry of the stream, None if it is not in the catalog, like Catalog.get_stream
+        """
+        return self.catalog_entries.get(tap_stream_id)
+
+    def get_stream_index(self, tap_stream_id) -> Optional[StreamIndex]:
+        return self.stream_indexes.get(tap_stream_id)
+
+
+def compile_catalog(catalog) -> CatalogIndex:
+    """
+    Indexes the catalog and registers the compiled metadata of its streams, which get_stream_index then returns
+    for them and for the entries resolved from them without reading their metadata list again. The streams of
+    the catalog compiled before are forgotten.
+
+    The metadata of the catalog must not be modified afterwards, unless it is compiled again.
+    """
+    catalog_index = CatalogIndex(catalog)
+
+    _STREAM_INDEXES.clear()
+    _STREAM_INDEXES.update(catalog_index.stream_indexes)
+
+    return catalog_index
+
+
+def compile_stream(catalog_entry) -> StreamIndex:
+    """
+    Registers the compiled metadata of a catalog entry replacing the one of its stream, e.g. once the stream is
+    discovered again
+    """
+    stream_index = _STREAM_INDEXES[catalog_entry.tap_stream_id] = StreamIndex(catalog_entry)
+
+    return stream_index
+
+
+def get_stream_index(catalog_entry) -> StreamIndex:
+    """
+    Returns the compiled metadata of the stream, compiling it if its catalog wasn't indexed
+    """
+    stream_index = _STREAM_INDEXES.get(catalog_entry.tap_stream_id)
+
+    if stream_index is not None and stream_index.metadata is catalog_entry.metadata:
+        return stream_index
+
+    return StreamIndex(catalog_entry)
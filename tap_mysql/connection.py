@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 # pylint: disable=missing-docstring,arguments-differ,missing-function-docstring
 
+import contextlib
+import threading
+import time
 import backoff
 import pymysql
 import ssl
@@ -22,6 +25,9 @@ DEFAULT_SESSION_SQLS = ['SET @@session.time_zone="+0:00"',
                         'SET @@session.net_read_timeout=3600',
                         'SET @@session.innodb_lock_wait_timeout=3600']
 
+# Pooled connections idle for longer than this are pinged before being handed out again
+POOL_HEALTH_CHECK_SECONDS = 30
+
 
 @backoff.on_exception(backoff.expo,
                       (pymysql.err.OperationalError),
@@ -68,7 +74,10 @@ def parse_internal_hostname(hostname):
 
 
 class MySQLConnection(pymysql.connections.Connection):
-    def __init__(self, config):
+    # Pool of the open sessions sharing the settings of this connection, see ConnectionPool
+    pool = None
+
+    def __init__(self, config, pool=None):
         # Google Cloud's SSL involves a self-signed certificate. This certificate's
         # hostname matches the form {instance}:{box}. The hostname displayed in the
         # Google Cloud UI is of the form {instance}:{region}:{box} which
@@ -142,6 +151,10 @@ class MySQLConnection(pymysql.connections.Connection):
 
         self.session_sqls = config.get("session_sqls", DEFAULT_SESSION_SQLS)
 
+        # Keep the config around so that workers can open their own connections with the same settings
+        self.config = config
+        self.pool = pool if pool is not None else ConnectionPool(config)
+
     def __enter__(self):
         return self
 
@@ -153,14 +166,177 @@ class MySQLConnection(pymysql.connections.Connection):
 def make_connection_wrapper(config):
     class ConnectionWrapper(MySQLConnection):
         def __init__(self, *args, **kwargs):  # pylint: disable=unused-argument
-            config["cursorclass"] = kwargs.get('cursorclass')
-            super().__init__(config)
+            # the replication stream picks its own cursor class, which must not leak into the shared config
+            super().__init__(dict(config, cursorclass=kwargs.get('cursorclass')))
 
             connect_with_backoff(self)
 
     return ConnectionWrapper
 
 
+def clone_connection(mysql_conn: MySQLConnection) -> MySQLConnection:
+    """
+    Creates a new connection using the same config as the given one
+    Args:
+        mysql_conn: Mysql connection instance to clone
+
+    Returns: new, not yet opened, Mysql connection instance
+    """
+    return MySQLConnection(mysql_conn.config, mysql_conn.pool)
+
+
+class TLSSessionReuseContext:
+    """
+    SSL context shared by the connections of a pool that resumes the TLS session of the previous handshake,
+    sparing new connections the full handshake and certificate verification
+    """
+
+    def __init__(self, ctx: ssl.SSLContext):
+        self.ctx = ctx
+        self.session = None
+
+    def wrap_socket(self, sock, **kwargs):
+        ssl_sock = self.ctx.wrap_socket(sock, session=self.session, **kwargs)
+        self.save_session(ssl_sock)
+
+        return ssl_sock
+
+    def save_session(self, ssl_sock):
+        session = getattr(ssl_sock, 'session', None)
+
+        if session is not None:
+            self.session = session
+
+    def __getattr__(self, name):
+        return getattr(self.ctx, name)
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of open sessions, all created with the same config.
+
+    Helpers borrow a session for every query instead of opening a new connection and running the session SQLs
+    each time. Sessions idle for longer than POOL_HEALTH_CHECK_SECONDS are pinged before being handed out again
+    and replaced if the server closed them, and the TLS session is resumed by the connections the pool opens.
+    """
+
+    def __init__(self, config):
+        # helpers stream the rows of their queries, whatever cursor class the connection the pool came from uses
+        self.config = dict(config, cursorclass=pymysql.cursors.SSCursor)
+        self.ssl_context = None
+
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def new_connection(self) -> MySQLConnection:
+        connection = MySQLConnection(self.config, self)
+
+        if connection.ssl:
+            with self._lock:
+                if self.ssl_context is None:
+                    self.ssl_context = TLSSessionReuseContext(connection.ctx)
+
+            connection.ctx = self.ssl_context
+
+        return connect_with_backoff(connection)
+
+    @staticmethod
+    def is_healthy(connection, idle_since: float) -> bool:
+        if not connection.open:
+            return False
+
+        if time.monotonic() - idle_since < POOL_HEALTH_CHECK_SECONDS:
+            return True
+
+        try:
+            connection.ping(reconnect=False)
+        except pymysql.err.Error:
+            return False
+
+        return True
+
+    def acquire(self) -> MySQLConnection:
+        """
+        Returns the most recently released healthy session, or a new one if there is none
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+
+                connection, idle_since = self._idle.pop()
+
+            if self.is_healthy(connection, idle_since):
+                return connection
+
+            LOGGER.debug('Discarding pooled connection closed by the server')
+            self.discard(connection)
+
+        return self.new_connection()
+
+    def release(self, connection: MySQLConnection):
+        """
+        Returns a session to the pool, ending its transaction so that the next borrower reads fresh data
+        """
+        if not connection.open:
+            # closed by the borrower, e.g. to abandon an unbuffered read without fetching the rest of it
+            return
+
+        try:
+            connection.rollback()
+        except pymysql.err.Error:
+            self.discard(connection)
+            return
+
+        if self.ssl_context is not None:
+            # TLS 1.3 servers only send the session ticket once the handshake is over
+            self.ssl_context.save_session(connection._sock)  # pylint: disable=protected-access
+
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    @staticmethod
+    def discard(connection: MySQLConnection):
+        try:
+            connection.close()
+        except pymysql.err.Error:
+            pass
+
+    @contextlib.contextmanager
+    def borrow(self):
+        """
+        Borrows an open session for the duration of the with block. The session is closed instead of
+        being returned to the pool if the block raises, as it may be left in any state.
+        """
+        connection = self.acquire()
+
+        try:
+            yield connection
+        except BaseException:
+            self.discard(connection)
+            raise
+
+        self.release(connection)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection, _ in idle:
+            self.discard(connection)
+
+
+def borrow_connection(mysql_conn: MySQLConnection):
+    """
+    Borrows an open session from the pool of the given connection, to be used in a with block
+    Args:
+        mysql_conn: Mysql connection instance
+
+    Returns: context manager of an open Mysql connection
+    """
+    return mysql_conn.pool.borrow()
+
+
 def fetch_server_id(mysql_conn: MySQLConnection) -> int:
     """
     Finds server ID
@@ -169,7 +345,7 @@ def fetch_server_id(mysql_conn: MySQLConnection) -> int:
 
     Returns: server ID
     """
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute("SELECT @@server_id")
             server_id = cur.fetchone()[0]
@@ -185,7 +361,7 @@ def fetch_server_uuid(mysql_conn: MySQLConnection) -> str:
 
     Returns: server UUID
     """
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute("SELECT @@server_uuid")
             server_uuid = cur.fetchone()[0]
@@ -1,15 +1,22 @@
 # pylint: disable=missing-docstring,too-many-locals
 
 import collections
+import functools
 import itertools
+import json
+import sys
 import pendulum
 import pymysql
 
-from typing import Optional, Dict, Tuple, Set, List
+from pymysql.converters import escape_string
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Iterable, Iterator, Tuple, Set, List
 from singer import metadata, Schema, get_logger
 from singer.catalog import Catalog, CatalogEntry
 
-from tap_mysql.connection import connect_with_backoff, MySQLConnection
+from tap_mysql.catalog_index import CatalogIndex, get_stream_index
+from tap_mysql.connection import borrow_connection, MySQLConnection
 from tap_mysql.sync_strategies import common
 
 LOGGER = get_logger('tap_mysql')
@@ -120,9 +127,127 @@ def should_run_discovery(column_names: Set[str], md_map: Dict[Tuple, Dict]) -> b
     return False
 
 
-def discover_catalog(mysql_conn: MySQLConnection, dbs: str = None, tables: Optional[str] = None):
-    """Returns a Catalog describing the structure of the database."""
+def discover_catalog(mysql_conn: MySQLConnection,
+                     dbs: str = None,
+                     tables: Optional[str] = None,
+                     schema_tables: Optional[Iterable[Tuple[str, str]]] = None,
+                     cache=None):
+    """
+    Returns a Catalog describing the structure of the database.
+
+    Discovery can be restricted to the comma separated table names of tables, whatever their schema, or to the
+    (table_schema, table_name) pairs of schema_tables. With a DiscoveryCache, only the tables whose schema
+    changed since they were cached are discovered again, and the cache is saved once the catalog is built.
+    See iter_catalog_entries for parallel discovery.
+    """
+    catalog = Catalog(list(iter_catalog_entries(mysql_conn, dbs, tables, schema_tables, cache)))
+
+    if cache is not None:
+        cache.save()
+
+    return catalog
+
+
+def get_discovery_parallelism(mysql_conn: MySQLConnection) -> int:
+    """
+    Returns the number of schemas discovered at the same time, the discovery_parallelism of the connection config
+    """
+    return max(int(mysql_conn.config.get('discovery_parallelism', 1)), 1)
+
+
+def iter_catalog_entries(mysql_conn: MySQLConnection,
+                         dbs: str = None,
+                         tables: Optional[str] = None,
+                         schema_tables: Optional[Iterable[Tuple[str, str]]] = None,
+                         cache=None) -> Iterator[CatalogEntry]:
+    """
+    Yields the catalog entries of the database, schema after schema, as discover_catalog would return them.
+
+    Every schema is discovered with its own queries, up to discovery_parallelism schemas at the same time over
+    connections of the pool. Schemas are only submitted as the ones before them are yielded, so that the columns
+    of at most discovery_parallelism schemas are held in memory. The discovered entries are added to the cache,
+    if any, which is up to the caller to save.
+    """
+    if schema_tables is not None:
+        schema_tables = set(schema_tables)
+
+        if not schema_tables:
+            return
+
+    filter_clause = generate_discovery_filter_clause(dbs, tables, schema_tables)
+
+    with borrow_connection(mysql_conn) as open_conn:
+        with open_conn.cursor() as cur:
+            table_info = fetch_table_info(cur, filter_clause)
+            fingerprints = fetch_table_fingerprints(cur, filter_clause) if cache is not None else None
+
+    cached_entries = collections.defaultdict(list)
+    schema_filter_clauses = {}
+
+    if cache is None:
+        for table_schema in table_info:
+            schema_filter_clauses[table_schema] = f"{filter_clause} AND table_schema = '{escape_string(table_schema)}'"
+    else:
+        entries, changed_tables = cache.lookup(table_info, fingerprints)
+
+        for entry in entries:
+            cached_entries[common.get_database_name(entry)].append(entry)
+
+        for table_schema in table_info:
+            changed_schema_tables = {k for k in changed_tables if k[0] == table_schema}
+
+            if changed_schema_tables:
+                schema_filter_clauses[table_schema] = generate_tables_filter_clause(changed_schema_tables)
+
+    def discover_schema(table_schema):
+        if table_schema not in schema_filter_clauses:
+            return []
+
+        with borrow_connection(mysql_conn) as open_conn:
+            with open_conn.cursor() as cur:
+                return discover_tables(cur, schema_filter_clauses[table_schema], table_info)
+
+    parallelism = get_discovery_parallelism(mysql_conn)
+    table_schemas = iter(sorted(table_info))
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        # schemas are yielded in order, whatever the order they are discovered in
+        pending = collections.deque((table_schema, executor.submit(discover_schema, table_schema))
+                                    for table_schema in itertools.islice(table_schemas, parallelism))
+
+        while pending:
+            table_schema, future = pending.popleft()
+            entries = future.result()
+
+            for next_schema in itertools.islice(table_schemas, 1):
+                pending.append((next_schema, executor.submit(discover_schema, next_schema)))
+
+            if cache is not None:
+                cache.update(entries, table_info, fingerprints)
+                entries = sorted(entries + cached_entries[table_schema], key=lambda entry: entry.table)
+
+            yield from entries
+
+
+def dump_catalog_entries(catalog_entries: Iterable[CatalogEntry], out=None):
+    """
+    Writes the catalog of the given entries as JSON, entry after entry as they are discovered, instead of
+    serializing a whole Catalog at once like Catalog.dump does
+    """
+    out = out or sys.stdout
+    out.write('{\n  "streams": [')
+
+    for idx, catalog_entry in enumerate(catalog_entries):
+        out.write(',\n    ' if idx else '\n    ')
+        out.write(json.dumps(catalog_entry.to_dict(), indent=2).replace('\n', '\n    '))
+
+    out.write('\n  ]\n}\n')
+    out.flush()
+
 
+def generate_discovery_filter_clause(dbs: Optional[str],
+                                     tables: Optional[str],
+                                     schema_tables: Optional[Set[Tuple[str, str]]]) -> str:
     if dbs:
         filter_dbs_clause = ",".join([f"'{db_name}'" for db_name in dbs.split(",")])
         table_schema_clause = f"WHERE table_schema IN ({filter_dbs_clause})"
@@ -141,105 +266,267 @@ def discover_catalog(mysql_conn: MySQLConnection, dbs: str = None, tables: Optio
         filter_tables_clause = ",".join([f"'{table_name}'" for table_name in tables.split(",")])
         tables_clause = f" AND table_name IN ({filter_tables_clause})"
 
-    with connect_with_backoff(mysql_conn) as open_conn:
-        with open_conn.cursor() as cur:
-            cur.execute(f"""
-            SELECT table_schema,
-                   table_name,
-                   table_type,
-                   table_rows
-                FROM information_schema.tables
-                {table_schema_clause}{tables_clause}
-            """)
-
-            table_info = {}
-
-            for (db_name, table, table_type, rows) in cur.fetchall():
-                if db_name not in table_info:
-                    table_info[db_name] = {}
-
-                table_info[db_name][table] = {
-                    'row_count': rows,
-                    'is_view': table_type == 'VIEW'
-                }
-
-            cur.execute(f"""
-                SELECT table_schema,
-                       table_name,
-                       column_name,
-                       data_type,
-                       character_maximum_length,
-                       numeric_precision,
-                       numeric_scale,
-                       column_type,
-                       column_key
-                    FROM information_schema.columns
-                    {table_schema_clause}{tables_clause}
-                    ORDER BY table_schema, table_name
-            """)
-
-            columns = []
-            rec = cur.fetchone()
-            while rec is not None:
-                columns.append(Column(*rec))
-                rec = cur.fetchone()
-
-            entries = []
-            for (k, cols) in itertools.groupby(columns, lambda c: (c.table_schema, c.table_name)):
-                cols = list(cols)
-                (table_schema, table_name) = k
-
-                schema = Schema(type='object',
-                                properties={c.column_name: schema_for_column(c) for c in cols})
-                mdata = create_column_metadata(cols)
-                md_map = metadata.to_map(mdata)
+    if schema_tables is not None:
+        tables_clause += f" AND {generate_tables_condition(schema_tables)}"
+
+    return f'{table_schema_clause}{tables_clause}'
+
+
+def fetch_table_info(cur, filter_clause: str) -> Dict[str, Dict[str, Dict]]:
+    """
+    Returns the type, size estimates and creation time of the tables, keyed by schema then table name
+    """
+    cur.execute(f"""
+    SELECT table_schema,
+           table_name,
+           table_type,
+           table_rows,
+           data_length,
+           avg_row_length,
+           index_length,
+           create_time
+        FROM information_schema.tables
+        {filter_clause}
+    """)
+
+    table_info = {}
+
+    for (db_name, table, table_type, rows, data_length, avg_row_length, index_length, create_time) \
+            in cur.fetchall():
+        if db_name not in table_info:
+            table_info[db_name] = {}
+
+        table_info[db_name][table] = {
+            'row_count': rows,
+            'data_length': data_length,
+            'avg_row_length': avg_row_length,
+            'index_length': index_length,
+            'is_view': table_type == 'VIEW',
+            'create_time': create_time
+        }
+
+    return table_info
+
+
+def write_table_info_metadata(md_map: Dict, table_info: Dict) -> Dict:
+    """
+    Writes the row count, size estimates and view flag of the table to the stream metadata
+    """
+    row_count = table_info.get('row_count')
+
+    if row_count is not None:
+        md_map = metadata.write(md_map,
+                                (),
+                                'row-count',
+                                row_count)
+
+    # sizes InnoDB estimates for the table, used to schedule the largest tables first
+    for size_key in ('data_length', 'avg_row_length', 'index_length'):
+        size = table_info.get(size_key)
 
+        if size is not None:
+            md_map = metadata.write(md_map,
+                                    (),
+                                    size_key.replace('_', '-'),
+                                    size)
+
+    return metadata.write(md_map,
+                          (),
+                          'is-view',
+                          table_info['is_view'])
+
+
+def fetch_table_fingerprints(cur, filter_clause: str) -> Dict[Tuple[str, str], str]:
+    """
+    Returns a fingerprint of the columns and indexes of every table, computed by the server so that finding out
+    whether the definition of a table changed doesn't require fetching it. Indexes are part of it as they make
+    the key columns of a stream, e.g. a composite unique index doesn't change the column_key of all its columns.
+    """
+    cur.execute(f"""
+        SELECT table_schema,
+               table_name,
+               COUNT(*),
+               BIT_XOR(CRC32(CONCAT_WS('|', ordinal_position, column_name, column_type, column_key, is_nullable)))
+            FROM information_schema.columns
+            {filter_clause}
+            GROUP BY table_schema, table_name
+    """)
+
+    column_checksums = {(table_schema, table_name): f'{column_count}-{checksum}'
+                        for table_schema, table_name, column_count, checksum in cur.fetchall()}
+
+    cur.execute(f"""
+        SELECT table_schema,
+               table_name,
+               BIT_XOR(CRC32(CONCAT_WS('|', index_name, seq_in_index, column_name, non_unique, nullable, sub_part)))
+            FROM information_schema.statistics
+            {filter_clause}
+            GROUP BY table_schema, table_name
+    """)
+
+    index_checksums = {(table_schema, table_name): checksum for table_schema, table_name, checksum in cur.fetchall()}
+
+    return {key: f'{column_checksum}-{index_checksums.get(key, 0)}'
+            for key, column_checksum in column_checksums.items()}
+
+
+def discover_tables(cur, filter_clause: str, table_info: Dict[str, Dict[str, Dict]]) -> List[CatalogEntry]:
+    """
+    Returns the catalog entries of the tables matching the filter clause
+    """
+    # fetched first, the columns are then streamed from the cursor table after table
+    unique_indexes = discover_unique_indexes(cur, filter_clause)
+
+    cur.execute(f"""
+        SELECT table_schema,
+               table_name,
+               column_name,
+               data_type,
+               character_maximum_length,
+               numeric_precision,
+               numeric_scale,
+               column_type,
+               column_key
+            FROM information_schema.columns
+            {filter_clause}
+            ORDER BY table_schema, table_name
+    """)
+
+    columns = (Column(*rec) for rec in iter(cur.fetchone, None))
+
+    entries = []
+    for (k, cols) in itertools.groupby(columns, lambda c: (c.table_schema, c.table_name)):
+        cols = list(cols)
+        (table_schema, table_name) = k
+
+        schema = Schema(type='object',
+                        properties={c.column_name: schema_for_column(c) for c in cols})
+        mdata = create_column_metadata(cols)
+        md_map = metadata.to_map(mdata)
+
+        md_map = metadata.write(md_map,
+                                (),
+                                'database-name',
+                                table_schema)
+
+        is_view = table_info[table_schema][table_name]['is_view']
+
+        md_map = write_table_info_metadata(md_map, table_info[table_schema][table_name])
+
+        column_is_key_prop = lambda c, s: (c.column_key == 'PRI' and
+                                           s.properties[c.column_name].inclusion != 'unsupported')
+
+        key_properties = [c.column_name for c in cols if column_is_key_prop(c, schema)]
+
+        if not is_view:
+            md_map = metadata.write(md_map,
+                                    (),
+                                    'table-key-properties',
+                                    key_properties)
+
+            # tables without a primary key can still be extracted in order of a NOT NULL unique index
+            unique_index_columns = unique_indexes.get(k)
+
+            if not key_properties and unique_index_columns and \
+                    all(schema.properties[c].inclusion != 'unsupported' for c in unique_index_columns):
                 md_map = metadata.write(md_map,
                                         (),
-                                        'database-name',
-                                        table_schema)
+                                        'unique-index-columns',
+                                        unique_index_columns)
 
-                is_view = table_info[table_schema][table_name]['is_view']
+        entry = CatalogEntry(
+            table=table_name,
+            stream=table_name,
+            metadata=metadata.to_list(md_map),
+            tap_stream_id=common.generate_tap_stream_id(table_schema, table_name),
+            schema=schema)
 
-                if table_schema in table_info and table_name in table_info[table_schema]:
-                    row_count = table_info[table_schema][table_name].get('row_count')
+        entries.append(entry)
 
-                    if row_count is not None:
-                        md_map = metadata.write(md_map,
-                                                (),
-                                                'row-count',
-                                                row_count)
+    return entries
 
-                    md_map = metadata.write(md_map,
-                                            (),
-                                            'is-view',
-                                            is_view)
 
-                column_is_key_prop = lambda c, s: (c.column_key == 'PRI' and
-                                                   s.properties[c.column_name].inclusion != 'unsupported')
+def generate_tables_condition(tables: Iterable[Tuple[str, str]], column_prefix: str = '') -> str:
+    """
+    Returns the condition matching the given (table_schema, table_name) pairs in an information_schema
+    table, grouped per schema so that every condition is on a single schema
+    """
+    tables_by_schema = collections.defaultdict(set)
 
-                key_properties = [c.column_name for c in cols if column_is_key_prop(c, schema)]
+    for table_schema, table_name in tables:
+        tables_by_schema[table_schema].add(table_name)
 
-                if not is_view:
-                    md_map = metadata.write(md_map,
-                                            (),
-                                            'table-key-properties',
-                                            key_properties)
+    conditions = []
 
-                entry = CatalogEntry(
-                    table=table_name,
-                    stream=table_name,
-                    metadata=metadata.to_list(md_map),
-                    tap_stream_id=common.generate_tap_stream_id(table_schema, table_name),
-                    schema=schema)
+    for table_schema, table_names in sorted(tables_by_schema.items()):
+        filter_tables_clause = ",".join(f"'{escape_string(table_name)}'" for table_name in sorted(table_names))
+        conditions.append(f"({column_prefix}table_schema = '{escape_string(table_schema)}' "
+                          f"AND {column_prefix}table_name IN ({filter_tables_clause}))")
 
-                entries.append(entry)
+    return f"({' OR '.join(conditions)})"
 
-    return Catalog(entries)
 
+def generate_tables_filter_clause(tables: Iterable[Tuple[str, str]], column_prefix: str = '') -> str:
+    """
+    Returns the WHERE clause matching the given (table_schema, table_name) pairs in an information_schema table
+    """
+    return f"WHERE {generate_tables_condition(tables, column_prefix)}"
+
+
+def discover_unique_indexes(cur, filter_clause: str) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Returns the columns of the first unique index made of NOT NULL columns only of every table,
+    keyed by (table_schema, table_name)
+    """
+    cur.execute(f"""
+        SELECT table_schema,
+               table_name,
+               index_name,
+               column_name,
+               nullable
+            FROM information_schema.statistics
+            {filter_clause}
+            AND non_unique = 0
+            AND index_name <> 'PRIMARY'
+            ORDER BY table_schema, table_name, index_name, seq_in_index
+    """)
+
+    unique_indexes = {}
+
+    for (k, index_name), index_columns in itertools.groupby(cur.fetchall(), lambda r: (r[:2], r[2])):
+        index_columns = list(index_columns)
+
+        if k in unique_indexes or any(nullable == 'YES' for *_, nullable in index_columns):
+            continue
+
+        LOGGER.debug('Found NOT NULL unique index %s on table %s.%s', index_name, *k)
+        unique_indexes[k] = [column_name for *_, column_name, _ in index_columns]
+
+    return unique_indexes
 
-def schema_for_column(column):  # pylint: disable=too-many-branches
-    """Returns the Schema object for the given Column."""
+
+def schema_for_column(column):
+    """
+    Returns the Schema object for the given Column.
+
+    Schemas are memoized per column type, the same Schema object being returned for every column of the same
+    type, so it must not be modified.
+    """
+    return _schema_for_column_type(column.data_type.lower(),
+                                   column.column_type.lower(),
+                                   column.column_key.lower(),
+                                   column.character_maximum_length,
+                                   column.numeric_scale)
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_for_column_type(data_type, column_type, column_key, character_maximum_length, numeric_scale):
+    return build_schema_for_column(Column(None, None, None, data_type, character_maximum_length, None,
+                                          numeric_scale, column_type, column_key))
+
+
+def build_schema_for_column(column):  # pylint: disable=too-many-branches
+    """Returns a new Schema object for the given Column."""
 
     data_type = column.data_type.lower()
     column_type = column.column_type.lower()
@@ -323,24 +610,31 @@ def create_column_metadata(cols: List[Column]):
 
 
 def resolve_catalog(discovered_catalog, streams_to_sync):
+    """
+    Returns the Catalog of the streams to sync with the columns to select, as found in the discovered catalog,
+    which can be given as a Catalog or as its CatalogIndex
+    """
     result = Catalog(streams=[])
 
+    if isinstance(discovered_catalog, Catalog):
+        discovered_catalog = CatalogIndex(discovered_catalog)
+
     # Iterate over the streams in the input catalog and match each one up
     # with the same stream in the discovered catalog.
     for catalog_entry in streams_to_sync:
-        catalog_metadata = metadata.to_map(catalog_entry.metadata)
-        replication_key = catalog_metadata.get((), {}).get('replication-key')
+        stream_index = get_stream_index(catalog_entry)
+        replication_key = stream_index.replication_key
 
         discovered_table = discovered_catalog.get_stream(catalog_entry.tap_stream_id)
-        database_name = common.get_database_name(catalog_entry)
+        database_name = stream_index.database_name
 
         if not discovered_table:
             LOGGER.warning('Database %s table %s was selected but does not exist',
                            database_name, catalog_entry.table)
             continue
 
-        selected = {k for k, v in catalog_entry.schema.properties.items()
-                    if common.property_is_selected(catalog_entry, k) or k == replication_key}
+        selected = {k for k in catalog_entry.schema.properties
+                    if stream_index.is_property_selected(k) or k == replication_key}
 
         # These are the columns we need to select
         columns = desired_columns(selected, discovered_table.schema)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+On disk cache of the discovered catalog entries
+
+Schemas change far less often than the tap runs, so the catalog entry of every discovered table is kept in a
+JSON file together with the creation time of the table and a fingerprint of its columns and indexes. A table is
+only discovered again when one of them changed: ALTER TABLE statements that rebuild the table reset its creation
+time, the ones that don't still change its columns, their nullability or its indexes.
+
+UPDATE_TIME follows data changes on InnoDB, so it doesn't invalidate cached schemas. The row counts and size
+estimates it would keep fresh are refreshed from information_schema.tables on every discovery instead.
+"""
+import json
+import os
+
+from typing import Dict, List, Optional, Set, Tuple
+
+import singer
+
+from singer import metadata
+from singer.catalog import Catalog, CatalogEntry
+
+from tap_mysql.discover_utils import write_table_info_metadata
+
+LOGGER = singer.get_logger('tap_mysql')
+
+CACHE_VERSION = 2
+
+
+class DiscoveryCache:
+    """
+    Catalog entries keyed by (table_schema, table_name), loaded from and saved to a JSON file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tables: Dict[Tuple[str, str], Dict] = {}
+
+        if os.path.exists(path):
+            self.load()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['DiscoveryCache']:
+        """
+        Returns the discovery cache configured with discovery_cache_path, None if there is none
+        """
+        if not config.get('discovery_cache_path'):
+            return None
+
+        return cls(config['discovery_cache_path'])
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+
+        if cache.get('version') != CACHE_VERSION:
+            LOGGER.info('Ignoring discovery cache %s of an older version', self.path)
+            return
+
+        self.tables = {(table['table_schema'], table['table_name']): table for table in cache['tables']}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump({'version': CACHE_VERSION, 'tables': list(self.tables.values())}, cache_file)
+
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def cache_key(table_info: Dict, fingerprint: Optional[str]) -> Dict:
+        create_time = table_info.get('create_time')
+
+        return {
+            'create_time': create_time.isoformat() if create_time is not None else None,
+            'fingerprint': fingerprint
+        }
+
+    def lookup(self, table_info: Dict[str, Dict[str, Dict]],
+               fingerprints: Dict[Tuple[str, str], str]) -> Tuple[List[CatalogEntry], Set[Tuple[str, str]]]:
+        """
+        Looks up the given tables in the cache
+
+        Args:
+            table_info: type, size estimates and creation time of the tables, keyed by schema then table name
+            fingerprints: fingerprints of the columns and indexes of the tables, keyed by (table_schema, table_name)
+
+        Returns: tuple of the cached catalog entries still valid, with their size metadata refreshed, and the
+            (table_schema, table_name) pairs of the tables to discover again
+        """
+        entries = []
+        changed = set()
+
+        for table_schema, tables in table_info.items():
+            for table_name, info in tables.items():
+                key = (table_schema, table_name)
+                cached = self.tables.get(key)
+
+                # tables without any column, if any, are not discovered
+                if key not in fingerprints:
+                    continue
+
+                if cached is None or cached['key'] != self.cache_key(info, fingerprints[key]):
+                    changed.add(key)
+                    continue
+
+                entry = Catalog.from_dict({'streams': [cached['catalog_entry']]}).streams[0]
+                entry.metadata = metadata.to_list(write_table_info_metadata(metadata.to_map(entry.metadata), info))
+                entries.append(entry)
+
+        LOGGER.info('Discovery cache: %s table(s) up to date, %s new or changed', len(entries), len(changed))
+
+        return entries, changed
+
+    def update(self, entries: List[CatalogEntry], table_info: Dict[str, Dict[str, Dict]],
+               fingerprints: Dict[Tuple[str, str], str]):
+        """
+        Caches the freshly discovered catalog entries
+        """
+        for entry in entries:
+            key = self.get_key(entry)
+            table_schema = key[0]
+
+            self.tables[key] = {
+                'table_schema': table_schema,
+                'table_name': entry.table,
+                'key': self.cache_key(table_info[table_schema][entry.table], fingerprints.get(key)),
+                'catalog_entry': entry.to_dict(),
+                # whether the entry was output by discovery mode since it was cached
+                'reported': False
+            }
+
+    @staticmethod
+    def get_key(catalog_entry) -> Tuple[str, str]:
+        return metadata.to_map(catalog_entry.metadata)[()]['database-name'], catalog_entry.table
+
+    def is_changed(self, catalog_entry) -> bool:
+        """
+        Returns True if the table of the stream is new or changed since the catalog last output by discovery
+        mode, including changes found by the discoveries of syncs in between
+        """
+        cached = self.tables.get(self.get_key(catalog_entry))
+
+        return cached is None or not cached.get('reported')
+
+    def mark_reported(self, catalog_entries: List[CatalogEntry]):
+        for catalog_entry in catalog_entries:
+            cached = self.tables.get(self.get_key(catalog_entry))
+
+            if cached is not None:
+                cached['reported'] = True
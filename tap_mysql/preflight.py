@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+Metadata of the selected tables, fetched once at the start of a sync
+
+information_schema lookups are slow on servers with many tables, so instead of querying it table by table
+while syncing, the metadata of every selected table is fetched with set based queries before the first
+stream is synced and kept in memory for the rest of the run.
+"""
+import collections
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import singer
+
+from tap_mysql.connection import borrow_connection, MySQLConnection
+from tap_mysql.discover_utils import discover_unique_indexes, generate_tables_filter_clause
+from tap_mysql.sync_strategies import common
+
+LOGGER = singer.get_logger('tap_mysql')
+
+TableMetadata = collections.namedtuple('TableMetadata', [
+    'engine',
+    'row_count',
+    'data_length',
+    'avg_row_length',
+    'unique_index_columns'])
+
+# Metadata of the tables fetched by the last preflight, keyed by (table_schema, table_name)
+_TABLE_METADATA: Dict[Tuple[str, str], TableMetadata] = {}
+
+
+def fetch_table_metadata(mysql_conn: MySQLConnection,
+                         tables: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], TableMetadata]:
+    """
+    Fetches the engine, sizes and NOT NULL unique index of the given tables
+
+    Args:
+        mysql_conn: Mysql connection instance
+        tables: (table_schema, table_name) pairs
+
+    Returns: dict of TableMetadata keyed by (table_schema, table_name), tables that do not exist are missing
+    """
+    tables = set(tables)
+
+    if not tables:
+        return {}
+
+    with borrow_connection(mysql_conn) as open_conn:
+        with open_conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT t.table_schema,
+                       t.table_name,
+                       t.engine,
+                       t.table_rows,
+                       t.data_length,
+                       t.avg_row_length
+                    FROM information_schema.tables t
+                    {generate_tables_filter_clause(tables, 't.')}
+            """)
+
+            rows = cur.fetchall()
+
+            unique_indexes = discover_unique_indexes(cur, generate_tables_filter_clause(tables))
+
+    return {
+        (table_schema, table_name): TableMetadata(engine=engine,
+                                                  row_count=row_count,
+                                                  data_length=data_length,
+                                                  avg_row_length=avg_row_length,
+                                                  unique_index_columns=unique_indexes.get((table_schema, table_name)))
+        for (table_schema, table_name, engine, row_count, data_length, avg_row_length) in rows
+    }
+
+
+def run_preflight(mysql_conn: MySQLConnection, catalog):
+    """
+    Fetches and caches the metadata of every table selected in the catalog
+    """
+    _TABLE_METADATA.clear()
+    _TABLE_METADATA.update(fetch_table_metadata(mysql_conn, common.get_selected_tables(catalog)))
+
+    LOGGER.info('Fetched the metadata of %s selected table(s)', len(_TABLE_METADATA))
+
+
+def get_table_metadata(catalog_entry) -> Optional[TableMetadata]:
+    """
+    Returns the cached metadata of the table of the stream, None if the preflight didn't fetch it
+    """
+    return _TABLE_METADATA.get((common.get_database_name(catalog_entry), catalog_entry.table))
+
+
+def get_avg_row_length(cursor, catalog_entry) -> Optional[int]:
+    """
+    Returns the average row length of the table of the stream fetched by the preflight, queried with the cursor
+    if the preflight didn't fetch it
+    """
+    table_metadata = get_table_metadata(catalog_entry)
+
+    if table_metadata is not None and table_metadata.avg_row_length is not None:
+        return table_metadata.avg_row_length
+
+    return common.fetch_avg_row_length(cursor, catalog_entry)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+Scheduling of the SELECT based streams synced concurrently
+
+Workers pick the next stream as soon as they are free, so submitting the streams longest first is the
+Longest Processing Time rule: the longest syncs overlap each other instead of one of them starting last
+and setting the duration of the whole run.
+"""
+from typing import Dict, List, Optional
+
+import singer
+
+from singer.catalog import Catalog
+
+from tap_mysql import preflight
+from tap_mysql.catalog_index import CatalogIndex, get_stream_index
+
+LOGGER = singer.get_logger('tap_mysql')
+
+# Assumed throughput of the streams that were never synced before, it only has to rank them against each other
+# and against the observed durations of the other streams
+DEFAULT_BYTES_PER_SECOND = 10 * 1024 * 1024
+
+
+def get_table_size(catalog_entry) -> Optional[int]:
+    """
+    Returns the size in bytes of the table data as estimated by discovery or by the preflight of the sync,
+    None if unknown
+    """
+    stream_metadata = get_stream_index(catalog_entry).stream_metadata
+
+    if stream_metadata.get('data-length') is not None:
+        return stream_metadata['data-length']
+
+    if stream_metadata.get('row-count') is not None and stream_metadata.get('avg-row-length') is not None:
+        return stream_metadata['row-count'] * stream_metadata['avg-row-length']
+
+    table_metadata = preflight.get_table_metadata(catalog_entry)
+
+    if table_metadata is not None:
+        return table_metadata.data_length
+
+    return None
+
+
+def record_sync_stats(state: Dict, catalog_entry, seconds: float):
+    """
+    Bookmarks how long the stream took to sync and, if the size of its table is known, its throughput
+    """
+    table_size = get_table_size(catalog_entry)
+
+    singer.write_bookmark(state, catalog_entry.tap_stream_id, 'sync_stats', {
+        'seconds': round(seconds, 3),
+        'bytes_per_second': round(table_size / seconds) if table_size and seconds > 0 else None
+    })
+
+
+def estimate_sync_seconds(catalog_entry, state: Dict, table_size: Optional[int]) -> float:
+    """
+    Estimates how long the stream will take to sync: the time a full read of its table takes at the throughput
+    observed by the previous sync, or at the default throughput if it was never synced. INCREMENTAL streams
+    only read the rows changed since their previous sync, which is expected to take as long as it did.
+    """
+    stats = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'sync_stats') or {}
+    replication_method = get_stream_index(catalog_entry).replication_method
+
+    if stats and (replication_method == 'INCREMENTAL' or not stats.get('bytes_per_second')):
+        return stats['seconds']
+
+    return (table_size or 0) / (stats.get('bytes_per_second') or DEFAULT_BYTES_PER_SECOND)
+
+
+def order_longest_first(streams: List, discovered_catalog, state: Dict, first_tap_stream_ids=()) -> List:
+    """
+    Orders the streams by decreasing estimated sync duration, table sizes being taken from the freshly
+    discovered catalog, given as a Catalog or as its CatalogIndex. Streams of first_tap_stream_ids, the ones
+    interrupted by the previous sync, are kept first.
+    """
+    if isinstance(discovered_catalog, Catalog):
+        discovered_catalog = CatalogIndex(discovered_catalog)
+
+    def estimate(catalog_entry):
+        discovered_entry = discovered_catalog.get_stream(catalog_entry.tap_stream_id) or catalog_entry
+
+        return estimate_sync_seconds(catalog_entry, state, get_table_size(discovered_entry))
+
+    first_streams = [s for s in streams if s.tap_stream_id in first_tap_stream_ids]
+    other_streams = sorted((s for s in streams if s.tap_stream_id not in first_tap_stream_ids),
+                           key=estimate,
+                           reverse=True)
+
+    LOGGER.info('Scheduling streams longest first: %s', [s.tap_stream_id for s in first_streams + other_streams])
+
+    return first_streams + other_streams
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+
+import contextlib
+import queue
+import singer
+
+from tap_mysql.connection import connect_with_backoff, clone_connection, run_sql, MySQLConnection, MYSQL_ENGINE
+from tap_mysql.sync_strategies import binlog
+
+LOGGER = singer.get_logger('tap_mysql')
+
+
+class ConsistentSnapshot:
+    """
+    Pool of connections that all read the database as of the same point in time, together with the binlog
+    coordinates of that point in time.
+
+    The server is locked with FLUSH TABLES WITH READ LOCK only for as long as it takes to open a
+    START TRANSACTION WITH CONSISTENT SNAPSHOT on every connection and to read the binlog coordinates,
+    after which the transactions keep reading the snapshot until the pool is closed.
+    """
+
+    def __init__(self, mysql_conn: MySQLConnection, size: int, use_gtid: bool = False, engine: str = MYSQL_ENGINE):
+        self.mysql_conn = mysql_conn
+        self.size = max(size, 1)
+        # engine of the server whose GTID position is read, None if GTID isn't used
+        self.gtid_engine = engine if use_gtid else None
+
+        self.log_file = None
+        self.log_pos = None
+        self.gtid = None
+
+        self._connections = queue.Queue()
+
+    def open(self):
+        lock_conn = connect_with_backoff(clone_connection(self.mysql_conn))
+
+        try:
+            run_sql(lock_conn, 'FLUSH TABLES WITH READ LOCK')
+
+            try:
+                for _ in range(self.size):
+                    snapshot_conn = connect_with_backoff(clone_connection(self.mysql_conn))
+                    self._connections.put(snapshot_conn)
+
+                    run_sql(snapshot_conn, 'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                    run_sql(snapshot_conn, 'START TRANSACTION WITH CONSISTENT SNAPSHOT')
+
+                self.log_file, self.log_pos = binlog.fetch_current_log_file_and_pos(self.mysql_conn)
+
+                if self.gtid_engine:
+                    self.gtid = binlog.fetch_current_gtid_pos(self.mysql_conn, self.gtid_engine)
+            finally:
+                run_sql(lock_conn, 'UNLOCK TABLES')
+        except Exception:
+            self.close()
+            raise
+        finally:
+            lock_conn.close()
+
+        LOGGER.info('Opened consistent snapshot on %s connection(s) at binlog %s:%s%s',
+                    self.size,
+                    self.log_file,
+                    self.log_pos,
+                    f', GTID {self.gtid}' if self.gtid else '')
+
+        return self
+
+    @contextlib.contextmanager
+    def borrow(self):
+        """
+        Borrows one of the snapshot connections, blocking until one is available
+
+        A connection closed by its borrower, which left its read unfinished, can't be replaced by a new one reading
+        the same snapshot. It is not returned to the pool, and borrowers reaching its place fail instead of waiting.
+        """
+        snapshot_conn = self._connections.get()
+
+        if snapshot_conn is None:
+            self._connections.put(None)
+            raise Exception('Unable to borrow a connection of the consistent snapshot because it was closed')
+
+        try:
+            yield snapshot_conn
+        finally:
+            self._connections.put(snapshot_conn if snapshot_conn.open else None)
+
+    def close(self):
+        while not self._connections.empty():
+            snapshot_conn = self._connections.get_nowait()
+
+            if snapshot_conn is not None:
+                snapshot_conn.close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        del exc_info
+        self.close()
@@ -2,7 +2,7 @@
 
 import singer
 
-from singer import metadata
+from tap_mysql.catalog_index import get_stream_index
 
 
 def write_schema_message(catalog_entry, bookmark_properties=None):
@@ -20,20 +20,8 @@ def write_schema_message(catalog_entry, bookmark_properties=None):
 
 
 def get_key_properties(catalog_entry):
-    catalog_metadata = metadata.to_map(catalog_entry.metadata)
-    stream_metadata = catalog_metadata.get((), {})
-
-    is_view = get_is_view(catalog_entry)
-
-    if is_view:
-        key_properties = stream_metadata.get('view-key-properties', [])
-    else:
-        key_properties = stream_metadata.get('table-key-properties', [])
-
-    return key_properties
+    return get_stream_index(catalog_entry).key_properties
 
 
 def get_is_view(catalog_entry):
-    md_map = metadata.to_map(catalog_entry.metadata)
-
-    return md_map.get((), {}).get('is-view')
+    return get_stream_index(catalog_entry).is_view
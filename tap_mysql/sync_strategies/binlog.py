@@ -1,45 +1,52 @@
 # pylint: disable=missing-function-docstring,too-many-arguments,too-many-branches
-import codecs
-import copy
+import collections
 import datetime
-import json
+import functools
 import random
 import re
 import socket
+import threading
 import pymysql.connections
 import pymysql.err
 import pytz
 import singer
 import tzlocal
 
-from typing import Dict, Set, Union, Optional, Any, Tuple
-from plpygis import Geometry
+from typing import Dict, Iterable, Set, Union, Optional, Any, Tuple
 from pymysqlreplication import BinLogStreamReader
-from pymysqlreplication.constants import FIELD_TYPE
-from pymysqlreplication.event import RotateEvent, MariadbGtidEvent, GtidEvent
+from pymysqlreplication.event import (
+    GtidEvent,
+    HeartbeatLogEvent,
+    MariadbGtidEvent,
+    QueryEvent,
+    RotateEvent,
+    XidEvent,
+)
 from pymysqlreplication.row_event import (
     DeleteRowsEvent,
+    TableMapEvent,
     UpdateRowsEvent,
     WriteRowsEvent,
 )
 from singer import utils, Schema, metadata
 
 from tap_mysql import connection
-from tap_mysql.connection import connect_with_backoff, make_connection_wrapper, MySQLConnection
+from tap_mysql.catalog_index import compile_stream
+from tap_mysql.connection import borrow_connection, make_connection_wrapper, MySQLConnection
 from tap_mysql.discover_utils import discover_catalog, desired_columns, should_run_discovery
 from tap_mysql.stream_utils import write_schema_message
-from tap_mysql.sync_strategies import common
+from tap_mysql.sync_strategies import binlog_continuous, common
+from tap_mysql.sync_strategies.binlog_checkpoints import BinlogCheckpoints, update_bookmarks
+from tap_mysql.sync_strategies.binlog_compaction import CompactingRecordWriter
+from tap_mysql.sync_strategies.binlog_pipeline import RecordWriter
+from tap_mysql.sync_strategies.binlog_records import BinlogRowConverter, get_record_writer
+from tap_mysql.sync_strategies.binlog_schema import BinlogSchemaCache, TableMap
 
 LOGGER = singer.get_logger('tap_mysql')
 
 SDC_DELETED_AT = "_sdc_deleted_at"
 UPDATE_BOOKMARK_PERIOD = 1000
-BOOKMARK_KEYS = {'log_file', 'log_pos', 'version', 'gtid'}
-
-MYSQL_TIMESTAMP_TYPES = {
-    FIELD_TYPE.TIMESTAMP,
-    FIELD_TYPE.TIMESTAMP2
-}
+BOOKMARK_KEYS = {'log_file', 'log_pos', 'version', 'gtid', 'sync_stats'}
 
 
 def add_automatic_properties(catalog_entry, columns):
@@ -54,7 +61,7 @@ def add_automatic_properties(catalog_entry, columns):
 
 
 def verify_binlog_config(mysql_conn):
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute("SELECT  @@binlog_format")
             binlog_format = cur.fetchone()[0]
@@ -86,7 +93,7 @@ def verify_gtid_config(mysql_conn: MySQLConnection):
 
     Returns: None if gtid is enabled
     """
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute("select @@gtid_mode;")
             binlog_format = cur.fetchone()[0]
@@ -96,7 +103,7 @@ def verify_gtid_config(mysql_conn: MySQLConnection):
 
 
 def fetch_current_log_file_and_pos(mysql_conn):
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute("SHOW MASTER STATUS")
 
@@ -132,7 +139,7 @@ def fetch_current_gtid_pos(
     else:
         server = connection.fetch_server_uuid(mysql_conn)
 
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
 
             if engine != connection.MARIADB_ENGINE:
@@ -180,91 +187,6 @@ def fetch_current_gtid_pos(
     raise Exception(f'No suitable GTID was found for server {server}.')
 
 
-def json_bytes_to_string(data):
-    if isinstance(data, bytes):
-        return data.decode()
-
-    if isinstance(data, dict):
-        return dict(map(json_bytes_to_string, data.items()))
-
-    if isinstance(data, tuple):
-        return tuple(map(json_bytes_to_string, data))
-
-    if isinstance(data, list):
-        return list(map(json_bytes_to_string, data))
-
-    return data
-
-
-# pylint: disable=too-many-locals
-def row_to_singer_record(catalog_entry, version, db_column_map, row, time_extracted):
-    row_to_persist = {}
-
-    for column_name, val in row.items():
-        property_type = catalog_entry.schema.properties[column_name].type
-        property_format = catalog_entry.schema.properties[column_name].format
-        db_column_type = db_column_map.get(column_name)
-
-        if isinstance(val, datetime.datetime):
-            if db_column_type in MYSQL_TIMESTAMP_TYPES:
-                # The mysql-replication library creates datetimes from TIMESTAMP columns using fromtimestamp which
-                # will use the local timezone thus we must set tzinfo accordingly See:
-                # https://github.com/noplay/python-mysql-replication/blob/master/pymysqlreplication/row_event.py#L143
-                # -L145
-                timezone = tzlocal.get_localzone()
-                local_datetime = timezone.localize(val)
-                utc_datetime = local_datetime.astimezone(pytz.UTC)
-                row_to_persist[column_name] = utc_datetime.isoformat()
-            else:
-                row_to_persist[column_name] = val.isoformat() + '+00:00'
-
-        elif isinstance(val, datetime.date):
-            row_to_persist[column_name] = val.isoformat() + 'T00:00:00+00:00'
-
-        elif isinstance(val, datetime.timedelta):
-            if property_format == 'time':
-                # this should convert time column into 'HH:MM:SS' formatted string
-                row_to_persist[column_name] = str(val)
-            else:
-                timedelta_from_epoch = datetime.datetime.utcfromtimestamp(0) + val
-                row_to_persist[column_name] = timedelta_from_epoch.isoformat() + '+00:00'
-
-        elif db_column_type == FIELD_TYPE.JSON:
-            row_to_persist[column_name] = json.dumps(json_bytes_to_string(val))
-
-        elif property_format == 'spatial':
-            if val:
-                srid = int.from_bytes(val[:4], byteorder='little')
-                geom = Geometry(val[4:], srid=srid)
-                row_to_persist[column_name] = json.dumps(geom.geojson)
-            else:
-                row_to_persist[column_name] = None
-
-        elif isinstance(val, bytes):
-            # encode bytes as hex bytes then to utf8 string
-            row_to_persist[column_name] = codecs.encode(val, 'hex').decode('utf-8')
-
-        elif 'boolean' in property_type or property_type == 'boolean':
-            if val is None:
-                boolean_representation = None
-            elif val == 0:
-                boolean_representation = False
-            elif db_column_type == FIELD_TYPE.BIT:
-                boolean_representation = int(val) != 0
-            else:
-                boolean_representation = True
-            row_to_persist[column_name] = boolean_representation
-
-        else:
-            row_to_persist[column_name] = val
-
-    return singer.RecordMessage(
-        stream=catalog_entry.stream,
-        record=row_to_persist,
-        version=version,
-        time_extracted=time_extracted)
-
-
 def calculate_gtid_bookmark(
         mysql_conn: MySQLConnection,
         binlog_streams_map: Dict[str, Any],
@@ -349,7 +271,7 @@ def _find_gtid_by_binlog_coordinates(mysql_conn: MySQLConnection, log_file: str,
 
     Returns: gtid position
     """
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute(f"select BINLOG_GTID_POS('{log_file}', {log_pos});")
             gtids = cur.fetchone()[0]
@@ -405,7 +327,7 @@ def get_min_log_pos_per_log_file(binlog_streams_map, state) -> Dict[str, Dict]:
 def calculate_bookmark(mysql_conn, binlog_streams_map, state) -> Tuple[str, int]:
     min_log_pos_per_file = get_min_log_pos_per_log_file(binlog_streams_map, state)
 
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             cur.execute("SHOW BINARY LOGS")
 
@@ -427,120 +349,68 @@ def calculate_bookmark(mysql_conn, binlog_streams_map, state) -> Tuple[str, int]
             raise Exception("Unable to replicate binlog stream because no binary logs exist on the server.")
 
 
-def update_bookmarks(
-        state: Dict,
-        binlog_streams_map: Dict,
-        log_file: str,
-        log_pos: int,
-        gtid: Optional[str]) -> Dict:
-    """
-    Updates the state bookmarks with the given binlog file & position or GTID
-    Args:
-        state: state to update
-        binlog_streams_map: dictionary of log based streams
-        log_file: new binlog file
-        log_pos: new binlog pos
-        gtid: new gtid pos
-
-    Returns: updated state
-    """
-    LOGGER.debug('Updating state bookmark to binlog file and pos and GTID: %s, %d, %s', log_file, log_pos, gtid)
-
-    if log_file and not log_pos:
-        raise ValueError("binlog_file is present but binlog_pos is null! Please provide a binlog position "
-                         "to properly update the state")
-
-    for tap_stream_id in binlog_streams_map.keys():
-        state = singer.write_bookmark(state,
-                                      tap_stream_id,
-                                      'log_file',
-                                      log_file)
-
-        state = singer.write_bookmark(state,
-                                      tap_stream_id,
-                                      'log_pos',
-                                      log_pos)
-
-        # update gtid only if it's not null
-        if gtid:
-            state = singer.write_bookmark(state,
-                                          tap_stream_id,
-                                          'gtid',
-                                          gtid)
-
-    return state
-
-
-def get_db_column_types(event):
-    return {c.name: c.type for c in event.columns}
+def handle_write_rows_event(event, row_converter: BinlogRowConverter, rows_saved, time_extracted,
+                            record_writer: RecordWriter):
+    rows = [row['values'] for row in event.rows]
+    record_writer.write_records(row_converter, rows, time_extracted)
 
+    return rows_saved + len(rows)
 
-def handle_write_rows_event(event, catalog_entry, state, columns, rows_saved, time_extracted):
-    stream_version = common.get_stream_version(catalog_entry.tap_stream_id, state)
-    db_column_types = get_db_column_types(event)
 
-    for row in event.rows:
-        filtered_vals = {k: v for k, v in row['values'].items()
-                         if k in columns}
-
-        record_message = row_to_singer_record(catalog_entry,
-                                              stream_version,
-                                              db_column_types,
-                                              filtered_vals,
-                                              time_extracted)
+def handle_update_rows_event(event, row_converter: BinlogRowConverter, rows_saved, time_extracted,
+                             record_writer: RecordWriter):
+    rows = [row['after_values'] for row in event.rows]
+    record_writer.write_records(row_converter, rows, time_extracted)
 
-        singer.write_message(record_message)
-        rows_saved += 1
+    return rows_saved + len(rows)
 
-    return rows_saved
 
+def handle_delete_rows_event(event, row_converter: BinlogRowConverter, rows_saved, time_extracted,
+                             record_writer: RecordWriter):
+    event_ts = datetime.datetime.utcfromtimestamp(event.timestamp) \
+        .replace(tzinfo=pytz.UTC).isoformat()
 
-def handle_update_rows_event(event, catalog_entry, state, columns, rows_saved, time_extracted):
-    stream_version = common.get_stream_version(catalog_entry.tap_stream_id, state)
-    db_column_types = get_db_column_types(event)
+    rows = []
 
     for row in event.rows:
-        filtered_vals = {k: v for k, v in row['after_values'].items()
-                         if k in columns}
-
-        record_message = row_to_singer_record(catalog_entry,
-                                              stream_version,
-                                              db_column_types,
-                                              filtered_vals,
-                                              time_extracted)
-
-        singer.write_message(record_message)
-
-        rows_saved += 1
+        vals = row['values']
+        vals[SDC_DELETED_AT] = event_ts
+        rows.append(vals)
 
-    return rows_saved
+    record_writer.write_records(row_converter, rows, time_extracted)
 
+    return rows_saved + len(rows)
 
-def handle_delete_rows_event(event, catalog_entry, state, columns, rows_saved, time_extracted):
-    stream_version = common.get_stream_version(catalog_entry.tap_stream_id, state)
-    db_column_types = get_db_column_types(event)
 
-    event_ts = datetime.datetime.utcfromtimestamp(event.timestamp) \
-        .replace(tzinfo=pytz.UTC).isoformat()
-
-    for row in event.rows:
-        vals = row['values']
-        vals[SDC_DELETED_AT] = event_ts
+def get_row_converter(table_map: TableMap,
+                      catalog_entry,
+                      columns,
+                      state: Dict,
+                      row_converters: Dict,
+                      timezone) -> BinlogRowConverter:
+    """
+    Returns the row converter of the table map for the current schema of the stream. Converters are cached by
+    stream and column types, so that one is compiled again only when the table or its schema changed.
+    """
+    row_converter = table_map.row_converter
 
-        filtered_vals = {k: v for k, v in vals.items()
-                         if k in columns}
+    if row_converter is not None and row_converter.catalog_entry is catalog_entry:
+        return row_converter
 
-        record_message = row_to_singer_record(catalog_entry,
-                                              stream_version,
-                                              db_column_types,
-                                              filtered_vals,
-                                              time_extracted)
+    key = (table_map.tap_stream_id, table_map.columns, table_map.column_types)
+    row_converter = row_converters.get(key)
 
-        singer.write_message(record_message)
+    if row_converter is None or row_converter.catalog_entry is not catalog_entry:
+        row_converter = row_converters[key] = BinlogRowConverter(catalog_entry,
+                                                                 common.get_stream_version(
+                                                                     catalog_entry.tap_stream_id, state),
+                                                                 columns,
+                                                                 dict(zip(table_map.columns, table_map.column_types)),
+                                                                 timezone)
 
-        rows_saved += 1
+    table_map.row_converter = row_converter
 
-    return rows_saved
+    return row_converter
 
 
 def generate_streams_map(binlog_streams):
@@ -558,7 +428,7 @@ def generate_streams_map(binlog_streams):
     return stream_map
 
 
-def __get_diff_in_columns_list(
+def _get_diff_in_columns_list(
         binlog_event: Union[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent],
         schema_properties: Set[str],
         ignore_columns: Optional[Set[str]] = None) -> Set[str]:
@@ -588,39 +458,263 @@ def __get_diff_in_columns_list(
     return set(binlog_columns_filtered).difference(schema_properties)
 
 
-# pylint: disable=R1702,R0915
+def rediscover_stream(mysql_conn: MySQLConnection,
+                      config: Dict,
+                      binlog_streams_map: Dict,
+                      tap_stream_id: str,
+                      record_writer: RecordWriter) -> bool:
+    """
+    Discovers the table of the stream again and, if its schema changed, writes the new SCHEMA message and
+    updates the catalog entry and desired columns of the stream in binlog_streams_map
+
+    Returns: True if the schema changed
+    """
+    catalog_entry = binlog_streams_map[tap_stream_id]['catalog_entry']
+
+    LOGGER.info('Stream `%s`: Running discovery ... ', tap_stream_id)
+
+    # run discovery for the current table only
+    discovered_streams = discover_catalog(
+        mysql_conn,
+        config.get('filter_dbs'),
+        schema_tables=[(common.get_database_name(catalog_entry), catalog_entry.table)]
+    ).streams
+
+    if not discovered_streams:
+        LOGGER.warning('Stream `%s`: Table not found, keeping its schema', tap_stream_id)
+        return False
+
+    new_catalog_entry = discovered_streams[0]
+
+    selected = {k for k, v in new_catalog_entry.schema.properties.items()
+                if common.property_is_selected(new_catalog_entry, k)}
+
+    # the new catalog has "stream" property = table name, we need to update that to make it the
+    # same as the result of the "resolve_catalog" function
+    new_catalog_entry.stream = tap_stream_id
+
+    # These are the columns we need to select
+    new_columns = desired_columns(selected, new_catalog_entry.schema)
+
+    cols = set(new_catalog_entry.schema.properties.keys())
+
+    # drop unsupported properties from schema
+    for col in cols:
+        if col not in new_columns:
+            new_catalog_entry.schema.properties.pop(col, None)
+
+    # Add the _sdc_deleted_at col
+    new_columns = add_automatic_properties(new_catalog_entry, list(new_columns))
+
+    # send the new scheme to target if we have a new schema, after the records of the old one
+    if new_catalog_entry.schema.properties == catalog_entry.schema.properties:
+        return False
+
+    record_writer.flush()
+    write_schema_message(catalog_entry=new_catalog_entry)
+
+    # update this dictionary while we're at it, and the compiled metadata of the stream
+    compile_stream(new_catalog_entry)
+    binlog_streams_map[tap_stream_id]['catalog_entry'] = new_catalog_entry
+    binlog_streams_map[tap_stream_id]['desired_columns'] = new_columns
+
+    return True
+
+
+class BinlogEventHandler:
+    """
+    Handles the binlog events of the sync other than heartbeats: keeps the bookmarks and the columns of the
+    replicated tables up to date, and writes the records of the row events of the synced streams
+    """
+
+    def __init__(self,
+                 mysql_conn: MySQLConnection,
+                 config: Dict,
+                 binlog_streams_map: Dict,
+                 state: Dict,
+                 record_writer: RecordWriter):
+        self.binlog_streams_map = binlog_streams_map
+        self.state = state
+        self.record_writer = record_writer
+        self.rediscover = functools.partial(rediscover_stream, mysql_conn, config, binlog_streams_map,
+                                            record_writer=record_writer)
+
+        # Columns of the table maps, so that the columns of the events are only compared to the schema when they
+        # change
+        self.schema_cache = BinlogSchemaCache()
+
+        # TIMESTAMP values are converted from the local timezone
+        self.timezone = tzlocal.get_localzone()
+
+        # rows written and events skipped so far
+        self.counts = collections.Counter()
+
+    def handle_event(self, binlog_event, checkpoints: BinlogCheckpoints, continuous: bool) -> int:
+        """
+        Returns the rows the event counts for in the checkpoint policy
+        """
+        if isinstance(binlog_event, RotateEvent):
+            LOGGER.debug('RotateEvent: log_file=%s, log_pos=%d',
+                         binlog_event.next_binlog,
+                         binlog_event.position)
+
+            update_bookmarks(self.state,
+                             self.binlog_streams_map,
+                             binlog_event.next_binlog,
+                             binlog_event.position,
+                             checkpoints.gtid_pos)
+
+        elif isinstance(binlog_event, (MariadbGtidEvent, GtidEvent)):
+            LOGGER.debug('%s: gtid=%s',
+                         binlog_event.__class__.__name__,
+                         checkpoints.gtid_pos)
+
+            update_bookmarks(self.state,
+                             self.binlog_streams_map,
+                             checkpoints.log_file,
+                             checkpoints.log_pos,
+                             checkpoints.gtid_pos)
+
+        elif isinstance(binlog_event, XidEvent):
+            LOGGER.debug('XidEvent: xid=%s', binlog_event.xid)
+
+        elif isinstance(binlog_event, TableMapEvent):
+            if common.generate_tap_stream_id(binlog_event.schema, binlog_event.table) in self.binlog_streams_map:
+                self.schema_cache.get_columns(binlog_event)
+
+        elif isinstance(binlog_event, QueryEvent):
+            altered_stream = self.schema_cache.on_query(binlog_event, checkpoints.log_file, checkpoints.log_pos)
+
+            # continuous syncs aren't restarted, so tables are discovered again when they are altered
+            if continuous and altered_stream in self.binlog_streams_map:
+                self.rediscover(altered_stream)
+
+        else:
+            return self.handle_rows_event(binlog_event)
+
+        return 0
+
+    def handle_rows_event(self, binlog_event) -> int:
+        """
+        Writes the records of a row event of a synced stream. Returns the rows the event counts for in the
+        checkpoint policy: skipped events count as one row each, and rows compacted into buffered ones don't count,
+        the rows buffered being bounded by the checkpoint instead.
+        """
+        time_extracted = utils.now()
+
+        tap_stream_id = common.generate_tap_stream_id(binlog_event.schema, binlog_event.table)
+        streams_map_entry = self.binlog_streams_map.get(tap_stream_id, {})
+        catalog_entry = streams_map_entry.get('catalog_entry')
+
+        if not catalog_entry:
+            self.counts['events_skipped'] += 1
+
+            if self.counts['events_skipped'] % UPDATE_BOOKMARK_PERIOD == 0:
+                LOGGER.debug("Skipped %s events so far as they were not for selected tables; %s rows extracted",
+                             self.counts['events_skipped'],
+                             self.counts['rows'])
+
+            return 1
+
+        table_map = self.schema_cache.get_table_map(binlog_event)
+
+        # Compare event's columns to the schema properties, unless they already were for this table map and schema
+        if not self.schema_cache.is_checked(tap_stream_id, table_map.columns, catalog_entry):
+            diff = _get_diff_in_columns_list(binlog_event,
+                                             catalog_entry.schema.properties.keys(),
+                                             self.schema_cache.ignored_columns)
+
+            # If there are additional cols in the event then run discovery if needed and update the catalog
+            if diff:
+                LOGGER.info('Stream `%s`: Difference detected between event and schema: %s', tap_stream_id, diff)
+
+                if not should_run_discovery(diff, metadata.to_map(catalog_entry.metadata)):
+                    LOGGER.info('Stream `%s`: Not running discovery. Ignoring all detected columns in %s',
+                                tap_stream_id,
+                                diff)
+                    self.schema_cache.ignored_columns.update(diff)
+
+                else:
+                    self.rediscover(tap_stream_id)
+
+                    catalog_entry = streams_map_entry['catalog_entry']
+
+            self.schema_cache.mark_checked(tap_stream_id, table_map.columns, catalog_entry)
+
+        if isinstance(binlog_event, WriteRowsEvent):
+            handle_rows = handle_write_rows_event
+
+        elif isinstance(binlog_event, UpdateRowsEvent):
+            handle_rows = handle_update_rows_event
+
+        elif isinstance(binlog_event, DeleteRowsEvent):
+            handle_rows = handle_delete_rows_event
+
+        else:
+            LOGGER.debug("Skipping event for table %s.%s as it is not an INSERT, UPDATE, or DELETE",
+                         binlog_event.schema,
+                         binlog_event.table)
+            return 0
+
+        row_converter = get_row_converter(table_map, catalog_entry, streams_map_entry['desired_columns'], self.state,
+                                          self.schema_cache.row_converters, self.timezone)
+
+        buffered_rows = self.record_writer.buffered_rows
+        rows = handle_rows(binlog_event, row_converter, 0, time_extracted, self.record_writer)
+        self.counts['rows'] += rows
+
+        if isinstance(self.record_writer, CompactingRecordWriter):
+            return max(self.record_writer.buffered_rows - buffered_rows, 0)
+
+        return rows
+
+
 def _run_binlog_sync(
         mysql_conn: MySQLConnection,
         reader: BinLogStreamReader,
         binlog_streams_map: Dict,
         state: Dict,
         config: Dict,
-        end_log_file: str,
-        end_log_pos: int):
-
-    processed_rows_events = 0
-    events_skipped = 0
+        end_log_file: Optional[str],
+        end_log_pos: Optional[int],
+        record_writer: RecordWriter,
+        stop: Optional[threading.Event] = None):
+    """
+    Syncs the binlog events up to the end position or, without one, continuously until stop is set
+    """
+    continuous = end_log_file is None
 
-    log_file = None
-    log_pos = None
-    gtid_pos = reader.auto_position  # initial gtid, we set this when we created the reader's instance
+    if continuous:
+        config = binlog_continuous.get_checkpoint_config(config)
 
-    # A set to hold all columns that are detected as we sync but should be ignored cuz they are unsupported types.
-    # Saving them here to avoid doing the check if we should ignore a column over and over again
-    ignored_columns = set()
+    # initial gtid, we set this when we created the reader's instance
+    checkpoints = BinlogCheckpoints(common.CheckpointPolicy(config), record_writer, binlog_streams_map,
+                                    reader.auto_position)
+    event_handler = BinlogEventHandler(mysql_conn, config, binlog_streams_map, state, record_writer)
 
     # Exit from the loop when the reader either runs out of streams to return or we reach
-    # the end position (which is Master's)
-    for binlog_event in reader:
+    # the end position (which is Master's), or when stopped
+    for binlog_event, log_file, log_pos in record_writer.iter_events(reader):
+        if stop is not None and stop.is_set() and not checkpoints.in_transaction:
+            LOGGER.info('Stopping the binlog sync')
+            break
 
-        # get reader current binlog file and position
-        log_file = reader.log_file
-        log_pos = reader.log_pos
+        if isinstance(binlog_event, HeartbeatLogEvent):
+            # the server is idle: write the records batched so far and keep emitting STATE on time, at the position
+            # the reader is at, past the events it filtered out
+            record_writer.idle()
+            checkpoints.advance_to(log_file, log_pos)
+
+            if checkpoints.add(0):
+                state = checkpoints.write(state)
+
+            continue
 
         # The iterator across python-mysql-replication's fetchone method should ultimately terminate
         # upon receiving an EOF packet. There seem to be some cases when a MySQL server will not send
         # one causing binlog replication to hang.
-        if (log_file > end_log_file) or (end_log_file == log_file and log_pos >= end_log_pos):
+        if not continuous and (
+                (log_file > end_log_file) or (end_log_file == log_file and log_pos >= end_log_pos)):
             LOGGER.info('BinLog reader (file: %s, pos:%s) has reached or exceeded end position, exiting!',
                         log_file,
                         log_pos)
@@ -629,170 +723,35 @@ def _run_binlog_sync(
             # binlog file and position above, making the latter behind the stream reader and it causes some data loss
             # in the next run by skipping everything between end_log_file and log_pos
             # so we need to update log_pos back to master's position
-            log_file = end_log_file
-            log_pos = end_log_pos
+            checkpoints.move_to(end_log_file, end_log_pos)
 
             break
 
-        if isinstance(binlog_event, RotateEvent):
-            LOGGER.debug('RotateEvent: log_file=%s, log_pos=%d',
-                         binlog_event.next_binlog,
-                         binlog_event.position)
-
-            state = update_bookmarks(state,
-                                     binlog_streams_map,
-                                     binlog_event.next_binlog,
-                                     binlog_event.position,
-                                     gtid_pos
-                                     )
-
-        elif isinstance(binlog_event, (MariadbGtidEvent, GtidEvent)):
-            gtid_pos = binlog_event.gtid
-
-            LOGGER.debug('%s: gtid=%s',
-                         binlog_event.__class__.__name__,
-                         gtid_pos)
-
-            state = update_bookmarks(state,
-                                     binlog_streams_map,
-                                     log_file,
-                                     log_pos,
-                                     gtid_pos
-                                     )
-
-            # There is strange behavior happening when using GTID in the pymysqlreplication lib,
-            # explained here: https://github.com/noplay/python-mysql-replication/issues/367
-            # Fix: Updating the reader's auto-position to the newly encountered gtid means we won't have to restart
-            # consuming binlog from old GTID pos when connection to server is lost.
-            reader.auto_position = gtid_pos
-
-        else:
-            time_extracted = utils.now()
+        # get reader current binlog file and position
+        checkpoints.move_to(log_file, log_pos)
+        checkpoints.on_event(binlog_event)
 
-            tap_stream_id = common.generate_tap_stream_id(binlog_event.schema, binlog_event.table)
-            streams_map_entry = binlog_streams_map.get(tap_stream_id, {})
-            catalog_entry = streams_map_entry.get('catalog_entry')
-            columns = streams_map_entry.get('desired_columns')
+        # Update singer bookmark and send STATE message periodically at the end of a transaction
+        if checkpoints.add(event_handler.handle_event(binlog_event, checkpoints, continuous),
+                           getattr(binlog_event, 'event_size', 0)):
+            state = checkpoints.write(state)
 
-            if not catalog_entry:
-                events_skipped += 1
+    else:
+        # the reader ran out of events, the last ones may have been filtered out by the reader
+        checkpoints.advance_to(reader.log_file, reader.log_pos)
 
-                if events_skipped % UPDATE_BOOKMARK_PERIOD == 0:
-                    LOGGER.debug("Skipped %s events so far as they were not for selected tables; %s rows extracted",
-                                 events_skipped,
-                                 processed_rows_events)
-            else:
-                # Compare event's columns to the schema properties
-                diff = __get_diff_in_columns_list(binlog_event,
-                                                  catalog_entry.schema.properties.keys(),
-                                                  ignored_columns)
-
-                # If there are additional cols in the event then run discovery if needed and update the catalog
-                if diff:
-
-                    LOGGER.info('Stream `%s`: Difference detected between event and schema: %s', tap_stream_id, diff)
-
-                    md_map = metadata.to_map(catalog_entry.metadata)
-
-                    if not should_run_discovery(diff, md_map):
-                        LOGGER.info('Stream `%s`: Not running discovery. Ignoring all detected columns in %s',
-                                    tap_stream_id,
-                                    diff)
-                        ignored_columns = ignored_columns.union(diff)
-
-                    else:
-                        LOGGER.info('Stream `%s`: Running discovery ... ', tap_stream_id)
-
-                        # run discovery for the current table only
-                        new_catalog_entry = discover_catalog(mysql_conn,
-                                                             config.get('filter_dbs'),
-                                                             catalog_entry.table).streams[0]
-
-                        selected = {k for k, v in new_catalog_entry.schema.properties.items()
-                                    if common.property_is_selected(new_catalog_entry, k)}
-
-                        # the new catalog has "stream" property = table name, we need to update that to make it the
-                        # same as the result of the "resolve_catalog" function
-                        new_catalog_entry.stream = tap_stream_id
-
-                        # These are the columns we need to select
-                        new_columns = desired_columns(selected, new_catalog_entry.schema)
-
-                        cols = set(new_catalog_entry.schema.properties.keys())
-
-                        # drop unsupported properties from schema
-                        for col in cols:
-                            if col not in new_columns:
-                                new_catalog_entry.schema.properties.pop(col, None)
-
-                        # Add the _sdc_deleted_at col
-                        new_columns = add_automatic_properties(new_catalog_entry, list(new_columns))
-
-                        # send the new scheme to target if we have a new schema
-                        if new_catalog_entry.schema.properties != catalog_entry.schema.properties:
-                            write_schema_message(catalog_entry=new_catalog_entry)
-                            catalog_entry = new_catalog_entry
-
-                            # update this dictionary while we're at it
-                            binlog_streams_map[tap_stream_id]['catalog_entry'] = new_catalog_entry
-                            binlog_streams_map[tap_stream_id]['desired_columns'] = new_columns
-                            columns = new_columns
-
-                if isinstance(binlog_event, WriteRowsEvent):
-                    processed_rows_events = handle_write_rows_event(binlog_event,
-                                                                    catalog_entry,
-                                                                    state,
-                                                                    columns,
-                                                                    processed_rows_events,
-                                                                    time_extracted)
-
-                elif isinstance(binlog_event, UpdateRowsEvent):
-                    processed_rows_events = handle_update_rows_event(binlog_event,
-                                                                     catalog_entry,
-                                                                     state,
-                                                                     columns,
-                                                                     processed_rows_events,
-                                                                     time_extracted)
-
-                elif isinstance(binlog_event, DeleteRowsEvent):
-                    processed_rows_events = handle_delete_rows_event(binlog_event,
-                                                                     catalog_entry,
-                                                                     state,
-                                                                     columns,
-                                                                     processed_rows_events,
-                                                                     time_extracted)
-                else:
-                    LOGGER.debug("Skipping event for table %s.%s as it is not an INSERT, UPDATE, or DELETE",
-                                 binlog_event.schema,
-                                 binlog_event.table)
-
-        # Update singer bookmark and send STATE message periodically
-        if ((processed_rows_events and processed_rows_events % UPDATE_BOOKMARK_PERIOD == 0) or
-                (events_skipped and events_skipped % UPDATE_BOOKMARK_PERIOD == 0)):
-            state = update_bookmarks(state,
-                                     binlog_streams_map,
-                                     log_file,
-                                     log_pos,
-                                     gtid_pos
-                                     )
-            singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
-
-    LOGGER.info('Processed %s rows', processed_rows_events)
+    LOGGER.info('Processed %s rows', event_handler.counts['rows'])
 
     # Update singer bookmark at the last time to point it the last processed binlog event
-    if log_file and log_pos:
-        state = update_bookmarks(state,
-                                 binlog_streams_map,
-                                 log_file,
-                                 log_pos,
-                                 gtid_pos)
+    checkpoints.update_bookmarks(state)
 
 
 def create_binlog_stream_reader(
         config: Dict,
         log_file: Optional[str],
         log_pos: Optional[int],
-        gtid_pos: Optional[str]
+        gtid_pos: Optional[str],
+        tables: Optional[Iterable[Tuple[str, str]]] = None
 ) -> BinLogStreamReader:
     """
     Create an instance of BinlogStreamReader with the right config
@@ -802,6 +761,7 @@ def create_binlog_stream_reader(
         log_file: binlog file name to start replication from (Optional if using gtid)
         log_pos: binlog pos to start replication from (Optional if using gtid)
         gtid_pos: GTID pos to start replication from (Optional if using log_file & pos)
+        tables: (schema, table) pairs of the replicated tables, the rows of the other tables are not decoded
 
     Returns: Instance of BinlogStreamReader
     """
@@ -820,13 +780,30 @@ def create_binlog_stream_reader(
         'is_mariadb': connection.MARIADB_ENGINE == engine,
         'server_id': server_id,  # slave server ID
         'report_slave': socket.gethostname() or 'pipelinewise',  # this is so this slave appears in SHOW SLAVE HOSTS;
-        'only_events': [WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent],
+        # table maps and DDL statements keep the columns of the replicated tables up to date, and the sync
+        # checkpoints at the commits of transactions
+        'only_events': [WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, TableMapEvent, QueryEvent, XidEvent],
     }
 
+    # continuous syncs wait for new events, the server sending heartbeats when there are none
+    if binlog_continuous.is_continuous(config):
+        kwargs['blocking'] = True
+        kwargs['slave_heartbeat'] = binlog_continuous.get_heartbeat_seconds(config)
+        kwargs['only_events'].append(HeartbeatLogEvent)
+
     # only fetch events pertaining to the schemas in filter db.
     if config.get('filter_dbs'):
         kwargs['only_schemas'] = config['filter_dbs'].split(',')
 
+    # only decode the rows of the replicated tables. The reader filters tables by name only, so a table of the
+    # same name in another of the schemas still gets decoded, and is skipped by the sync.
+    if tables:
+        tables = set(tables)
+        kwargs['only_tables'] = sorted({table for _, table in tables})
+
+        if 'only_schemas' not in kwargs:
+            kwargs['only_schemas'] = sorted({schema for schema, _ in tables})
+
     if config['use_gtid']:
 
         if not gtid_pos:
@@ -861,7 +838,8 @@ def sync_binlog_stream(
         state: Dict) -> None:
     """
     Capture the binlog events created between the pos in the state and current Master position and creates Singer
-    streams to be flushed to stdout
+    streams to be flushed to stdout. With binlog_continuous, the events keep being captured as they are created,
+    until the tap is interrupted or terminated.
     Args:
         mysql_conn: mysql connection instance
         config: tap config
@@ -879,19 +857,43 @@ def sync_binlog_stream(
         log_file, log_pos = calculate_bookmark(mysql_conn, binlog_streams_map, state)
 
     reader = None
+    record_writer = get_record_writer(config)
 
     try:
-        reader = create_binlog_stream_reader(config, log_file, log_pos, gtid)
+        reader = create_binlog_stream_reader(config,
+                                             log_file,
+                                             log_pos,
+                                             gtid,
+                                             [(common.get_database_name(stream['catalog_entry']),
+                                               stream['catalog_entry'].table)
+                                              for stream in binlog_streams_map.values()])
+
+        if binlog_continuous.is_continuous(config):
+            with binlog_continuous.stop_on_signals() as stop:
+                LOGGER.info('Syncing binlog continuously')
+                _run_binlog_sync(mysql_conn, reader, binlog_streams_map, state, config, None, None, record_writer,
+                                 stop)
+        else:
+            end_log_file, end_log_pos = fetch_current_log_file_and_pos(mysql_conn)
+            LOGGER.info('Current Master binlog file and pos: %s %s', end_log_file, end_log_pos)
 
-        end_log_file, end_log_pos = fetch_current_log_file_and_pos(mysql_conn)
-        LOGGER.info('Current Master binlog file and pos: %s %s', end_log_file, end_log_pos)
+            _run_binlog_sync(mysql_conn,
+                             reader,
+                             binlog_streams_map,
+                             state,
+                             config,
+                             end_log_file,
+                             end_log_pos,
+                             record_writer)
 
-        _run_binlog_sync(mysql_conn, reader, binlog_streams_map, state, config, end_log_file, end_log_pos)
+        record_writer.flush()
 
     finally:
+        record_writer.close()
+
         # BinLogStreamReader doesn't implement the `with` methods
         # So, try/finally will close the chain from the top
         if reader:
             reader.close()
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    common.write_state_message(state, binlog_streams_map.keys())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Checkpoints of the binlog sync
+
+The bookmarks of the binlog streams are the binlog file and position, or GTID, of the last synced event. STATE
+messages are only written in between transactions, so that a resumed sync never replays part of one, and once the
+checkpoint policy or the compaction window says a checkpoint is due.
+"""
+import re
+
+from typing import Dict, Optional
+
+import singer
+
+from pymysqlreplication.event import GtidEvent, MariadbGtidEvent, QueryEvent, XidEvent
+
+from tap_mysql.sync_strategies.binlog_pipeline import RecordWriter
+from tap_mysql.sync_strategies.common import CheckpointPolicy
+
+LOGGER = singer.get_logger('tap_mysql')
+
+# Flag of the MariaDB GTID events of statements outside a BEGIN ... COMMIT transaction, e.g. DDL ones
+MARIADB_GTID_STANDALONE = 0x01
+
+# Statements that are transactions of their own, as they implicitly commit, e.g. DDL ones. Other statements, e.g.
+# SAVEPOINT, don't end the transaction they are part of.
+IMPLICIT_COMMIT_RE = re.compile(
+    r'^(?:ALTER|CREATE|DROP|RENAME|TRUNCATE|GRANT|REVOKE|ANALYZE|OPTIMIZE|REPAIR|FLUSH)\b')
+
+
+class TransactionTracker:  # pylint: disable=too-few-public-methods
+    """
+    Follows the transactions of the binlog events, so that the sync only checkpoints and stops in between them.
+
+    A transaction starts with its GTID event or a BEGIN statement, and ends with its XidEvent, a COMMIT or ROLLBACK
+    statement or, without BEGIN, with a statement that implicitly commits, e.g. a DDL one. MariaDB writes no BEGIN
+    statement after the GTID event of a transaction, unless the event is flagged standalone.
+    """
+    __slots__ = ('in_transaction', 'began')
+
+    def __init__(self):
+        self.in_transaction = False
+        self.began = False
+
+    def on_event(self, binlog_event) -> bool:
+        """
+        Returns True if the event ended a transaction
+        """
+        in_transaction = self.in_transaction
+
+        if isinstance(binlog_event, MariadbGtidEvent):
+            self.in_transaction = True
+            self.began = not getattr(binlog_event, 'flags', MARIADB_GTID_STANDALONE) & MARIADB_GTID_STANDALONE
+
+        elif isinstance(binlog_event, GtidEvent):
+            self.in_transaction = True
+            self.began = False
+
+        elif isinstance(binlog_event, XidEvent):
+            self.in_transaction = self.began = False
+
+        elif isinstance(binlog_event, QueryEvent):
+            statement = binlog_event.query.strip().rstrip(';').upper()
+
+            if statement == 'BEGIN':
+                self.in_transaction = self.began = True
+
+            elif statement in ('COMMIT', 'ROLLBACK') or (not self.began and IMPLICIT_COMMIT_RE.match(statement)):
+                self.in_transaction = self.began = False
+
+        return in_transaction and not self.in_transaction
+
+
+def update_bookmarks(
+        state: Dict,
+        binlog_streams_map: Dict,
+        log_file: str,
+        log_pos: int,
+        gtid: Optional[str]) -> Dict:
+    """
+    Updates the state bookmarks with the given binlog file & position or GTID
+    Args:
+        state: state to update
+        binlog_streams_map: dictionary of log based streams
+        log_file: new binlog file
+        log_pos: new binlog pos
+        gtid: new gtid pos
+
+    Returns: updated state
+    """
+    LOGGER.debug('Updating state bookmark to binlog file and pos and GTID: %s, %d, %s', log_file, log_pos, gtid)
+
+    if log_file and not log_pos:
+        raise ValueError("binlog_file is present but binlog_pos is null! Please provide a binlog position "
+                         "to properly update the state")
+
+    for tap_stream_id in binlog_streams_map.keys():
+        state = singer.write_bookmark(state,
+                                      tap_stream_id,
+                                      'log_file',
+                                      log_file)
+
+        state = singer.write_bookmark(state,
+                                      tap_stream_id,
+                                      'log_pos',
+                                      log_pos)
+
+        # update gtid only if it's not null
+        if gtid:
+            state = singer.write_bookmark(state,
+                                          tap_stream_id,
+                                          'gtid',
+                                          gtid)
+
+    return state
+
+
+class BinlogCheckpoints:
+    """
+    Position of the last synced binlog event, and the checkpoints of the binlog sync at that position
+
+    Args:
+        checkpoint_policy: policy of the checkpoints of the sync
+        record_writer: writer of the records and STATE messages of the sync
+        binlog_streams_map: streams synced from the binlog
+        gtid_pos: GTID the sync started from, if any
+    """
+    __slots__ = ('checkpoint_policy', 'transaction_tracker', 'record_writer', 'binlog_streams_map',
+                 'log_file', 'log_pos', 'gtid_pos')
+
+    def __init__(self,
+                 checkpoint_policy: CheckpointPolicy,
+                 record_writer: RecordWriter,
+                 binlog_streams_map: Dict,
+                 gtid_pos: Optional[str] = None):
+        self.checkpoint_policy = checkpoint_policy
+        self.transaction_tracker = TransactionTracker()
+        self.record_writer = record_writer
+        self.binlog_streams_map = binlog_streams_map
+
+        self.log_file = None
+        self.log_pos = None
+        self.gtid_pos = gtid_pos
+
+    @property
+    def in_transaction(self) -> bool:
+        """
+        Returns True in the middle of a transaction, when no checkpoint can be written
+        """
+        return self.transaction_tracker.in_transaction
+
+    def move_to(self, log_file: str, log_pos: int):
+        """
+        Sets the binlog file and position of the last synced event
+        """
+        self.log_file = log_file
+        self.log_pos = log_pos
+
+    def advance_to(self, log_file: Optional[str], log_pos: Optional[int]):
+        """
+        Moves the position forward to the one of the reader, past the events the reader filtered out, e.g. the
+        ones of the tables not replicated, which never reach the sync. The position stays where it is in the
+        middle of a transaction.
+        """
+        if not log_file or not log_pos or self.in_transaction:
+            return
+
+        if self.log_file is None or (log_file, log_pos) > (self.log_file, self.log_pos):
+            self.move_to(log_file, log_pos)
+
+    def on_event(self, binlog_event):
+        """
+        Follows the GTID and the transactions of the event
+        """
+        if isinstance(binlog_event, (MariadbGtidEvent, GtidEvent)):
+            self.gtid_pos = binlog_event.gtid
+
+        if self.transaction_tracker.on_event(binlog_event):
+            self.record_writer.end_transaction()
+
+    def add(self, rows: int, size: int = 0) -> bool:
+        """
+        Counts the rows and bytes of an event, returns True if a checkpoint is due and can be written
+        """
+        checkpoint_due = self.checkpoint_policy.add(rows, size) or self.record_writer.is_window_closed()
+
+        return checkpoint_due and not self.in_transaction
+
+    def update_bookmarks(self, state: Dict) -> Dict:
+        """
+        Updates the bookmarks to the last synced event, if any
+        """
+        if self.log_file and self.log_pos:
+            state = update_bookmarks(state, self.binlog_streams_map, self.log_file, self.log_pos, self.gtid_pos)
+
+        return state
+
+    def write(self, state: Dict) -> Dict:
+        """
+        Updates the bookmarks to the last synced event, if any, and writes a STATE message after its records
+        """
+        state = self.update_bookmarks(state)
+
+        self.record_writer.write_state(state, self.binlog_streams_map.keys())
+        self.checkpoint_policy.reset()
+
+        return state
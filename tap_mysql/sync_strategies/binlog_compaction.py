@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+Compaction of the binlog records
+
+Hot rows, like counters or status columns, can be changed many times in a short while, and every change is a row
+event whose record the target has to upsert. When compaction is enabled, the records are buffered instead, keyed by
+stream and primary key, and only the last image of every row is written at the end of the compaction window or at
+the next checkpoint, whichever comes first. The images are written in the binlog order of their last change, and
+a delete replaces every earlier image of its row, so it is never compacted away.
+
+Checkpoints only happen in between transactions, so the buffered records are also written, without a STATE message,
+once too many rows are buffered, e.g. in the middle of a bulk UPDATE.
+"""
+import collections
+import time
+
+from typing import Dict, Iterable, Iterator, Tuple
+
+import singer
+
+from tap_mysql.sync_strategies.binlog_pipeline import RecordWriter
+
+LOGGER = singer.get_logger('tap_mysql')
+
+# Distinct rows buffered before they are written, even in the middle of a transaction
+DEFAULT_COMPACTION_MAX_ROWS = 100000
+
+
+class CompactingRecordWriter(RecordWriter):
+    """
+    Buffers the records of the binlog sync by stream and primary key, and writes the last image of every row
+    through record_writer, before every STATE message and once the window is closed.
+
+    Args:
+        record_writer: writer of the compacted records
+        window_seconds: seconds after the first buffered record the window closes, 0 for no time limit
+        window_transactions: transactions committed after which the window closes, 0 for no limit
+        max_rows: distinct rows buffered after which they are written, 0 for no limit
+    """
+
+    def __init__(self,
+                 record_writer: RecordWriter,
+                 window_seconds: float = 0,
+                 window_transactions: int = 0,
+                 max_rows: int = DEFAULT_COMPACTION_MAX_ROWS):
+        self.record_writer = record_writer
+        self.window_seconds = window_seconds
+        self.window_transactions = window_transactions
+        self.max_rows = max_rows
+
+        # (stream, primary key values): (row converter, values, time_extracted), in the order of their last change
+        self.records = collections.OrderedDict()
+        self.window_started = time.monotonic()
+        self.transactions = 0
+
+    @property
+    def buffered_rows(self) -> int:
+        return len(self.records)
+
+    def iter_events(self, reader) -> Iterator[Tuple]:
+        return self.record_writer.iter_events(reader)
+
+    def write_records(self, row_converter, rows: Iterable[Dict], time_extracted):
+        key_columns = row_converter.key_columns
+
+        if not self.records:
+            self.window_started = time.monotonic()
+
+        for values in rows:
+            if key_columns:
+                key = (row_converter.stream, tuple(values.get(column) for column in key_columns))
+
+                # the image moves to the position of its last change
+                self.records.pop(key, None)
+            else:
+                # the rows of tables without primary key are all written, under keys of their own
+                key = (row_converter.stream, object())
+
+            self.records[key] = (row_converter, values, time_extracted)
+
+        if self.max_rows and len(self.records) >= self.max_rows:
+            LOGGER.info('%s distinct rows buffered, writing them before the end of the compaction window',
+                        len(self.records))
+            self.write_buffered()
+
+    def end_transaction(self):
+        self.transactions += 1
+
+    def is_window_closed(self) -> bool:
+        if not self.records:
+            return False
+
+        return bool((self.window_transactions and self.transactions >= self.window_transactions) or
+                    (self.window_seconds and time.monotonic() - self.window_started >= self.window_seconds))
+
+    def write_buffered(self):
+        """
+        Writes the last image of every buffered row, and starts a new window
+        """
+        if self.records:
+            LOGGER.debug('Writing %s compacted records', len(self.records))
+
+        for row_converter, values, time_extracted in self.records.values():
+            self.record_writer.write_records(row_converter, [values], time_extracted)
+
+        self.records.clear()
+        self.transactions = 0
+
+    def write_state(self, state: Dict, tap_stream_ids: Iterable[str] = ()):
+        self.write_buffered()
+        self.record_writer.write_state(state, tap_stream_ids)
+
+    def idle(self):
+        # the records stay buffered until the window closes, only those already written are flushed
+        self.record_writer.idle()
+
+    def flush(self):
+        self.write_buffered()
+        self.record_writer.flush()
+
+    def close(self):
+        self.records.clear()
+        self.record_writer.close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Continuous binlog sync
+
+With binlog_continuous, the binlog sync doesn't stop at the current master position but keeps waiting for new
+events, the server sending heartbeats when there are none, until the tap is interrupted or terminated. STATE
+messages are then emitted on time rather than only at the end of the sync.
+"""
+import contextlib
+import signal
+import threading
+
+from typing import Dict, Iterator
+
+import singer
+
+LOGGER = singer.get_logger('tap_mysql')
+
+# Continuous binlog syncs ask the server for a heartbeat after this many seconds without events, and emit STATE
+# messages at least every CONTINUOUS_CHECKPOINT_SECONDS, unless configured otherwise
+DEFAULT_HEARTBEAT_SECONDS = 1
+CONTINUOUS_CHECKPOINT_SECONDS = 10
+
+
+def is_continuous(config: Dict) -> bool:
+    """
+    Returns True if the binlog sync is configured to run continuously
+    """
+    return bool(config.get('binlog_continuous'))
+
+
+def get_heartbeat_seconds(config: Dict) -> float:
+    """
+    Returns the seconds without events after which the server sends a heartbeat
+    """
+    return float(config.get('binlog_heartbeat_seconds', DEFAULT_HEARTBEAT_SECONDS))
+
+
+def get_checkpoint_config(config: Dict) -> Dict:
+    """
+    Returns the config of the checkpoints of a continuous sync, which checkpoints every
+    CONTINUOUS_CHECKPOINT_SECONDS unless configured otherwise
+    """
+    config = dict(config)
+    config.setdefault('checkpoint_interval_seconds', CONTINUOUS_CHECKPOINT_SECONDS)
+
+    return config
+
+
+@contextlib.contextmanager
+def stop_on_signals() -> Iterator[threading.Event]:
+    """
+    Yields an event set on SIGINT or SIGTERM instead of interrupting the tap, so that a continuous sync can stop
+    after the event it is syncing and emit its final STATE. Signals can only be handled by the main thread.
+    """
+    stop = threading.Event()
+
+    if threading.current_thread() is not threading.main_thread():
+        yield stop
+        return
+
+    def handler(signum, _frame):
+        LOGGER.info('Received signal %s, stopping after the current event', signum)
+        stop.set()
+
+    previous_handlers = {signum: signal.signal(signum, handler) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    try:
+        yield stop
+    finally:
+        for signum, previous_handler in previous_handlers.items():
+            signal.signal(signum, previous_handler)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+Pipelined binlog sync
+
+Decoding binlog events, converting their rows and serializing the records all compete for a single core when the
+binlog sync runs on one thread. The pipeline runs them in stages instead:
+
+* a reader thread pulls the decoded events off the replication stream into a bounded queue
+* the sync loop consumes them in binlog order, and hands the rows of consecutive row events of a table in batches
+  to a pool of worker processes, which convert and serialize them into RECORD messages
+* the batches and STATE messages are written in the order they were submitted, so a STATE message is only written
+  once every record preceding it was, and its bookmarks never go past events that were not fully written
+"""
+import collections
+import multiprocessing
+import sys
+import queue
+import threading
+import time
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import singer
+
+from pymysqlreplication.event import GtidEvent, MariadbGtidEvent
+
+from tap_mysql.sync_strategies import common
+
+LOGGER = singer.get_logger('tap_mysql')
+
+# Events read ahead of the sync loop by the reader thread
+READ_AHEAD_EVENTS = 1000
+
+# Rows of consecutive row events converted by a worker in one go
+BATCH_ROWS = 500
+
+# Seconds the rows of a batch wait for more rows before the batch is converted, which bounds the latency the
+# batching adds to continuous syncs
+MAX_BATCH_SECONDS = 0.1
+
+# Batches in flight per worker process, before the sync loop waits for the oldest one to be written
+PENDING_BATCHES_PER_WORKER = 4
+
+# The worker processes are started on the first batch, once the reader thread runs. They are spawned rather than
+# forked, as a fork could copy the locks the reader thread holds at the time, eg. of the logging or the socket.
+WORKER_START_METHOD = 'spawn'
+
+_END = object()
+
+
+def iter_events(reader) -> Iterator[Tuple]:
+    """
+    Yields the events of the reader with the binlog file and position the reader was at right after each of them
+    """
+    for binlog_event in reader:
+        if isinstance(binlog_event, (MariadbGtidEvent, GtidEvent)):
+            # There is strange behavior happening when using GTID in the pymysqlreplication lib,
+            # explained here: https://github.com/noplay/python-mysql-replication/issues/367
+            # Fix: Updating the reader's auto-position to the newly encountered gtid means we won't have to restart
+            # consuming binlog from old GTID pos when connection to server is lost. It is updated as soon as the
+            # event is read, as the events read ahead of the sync would be consumed again otherwise.
+            reader.auto_position = binlog_event.gtid
+
+        yield binlog_event, reader.log_file, reader.log_pos
+
+
+def read_events(reader, read_ahead: int = READ_AHEAD_EVENTS) -> Iterator[Tuple]:
+    """
+    Like iter_events, but the events are read ahead by a thread into a queue of at most read_ahead events.
+
+    The thread stops once the generator is closed, at the latest when the reader is closed.
+    """
+    events = queue.Queue(maxsize=read_ahead)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                events.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        try:
+            for item in iter_events(reader):
+                if stop.is_set():
+                    return
+
+                put(item)
+
+            put(_END)
+
+        except Exception as exc:  # pylint: disable=broad-except
+            put(exc)
+
+    thread = threading.Thread(target=produce, name='binlog-reader', daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = events.get()
+
+            if item is _END:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            yield item
+    finally:
+        stop.set()
+
+
+# pylint: disable=no-self-use
+class RecordWriter:
+    """
+    Writes the records of the binlog sync and its STATE messages as they come
+
+    The other writers override its methods, which is why they don't all use the instance.
+    """
+
+    def iter_events(self, reader) -> Iterator[Tuple]:
+        """
+        Returns the iterator of the events of the reader to sync, with their binlog file and position
+        """
+        return iter_events(reader)
+
+    def write_records(self, row_converter, rows: Iterable[Dict], time_extracted):
+        for values in rows:
+            singer.write_message(row_converter.to_record(values, time_extracted))
+
+    def write_state(self, state: Dict, tap_stream_ids: Iterable[str] = ()):
+        common.write_state_message(state, tap_stream_ids)
+
+    @property
+    def buffered_rows(self) -> int:
+        """
+        Rows held back from the output until the next STATE message
+        """
+        return 0
+
+    def end_transaction(self):
+        pass
+
+    def is_window_closed(self) -> bool:
+        """
+        Returns True if the records held back should be written at the end of the current transaction
+        """
+        return False
+
+    def idle(self):
+        """
+        Called when the server has no new events
+        """
+        self.flush()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# pylint: enable=no-self-use
+class RecordBatch:
+    """
+    Rows of consecutive row events of a table, converted by a worker process in one go
+    """
+    __slots__ = ('row_converter', 'rows', 'row_count', 'started')
+
+    def __init__(self, row_converter=None):
+        self.row_converter = row_converter
+        self.rows: List[Tuple[List[Dict], object]] = []
+        self.row_count = 0
+        self.started = time.monotonic()
+
+    def add(self, rows: List[Dict], time_extracted):
+        self.rows.append((rows, time_extracted))
+        self.row_count += len(rows)
+
+    def is_full(self) -> bool:
+        return self.row_count >= BATCH_ROWS or time.monotonic() - self.started >= MAX_BATCH_SECONDS
+
+
+class PipelinedRecordWriter(RecordWriter):
+    """
+    Converts and serializes the records of the binlog sync in worker processes, and writes them, and the STATE
+    messages in between, in the order they were given.
+
+    Args:
+        workers: number of worker processes
+        convert: function of the stream, version, columns_spec and timezone of a row converter and of a list of
+            (rows, time_extracted) returning the serialized RECORD messages, run by the worker processes
+    """
+
+    def __init__(self, workers: int, convert: Callable):
+        self.convert = convert
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context(WORKER_START_METHOD))
+        self.max_pending = workers * PENDING_BATCHES_PER_WORKER
+
+        # futures of the serialized batches and STATE messages, in the order they must be written
+        self.pending = collections.deque()
+        self.batch = RecordBatch()
+        self.events = None
+
+    def iter_events(self, reader) -> Iterator[Tuple]:
+        self.events = read_events(reader)
+
+        return self.events
+
+    def write_records(self, row_converter, rows: Iterable[Dict], time_extracted):
+        if row_converter is not self.batch.row_converter:
+            self.submit_batch()
+            self.batch = RecordBatch(row_converter)
+
+        elif not self.batch.rows:
+            self.batch = RecordBatch(row_converter)
+
+        self.batch.add(list(rows), time_extracted)
+
+        if self.batch.is_full():
+            self.submit_batch()
+
+    def submit_batch(self):
+        if self.batch.rows:
+            row_converter = self.batch.row_converter
+
+            self.pending.append(self.executor.submit(self.convert,
+                                                     row_converter.stream,
+                                                     row_converter.version,
+                                                     row_converter.columns_spec,
+                                                     row_converter.timezone,
+                                                     self.batch.rows))
+
+            self.batch = RecordBatch(row_converter)
+
+        self.write_done(block=len(self.pending) > self.max_pending)
+
+    def write_state(self, state: Dict, tap_stream_ids: Iterable[str] = ()):
+        self.submit_batch()
+
+        # the bookmarks are copied as they are now, the message waits for the records before it to be written
+        self.pending.append(singer.StateMessage(value=common.state_snapshot(state, tap_stream_ids)))
+        self.write_done()
+
+    def write_done(self, block: bool = False):
+        """
+        Writes the batches and STATE messages at the head of the queue that are ready, waiting for the oldest one
+        to be if block is True
+        """
+        while self.pending and (block or not isinstance(self.pending[0], Future) or self.pending[0].done()):
+            item = self.pending.popleft()
+
+            if isinstance(item, Future):
+                sys.stdout.write(item.result())
+                sys.stdout.flush()
+            else:
+                singer.write_message(item)
+
+            block = False
+
+    def flush(self):
+        self.submit_batch()
+
+        while self.pending:
+            self.write_done(block=True)
+
+    def close(self):
+        if self.events is not None:
+            self.events.close()
+
+        for item in self.pending:
+            if isinstance(item, Future):
+                item.cancel()
+
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
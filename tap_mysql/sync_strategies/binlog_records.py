@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring,too-many-arguments
+"""
+Records of the binlog row events
+
+The values of the row events are converted into singer records by converters compiled once per table map, and
+written by a record writer, which converts and serializes them in worker processes when the sync is pipelined, and
+compacts them when configured to.
+"""
+import codecs
+import datetime
+import json
+import pytz
+import singer
+
+from typing import Dict
+from plpygis import Geometry
+from pymysqlreplication.constants import FIELD_TYPE
+
+from tap_mysql.stream_utils import get_key_properties
+from tap_mysql.sync_strategies.binlog_compaction import CompactingRecordWriter, DEFAULT_COMPACTION_MAX_ROWS
+from tap_mysql.sync_strategies.binlog_pipeline import PipelinedRecordWriter, RecordWriter
+
+LOGGER = singer.get_logger('tap_mysql')
+
+MYSQL_TIMESTAMP_TYPES = {
+    FIELD_TYPE.TIMESTAMP,
+    FIELD_TYPE.TIMESTAMP2
+}
+
+
+def json_bytes_to_string(data):
+    if isinstance(data, bytes):
+        return data.decode()
+
+    if isinstance(data, dict):
+        return dict(map(json_bytes_to_string, data.items()))
+
+    if isinstance(data, tuple):
+        return tuple(map(json_bytes_to_string, data))
+
+    if isinstance(data, list):
+        return list(map(json_bytes_to_string, data))
+
+    return data
+
+
+# Column types whose values are ints, floats or decimals that are written as they are, unless they are booleans
+MYSQL_NUMERIC_TYPES = {
+    FIELD_TYPE.TINY,
+    FIELD_TYPE.SHORT,
+    FIELD_TYPE.LONG,
+    FIELD_TYPE.INT24,
+    FIELD_TYPE.LONGLONG,
+    FIELD_TYPE.FLOAT,
+    FIELD_TYPE.DOUBLE,
+    FIELD_TYPE.DECIMAL,
+    FIELD_TYPE.NEWDECIMAL,
+    FIELD_TYPE.YEAR,
+}
+
+
+def _spatial_to_geojson(val):
+    if not val:
+        return None
+
+    srid = int.from_bytes(val[:4], byteorder='little')
+    geom = Geometry(val[4:], srid=srid)
+
+    return json.dumps(geom.geojson)
+
+
+def _bytes_to_hex(val):
+    # encode bytes as hex bytes then to utf8 string
+    return codecs.encode(val, 'hex').decode('utf-8')
+
+
+def build_value_converter(property_schema, db_column_type, timezone):
+    """
+    Compiles the function converting the binlog values of a column, None if they are written as they are.
+
+    The conversion of a value depends on its Python type, which is looked up in a dispatch table built for the
+    column, then on the column type and schema, which are resolved here once.
+    """
+    property_type = property_schema.type or []
+    is_boolean = 'boolean' in property_type or property_type == 'boolean'
+
+    if db_column_type in MYSQL_NUMERIC_TYPES and not is_boolean:
+        return None
+
+    if db_column_type in MYSQL_TIMESTAMP_TYPES:
+        # The mysql-replication library creates datetimes from TIMESTAMP columns using fromtimestamp which
+        # will use the local timezone thus we must set tzinfo accordingly See:
+        # https://github.com/noplay/python-mysql-replication/blob/master/pymysqlreplication/row_event.py#L143
+        # -L145
+        def convert_datetime(val):
+            return timezone.localize(val).astimezone(pytz.UTC).isoformat()
+    else:
+        def convert_datetime(val):
+            return val.isoformat() + '+00:00'
+
+    if property_schema.format == 'time':
+        # this should convert time column into 'HH:MM:SS' formatted string
+        convert_timedelta = str
+    else:
+        def convert_timedelta(val):
+            return (datetime.datetime.utcfromtimestamp(0) + val).isoformat() + '+00:00'
+
+    conversions = {
+        datetime.datetime: convert_datetime,
+        datetime.date: lambda val: val.isoformat() + 'T00:00:00+00:00',
+        datetime.timedelta: convert_timedelta,
+    }
+
+    if db_column_type == FIELD_TYPE.JSON:
+        def fallback(val):
+            return json.dumps(json_bytes_to_string(val))
+
+    elif property_schema.format == 'spatial':
+        fallback = _spatial_to_geojson
+
+    else:
+        conversions[bytes] = _bytes_to_hex
+
+        if is_boolean:
+            is_bit = db_column_type == FIELD_TYPE.BIT
+
+            def fallback(val):
+                if val is None:
+                    return None
+
+                if val == 0:
+                    return False
+
+                return int(val) != 0 if is_bit else True
+        else:
+            fallback = None
+
+    def convert(val):
+        conversion = conversions.get(val.__class__)
+
+        if conversion is not None:
+            return conversion(val)
+
+        return fallback(val) if fallback is not None else val
+
+    return convert
+
+
+def build_value_converters(columns_spec, timezone) -> Dict:
+    return {column: build_value_converter(property_schema, db_column_type, timezone)
+            for column, property_schema, db_column_type in columns_spec}
+
+
+def format_record(stream, version, converters: Dict, values: Dict, time_extracted) -> singer.RecordMessage:
+    record = {}
+
+    for column, val in values.items():
+        if column in converters:
+            convert = converters[column]
+            record[column] = convert(val) if convert is not None else val
+
+    return singer.RecordMessage(
+        stream=stream,
+        record=record,
+        version=version,
+        time_extracted=time_extracted)
+
+
+class BinlogRowConverter:  # pylint: disable=too-few-public-methods
+    """
+    Converts the row values of the binlog events of a table into singer records, compiled for the columns of
+    the table map and the schema of the stream
+    """
+    __slots__ = ('catalog_entry', 'stream', 'key_columns', 'version', 'columns_spec', 'timezone', 'converters')
+
+    def __init__(self, catalog_entry, version, columns, db_column_types: Dict, timezone):
+        self.catalog_entry = catalog_entry
+        self.stream = catalog_entry.stream
+        # primary key columns, by which the compacted records are buffered
+        self.key_columns = tuple(get_key_properties(catalog_entry) or ()) if catalog_entry.metadata else ()
+        self.version = version
+        self.timezone = timezone
+
+        properties = catalog_entry.schema.properties
+
+        # (column, schema, column type) of every desired column, which the pipelined sync compiles in its workers
+        self.columns_spec = tuple((column, properties[column], db_column_types.get(column)) for column in columns)
+
+        # converter of every desired column, None for the columns written as they are
+        self.converters = build_value_converters(self.columns_spec, timezone)
+
+    def to_record(self, values: Dict, time_extracted) -> singer.RecordMessage:
+        return format_record(self.stream, self.version, self.converters, values, time_extracted)
+
+
+def convert_record_batch(stream, version, columns_spec, timezone, batch) -> str:
+    """
+    Converts a batch of rows of a table into serialized RECORD messages, run by the workers of the pipelined sync
+
+    Args:
+        stream, version, columns_spec, timezone: of the row converter of the table
+        batch: list of (rows, time_extracted) of consecutive row events
+
+    Returns: the RECORD messages, one per line
+    """
+    converters = build_value_converters(columns_spec, timezone)
+
+    return ''.join(singer.format_message(format_record(stream, version, converters, values, time_extracted)) + '\n'
+                   for rows, time_extracted in batch
+                   for values in rows)
+
+
+def get_record_writer(config: Dict) -> RecordWriter:
+    """
+    Returns the writer of the binlog records, pipelined through binlog_pipeline_workers processes and compacted
+    within a window of binlog_compaction_window_seconds or binlog_compaction_window_transactions if configured
+    """
+    workers = int(config.get('binlog_pipeline_workers', 0))
+
+    if workers > 0:
+        LOGGER.info('Converting binlog rows with %s worker processes', workers)
+        record_writer = PipelinedRecordWriter(workers, convert_record_batch)
+    else:
+        record_writer = RecordWriter()
+
+    window_seconds = float(config.get('binlog_compaction_window_seconds', 0))
+    window_transactions = int(config.get('binlog_compaction_window_transactions', 0))
+    max_rows = int(config.get('binlog_compaction_max_rows', DEFAULT_COMPACTION_MAX_ROWS))
+
+    if window_seconds > 0 or window_transactions > 0:
+        LOGGER.info('Compacting binlog records within %s seconds or %s transactions',
+                    window_seconds or 'unlimited',
+                    window_transactions or 'unlimited')
+        record_writer = CompactingRecordWriter(record_writer, window_seconds, window_transactions, max_rows)
+
+    return record_writer
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring
+"""
+Columns of the tables replicated from the binlog
+
+Row events carry the columns of the TableMapEvent that precedes them, which stay the same for all the row events
+of a table until it is altered. So instead of comparing the columns of every row event with the catalog, the
+columns are read once per table map, cached by table_id, and compared with the catalog only when they changed.
+Column sets already compared, e.g. under a table_id reassigned by the server, are not compared again until a DDL
+statement changes the table.
+
+No history of the columns is kept: python-mysql-replication names the columns of a table map after the table as it
+is when the event is read, so the events written before a DDL statement are decoded with the columns of the table
+after it. Columns dropped since are named __dropped_col_<index>__ and left out of the records.
+"""
+import re
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import singer
+
+from tap_mysql.sync_strategies import common
+
+LOGGER = singer.get_logger('tap_mysql')
+
+# Name of the table, optionally qualified, after the keywords of the DDL statements that change or replace tables
+DDL_TABLE_RE = re.compile(
+    r'^\s*(?:ALTER(?:\s+ONLINE|\s+IGNORE)*|CREATE(?:\s+OR\s+REPLACE)?|DROP|RENAME|TRUNCATE)\s+'
+    r'(?:TEMPORARY\s+)?TABLES?\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?'
+    r'(?:(`[^`]+`|[\w$]+)\s*\.\s*)?(`[^`]+`|[\w$]+)',
+    re.IGNORECASE)
+
+
+def get_ddl_table(query: str, default_schema: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Returns the (schema, table) changed by the DDL statement, None if the query is not one
+    """
+    match = DDL_TABLE_RE.match(query)
+
+    if match is None:
+        return None
+
+    schema, table = match.groups()
+
+    if schema is None:
+        schema = default_schema
+
+    return schema.strip('`') if schema else schema, table.strip('`')
+
+
+class TableMap:  # pylint: disable=too-few-public-methods
+    """
+    Columns of a table map, as shared by the row events that follow it
+    """
+    __slots__ = ('columns_list', 'tap_stream_id', 'columns', 'column_types', 'row_converter')
+
+    def __init__(self, columns_list: List, tap_stream_id: str):
+        self.columns_list = columns_list
+        self.tap_stream_id = tap_stream_id
+        self.columns = tuple(column.name for column in columns_list)
+        self.column_types = tuple(column.type for column in columns_list)
+        # converter of the row values of the table map, set by the binlog sync
+        self.row_converter = None
+
+
+class BinlogSchemaCache:
+    """
+    Columns of the table maps of the binlog events, keyed by table_id, and what the sync derived from them
+    """
+
+    def __init__(self):
+        self.table_maps: Dict[Any, TableMap] = {}
+        # tap_stream_id: (catalog entry, column name tuples already compared with the schema of the catalog entry)
+        self.checked: Dict[str, Tuple[Any, Set[Tuple[str, ...]]]] = {}
+        # columns detected as we sync but ignored as they are unsupported, so that they aren't checked over and over
+        self.ignored_columns: Set[str] = set()
+        # row converters by stream and column types, shared by the table maps of the same columns
+        self.row_converters: Dict[Tuple, Any] = {}
+
+    def get_table_map(self, binlog_event) -> TableMap:
+        """
+        Returns the table map of a TableMapEvent or of a row event
+        """
+        table_id = getattr(binlog_event, 'table_id', None)
+        tap_stream_id = common.generate_tap_stream_id(binlog_event.schema, binlog_event.table)
+        key = table_id if table_id is not None else tap_stream_id
+        table_map = self.table_maps.get(key)
+
+        # row events share the columns list of their table map
+        if table_map is not None and table_map.columns_list is binlog_event.columns \
+                and table_map.tap_stream_id == tap_stream_id:
+            return table_map
+
+        previous_columns = table_map.columns if table_map is not None else None
+        table_map = self.table_maps[key] = TableMap(binlog_event.columns, tap_stream_id)
+
+        if previous_columns is not None and previous_columns != table_map.columns:
+            LOGGER.info('Stream `%s`: Columns of the table map changed', tap_stream_id)
+
+        return table_map
+
+    def get_columns(self, binlog_event) -> Tuple[str, ...]:
+        """
+        Returns the column names of the table map of a TableMapEvent or of a row event
+        """
+        return self.get_table_map(binlog_event).columns
+
+    def on_query(self, binlog_event, log_file: str, log_pos: int) -> Optional[str]:
+        """
+        Invalidates the cached table maps and comparisons of the table changed by a DDL QueryEvent, if any
+
+        Returns: tap_stream_id of the table changed by the statement, None if it isn't a DDL statement
+        """
+        schema = binlog_event.schema
+
+        if isinstance(schema, bytes):
+            schema = schema.decode('utf-8')
+
+        ddl_table = get_ddl_table(binlog_event.query, schema)
+
+        if ddl_table is None or ddl_table[0] is None:
+            return None
+
+        tap_stream_id = common.generate_tap_stream_id(*ddl_table)
+
+        LOGGER.info('Stream `%s`: DDL statement at binlog position (%s, %s)', tap_stream_id, log_file, log_pos)
+
+        self.table_maps = {table_id: table_map for table_id, table_map in self.table_maps.items()
+                           if table_map.tap_stream_id != tap_stream_id}
+        self.checked.pop(tap_stream_id, None)
+
+        return tap_stream_id
+
+    def is_checked(self, tap_stream_id: str, columns: Tuple[str, ...], catalog_entry) -> bool:
+        """
+        Returns True if the columns were already compared with the schema of the catalog entry
+        """
+        checked = self.checked.get(tap_stream_id)
+
+        return checked is not None and checked[0] is catalog_entry and columns in checked[1]
+
+    def mark_checked(self, tap_stream_id: str, columns: Tuple[str, ...], catalog_entry):
+        checked = self.checked.get(tap_stream_id)
+
+        if checked is None or checked[0] is not catalog_entry:
+            checked = self.checked[tap_stream_id] = (catalog_entry, set())
+
+        checked[1].add(columns)
@@ -2,15 +2,25 @@
 # pylint: disable=missing-function-docstring,too-many-arguments,too-many-locals
 import copy
 import datetime
+import decimal
 import singer
+import threading
 import time
 
-from singer import metadata, utils, metrics
+from typing import Dict, Iterable, Optional, Set, Tuple
+from singer import utils, metrics
 
-from tap_mysql.stream_utils import get_key_properties
+from tap_mysql.catalog_index import get_stream_index
 
 LOGGER = singer.get_logger('tap_mysql')
 
+UPDATE_BOOKMARK_PERIOD = 1000
+
+# Rows are fetched in batches of about FETCH_BATCH_BYTES to keep memory bounded
+FETCH_BATCH_BYTES = 8 * 1024 * 1024
+MIN_FETCH_BATCH_SIZE = 100
+MAX_FETCH_BATCH_SIZE = 10000
+
 
 def escape(string):
     if '`' in string:
@@ -32,30 +42,26 @@ def get_stream_version(tap_stream_id, state):
 
 
 def stream_is_selected(stream):
-    md_map = metadata.to_map(stream.metadata)
-    selected_md = metadata.get(md_map, (), 'selected')
+    return get_stream_index(stream).selected
 
-    return selected_md
+
+def get_selected_tables(catalog) -> Set[Tuple[str, str]]:
+    """
+    Returns the (table_schema, table_name) pairs of the streams selected in the catalog
+    """
+    return {(get_database_name(stream), stream.table) for stream in catalog.streams if stream_is_selected(stream)}
 
 
 def property_is_selected(stream, property_name):
-    md_map = metadata.to_map(stream.metadata)
-    return singer.should_sync_field(
-        metadata.get(md_map, ('properties', property_name), 'inclusion'),
-        metadata.get(md_map, ('properties', property_name), 'selected'),
-        True)
+    return get_stream_index(stream).is_property_selected(property_name)
 
 
 def get_is_view(catalog_entry):
-    md_map = metadata.to_map(catalog_entry.metadata)
-
-    return md_map.get((), {}).get('is-view')
+    return get_stream_index(catalog_entry).is_view
 
 
 def get_database_name(catalog_entry):
-    md_map = metadata.to_map(catalog_entry.metadata)
-
-    return md_map.get((), {}).get('database-name')
+    return get_stream_index(catalog_entry).database_name
 
 
 def generate_select_sql(catalog_entry, columns):
@@ -89,42 +95,74 @@ def generate_select_sql(catalog_entry, columns):
     return select_sql
 
 
-def row_to_singer_record(catalog_entry, version, row, columns, time_extracted):
-    row_to_persist = ()
-    for idx, elem in enumerate(row):
-        property_type = catalog_entry.schema.properties[columns[idx]].type
-        property_format = catalog_entry.schema.properties[columns[idx]].format
+def _temporal_converter(property_format):
+    is_time = property_format == 'time'
 
+    def convert(elem):
         if isinstance(elem, datetime.datetime):
-            row_to_persist += (elem.isoformat() + '+00:00',)
-
-        elif isinstance(elem, datetime.date):
-            row_to_persist += (elem.isoformat() + 'T00:00:00+00:00',)
-
-        elif isinstance(elem, datetime.timedelta):
-            if property_format == 'time':
-                row_to_persist += (str(elem),) # this should convert time column into 'HH:MM:SS' formatted string
-            else:
-                epoch = datetime.datetime.utcfromtimestamp(0)
-                timedelta_from_epoch = epoch + elem
-                row_to_persist += (timedelta_from_epoch.isoformat() + '+00:00',)
-
-        elif 'boolean' in property_type or property_type == 'boolean':
-            if elem is None:
-                boolean_representation = None
-            elif elem in (0, b'\x00'):
-                boolean_representation = False
-            else:
-                boolean_representation = True
-            row_to_persist += (boolean_representation,)
+            return elem.isoformat() + '+00:00'
+
+        if isinstance(elem, datetime.date):
+            return elem.isoformat() + 'T00:00:00+00:00'
+
+        if isinstance(elem, datetime.timedelta):
+            if is_time:
+                return str(elem) # this should convert time column into 'HH:MM:SS' formatted string
+
+            timedelta_from_epoch = datetime.datetime.utcfromtimestamp(0) + elem
+            return timedelta_from_epoch.isoformat() + '+00:00'
+
+        return elem
+
+    return convert
+
+
+def _boolean_converter(elem):
+    if elem is None:
+        return None
+
+    return elem not in (0, b'\x00')
 
-        else:
-            row_to_persist += (elem,)
-    rec = dict(zip(columns, row_to_persist))
+
+def get_column_converter(property_schema):
+    """
+    Returns the function converting values of a column with the given schema, None if values are passed as they are
+    """
+    property_type = property_schema.type or []
+
+    if property_schema.format in ('date-time', 'time'):
+        return _temporal_converter(property_schema.format)
+
+    if 'boolean' in property_type or property_type == 'boolean':
+        return _boolean_converter
+
+    return None
+
+
+def build_row_converter(catalog_entry, columns):
+    """
+    Compiles the function converting a row of the given columns into a singer record.
+
+    The schema of every column is resolved once, so converting a row only applies the converter of each
+    column that needs one, positionally.
+    """
+    converters = [get_column_converter(catalog_entry.schema.properties[column]) for column in columns]
+
+    if not any(converters):
+        return lambda row: dict(zip(columns, row))
+
+    converters = [converter or (lambda elem: elem) for converter in converters]
+
+    return lambda row: {column: convert(elem) for column, convert, elem in zip(columns, converters, row)}
+
+
+def row_to_singer_record(catalog_entry, version, row, columns, time_extracted, row_converter=None):
+    if row_converter is None:
+        row_converter = build_row_converter(catalog_entry, columns)
 
     return singer.RecordMessage(
         stream=catalog_entry.stream,
-        record=rec,
+        record=row_converter(row),
         version=version,
         time_extracted=time_extracted)
 
@@ -136,10 +174,289 @@ def whitelist_bookmark_keys(bookmark_key_set, tap_stream_id, state):
         singer.clear_bookmark(state, tap_stream_id, bookmark_key)
 
 
-def sync_query(cursor, catalog_entry, state, select_sql, columns, stream_version, params):
-    replication_key = singer.get_bookmark(state,
-                                          catalog_entry.tap_stream_id,
-                                          'replication_key')
+# Types of the key values that are bookmarked as {'type': ..., 'value': ...} because JSON can't hold them
+BOOKMARK_VALUE_TYPES = {
+    'datetime': (datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    'date': (datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    'time': (datetime.timedelta,
+             lambda elem: str(elem.total_seconds()),
+             lambda elem: datetime.timedelta(seconds=float(elem))),
+    'decimal': (decimal.Decimal, str, decimal.Decimal),
+    'bytes': (bytes, bytes.hex, bytes.fromhex),
+}
+
+
+def to_bookmark_value(value):
+    """
+    Encodes a key value read from MySQL so that it can be bookmarked in the state and bound back
+    into a query with the same type
+    """
+    for type_name, (value_type, encode, _) in BOOKMARK_VALUE_TYPES.items():
+        if isinstance(value, value_type):
+            return {'type': type_name, 'value': encode(value)}
+
+    return value
+
+
+def from_bookmark_value(value):
+    if isinstance(value, dict) and value.get('type') in BOOKMARK_VALUE_TYPES:
+        return BOOKMARK_VALUE_TYPES[value['type']][2](value['value'])
+
+    return value
+
+
+def _hex_to_bookmark_value(value):
+    return to_bookmark_value(bytes.fromhex(value) if isinstance(value, str) else value)
+
+
+def get_key_bookmark_converter(catalog_entry, column):
+    """
+    Returns the function bookmarking the value of a key column as it is selected by generate_select_sql.
+
+    Binary columns are selected as hex strings, which are turned back into their bytes so that the bookmark
+    is compared with the column as the bytes it holds rather than their hex text.
+    """
+    if catalog_entry.schema.properties[column].format == 'binary':
+        return _hex_to_bookmark_value
+
+    return to_bookmark_value
+
+
+def fetch_avg_row_length(cursor, catalog_entry) -> Optional[int]:
+    cursor.execute("""
+        SELECT avg_row_length
+          FROM information_schema.tables
+         WHERE table_schema = %s
+           AND table_name   = %s
+    """, (get_database_name(catalog_entry), catalog_entry.table))
+
+    result = cursor.fetchall()
+
+    return result[0][0] if result else None
+
+
+def get_fetch_batch_size(avg_row_length: Optional[int]) -> int:
+    """
+    Finds how many rows to fetch at once from a table so that a batch holds about FETCH_BATCH_BYTES,
+    based on the average row length InnoDB reports for the table.
+    """
+    if not avg_row_length:
+        return MIN_FETCH_BATCH_SIZE
+
+    return max(MIN_FETCH_BATCH_SIZE, min(MAX_FETCH_BATCH_SIZE, FETCH_BATCH_BYTES // avg_row_length))
+
+
+def state_snapshot(state: Dict, tap_stream_ids: Iterable[str] = ()) -> Dict:
+    """
+    Returns a snapshot of the state to emit in a STATE message, without deep copying the whole state.
+
+    Only the bookmarks of the given streams, the ones that changed since the last STATE message, are copied.
+    The bookmarks of the other streams are shared with the state as they are not modified in the meantime.
+    """
+    snapshot = dict(state)
+
+    if 'bookmarks' in state:
+        snapshot['bookmarks'] = dict(state['bookmarks'])
+
+        for tap_stream_id in tap_stream_ids:
+            if tap_stream_id in snapshot['bookmarks']:
+                snapshot['bookmarks'][tap_stream_id] = copy.deepcopy(snapshot['bookmarks'][tap_stream_id])
+
+    return snapshot
+
+
+def write_state_message(state: Dict, tap_stream_ids: Iterable[str] = ()):
+    if isinstance(state, StreamState):
+        state.writer.merge(state, emit=True)
+        return
+
+    singer.write_message(singer.StateMessage(value=state_snapshot(state, tap_stream_ids)))
+
+
+class StreamState(dict):
+    """
+    State of a stream synced concurrently with other streams, holding the bookmarks of this stream only.
+
+    It is used by the sync strategies like the state of the run, but its STATE messages are emitted by the
+    ConcurrentStateWriter, which merges its bookmarks into the state of the run.
+    """
+
+    def __init__(self, writer, tap_stream_id, bookmark):
+        super().__init__(bookmarks={tap_stream_id: bookmark})
+        self.writer = writer
+        self.tap_stream_id = tap_stream_id
+
+
+class ConcurrentStateWriter:
+    """
+    Owns the state of a run whose streams are synced concurrently: every stream worker only modifies its own
+    StreamState, whose bookmarks are merged into the state of the run when the worker emits a STATE message.
+
+    The streams in flight are listed in currently_syncing_streams, while currently_syncing holds the oldest
+    of them for compatibility with sequential syncs.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.lock = threading.Lock()
+        self.in_flight = []
+
+    def _set_currently_syncing(self):
+        singer.set_currently_syncing(self.state, self.in_flight[0] if self.in_flight else None)
+        self.state['currently_syncing_streams'] = list(self.in_flight)
+
+    def start_stream(self, tap_stream_id) -> StreamState:
+        with self.lock:
+            self.in_flight.append(tap_stream_id)
+            self._set_currently_syncing()
+
+            bookmark = copy.deepcopy(self.state.get('bookmarks', {}).get(tap_stream_id, {}))
+            self.state.setdefault('bookmarks', {})[tap_stream_id] = copy.deepcopy(bookmark)
+
+            # Emit a state message to indicate that we've started this stream
+            singer.write_message(singer.StateMessage(value=state_snapshot(self.state, [tap_stream_id])))
+
+        return StreamState(self, tap_stream_id, bookmark)
+
+    def merge(self, stream_state: StreamState, emit=False):
+        # copied by the thread owning the stream state, before it is shared with the state of the run
+        bookmark = copy.deepcopy(stream_state['bookmarks'][stream_state.tap_stream_id])
+
+        with self.lock:
+            self.state['bookmarks'][stream_state.tap_stream_id] = bookmark
+
+            if emit:
+                singer.write_message(singer.StateMessage(value=state_snapshot(self.state)))
+
+    def finish_stream(self, stream_state: StreamState):
+        self.merge(stream_state)
+
+        with self.lock:
+            self.in_flight.remove(stream_state.tap_stream_id)
+            self._set_currently_syncing()
+
+    def close(self):
+        with self.lock:
+            self.state.pop('currently_syncing_streams', None)
+
+
+class CheckpointPolicy:
+    """
+    Decides when a STATE message is due: after a number of rows, an approximate volume of data or a wall-clock
+    interval since the last one, whichever comes first. A limit of 0 disables it.
+    """
+
+    __slots__ = ('max_rows', 'max_bytes', 'max_seconds', 'rows', 'bytes', 'started_at')
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+
+        self.max_rows = int(config.get('checkpoint_rows', UPDATE_BOOKMARK_PERIOD))
+        self.max_bytes = int(config.get('checkpoint_bytes', 0))
+        self.max_seconds = float(config.get('checkpoint_interval_seconds', 0))
+
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.bytes = 0
+        self.started_at = time.monotonic()
+
+    def add(self, rows: int, size: int = 0) -> bool:
+        """
+        Accounts for rows of about size bytes that were just written
+
+        Returns: True if a checkpoint is due
+        """
+        self.rows += rows
+        self.bytes += size
+
+        return bool((self.max_rows and self.rows >= self.max_rows) or
+                    (self.max_bytes and self.bytes >= self.max_bytes) or
+                    (self.max_seconds and time.monotonic() - self.started_at >= self.max_seconds))
+
+
+class SyncQueryDescriptor:
+    """
+    Everything sync_query needs to know about a stream, resolved once per query rather than for every row
+    """
+
+    __slots__ = ('tap_stream_id', 'stream', 'row_converter', 'pk_bookmark', 'replication_key_bookmark')
+
+    def __init__(self, catalog_entry, state, columns):
+        self.tap_stream_id = catalog_entry.tap_stream_id
+        self.stream = catalog_entry.stream
+        self.row_converter = build_row_converter(catalog_entry, columns)
+
+        replication_method = get_stream_index(catalog_entry).replication_method
+
+        # (column, index, converter) of each column whose last value is bookmarked
+        self.pk_bookmark = None
+        self.replication_key_bookmark = None
+
+        if replication_method in {'FULL_TABLE', 'LOG_BASED'}:
+            max_pk_values = singer.get_bookmark(state, self.tap_stream_id, 'max_pk_values')
+
+            # key values are bookmarked with their MySQL type to be bound back into the resumed query
+            if max_pk_values:
+                self.pk_bookmark = [(column, columns.index(column), get_key_bookmark_converter(catalog_entry, column))
+                                    for column in max_pk_values if column in columns]
+
+        elif replication_method == 'INCREMENTAL':
+            replication_key = singer.get_bookmark(state, self.tap_stream_id, 'replication_key')
+
+            if replication_key is not None:
+                self.replication_key_bookmark = self._column_bookmark(catalog_entry, columns, replication_key)
+
+    @staticmethod
+    def _column_bookmark(catalog_entry, columns, column):
+        return (column,
+                columns.index(column),
+                get_column_converter(catalog_entry.schema.properties[column]) or (lambda elem: elem))
+
+    def to_record_message(self, row, version, time_extracted):
+        return singer.RecordMessage(
+            stream=self.stream,
+            record=self.row_converter(row),
+            version=version,
+            time_extracted=time_extracted)
+
+    def write_bookmarks(self, state, row):
+        """
+        Bookmarks the given row, which is the last one written, in the state
+        """
+        if self.pk_bookmark is not None:
+            state = singer.write_bookmark(state,
+                                          self.tap_stream_id,
+                                          'last_pk_fetched',
+                                          {column: convert(row[idx]) for column, idx, convert in self.pk_bookmark})
+
+        elif self.replication_key_bookmark is not None:
+            column, idx, convert = self.replication_key_bookmark
+
+            state = singer.write_bookmark(state,
+                                          self.tap_stream_id,
+                                          'replication_key',
+                                          column)
+
+            state = singer.write_bookmark(state,
+                                          self.tap_stream_id,
+                                          'replication_key_value',
+                                          convert(row[idx]))
+
+        return state
+
+
+def sync_query(cursor, catalog_entry, state, select_sql, columns, stream_version, params, config=None,
+               avg_row_length=None):
+    descriptor = SyncQueryDescriptor(catalog_entry, state, columns)
+    checkpoint_policy = CheckpointPolicy(config)
+
+    # the average row length is queried unless given, e.g. by the preflight of the sync
+    if avg_row_length is None:
+        avg_row_length = fetch_avg_row_length(cursor, catalog_entry)
+
+    batch_size = get_fetch_batch_size(avg_row_length)
 
     query_string = cursor.mogrify(select_sql, params)
 
@@ -148,8 +465,8 @@ def sync_query(cursor, catalog_entry, state, select_sql, columns, stream_version
     LOGGER.info('Running %s', query_string)
     cursor.execute(select_sql, params)
 
-    row = cursor.fetchone()
-    rows_saved = 0
+    rows = cursor.fetchmany(batch_size)
+    last_row_written = None
 
     database_name = get_database_name(catalog_entry)
 
@@ -157,50 +474,25 @@ def sync_query(cursor, catalog_entry, state, select_sql, columns, stream_version
         counter.tags['database'] = database_name
         counter.tags['table'] = catalog_entry.table
 
-        while row:
-            counter.increment()
-            rows_saved += 1
-            record_message = row_to_singer_record(catalog_entry,
-                                                  stream_version,
-                                                  row,
-                                                  columns,
-                                                  time_extracted)
-            singer.write_message(record_message)
-
-            md_map = metadata.to_map(catalog_entry.metadata)
-            stream_metadata = md_map.get((), {})
-            replication_method = stream_metadata.get('replication-method')
-
-            if replication_method in {'FULL_TABLE', 'LOG_BASED'}:
-                key_properties = get_key_properties(catalog_entry)
-
-                max_pk_values = singer.get_bookmark(state,
-                                                    catalog_entry.tap_stream_id,
-                                                    'max_pk_values')
-
-                if max_pk_values:
-                    last_pk_fetched = {k:v for k, v in record_message.record.items()
-                                       if k in key_properties}
-
-                    state = singer.write_bookmark(state,
-                                                  catalog_entry.tap_stream_id,
-                                                  'last_pk_fetched',
-                                                  last_pk_fetched)
-
-            elif replication_method == 'INCREMENTAL':
-                if replication_key is not None:
-                    state = singer.write_bookmark(state,
-                                                  catalog_entry.tap_stream_id,
-                                                  'replication_key',
-                                                  replication_key)
-
-                    state = singer.write_bookmark(state,
-                                                  catalog_entry.tap_stream_id,
-                                                  'replication_key_value',
-                                                  record_message.record[replication_key])
-            if rows_saved % 1000 == 0:
-                singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
-
-            row = cursor.fetchone()
-
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+        try:
+            while rows:
+                record_messages = [descriptor.to_record_message(row, stream_version, time_extracted) for row in rows]
+
+                for record_message, row in zip(record_messages, rows):
+                    singer.write_message(record_message)
+                    last_row_written = row
+
+                counter.increment(len(rows))
+
+                if checkpoint_policy.add(len(rows), len(rows) * (avg_row_length or 0)):
+                    state = descriptor.write_bookmarks(state, last_row_written)
+                    write_state_message(state, [catalog_entry.tap_stream_id])
+                    checkpoint_policy.reset()
+
+                rows = cursor.fetchmany(batch_size)
+        finally:
+            # bookmark the last row written, even if the sync failed midway
+            if last_row_written is not None:
+                state = descriptor.write_bookmarks(state, last_row_written)
+
+    write_state_message(state, [catalog_entry.tap_stream_id])
@@ -1,24 +1,31 @@
 #!/usr/bin/env python3
-# pylint: disable=too-many-locals,missing-function-docstring
+# pylint: disable=too-many-locals,missing-function-docstring,too-many-arguments
 
+import os
+import threading
 import singer
 
-from singer import metadata
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Dict, List
+from singer import metrics, utils
 
 from tap_mysql.sync_strategies import binlog
 from tap_mysql.sync_strategies import common
+from tap_mysql.sync_strategies import parquet_export
 
-from tap_mysql.connection import connect_with_backoff
+from tap_mysql import preflight
+from tap_mysql.catalog_index import get_stream_index
+from tap_mysql.connection import borrow_connection
+from tap_mysql.stream_utils import get_key_properties
 
 LOGGER = singer.get_logger('tap_mysql')
 
 
 def generate_bookmark_keys(catalog_entry):
-    md_map = metadata.to_map(catalog_entry.metadata)
-    stream_metadata = md_map.get((), {})
-    replication_method = stream_metadata.get('replication-method')
+    replication_method = get_stream_index(catalog_entry).replication_method
 
-    base_bookmark_keys = {'last_pk_fetched', 'max_pk_values', 'version', 'initial_full_table_complete'}
+    base_bookmark_keys = {'last_pk_fetched', 'max_pk_values', 'pk_chunks', 'parquet_manifest', 'version',
+                          'initial_full_table_complete', 'sync_stats'}
 
     if replication_method == 'FULL_TABLE':
         bookmark_keys = base_bookmark_keys
@@ -28,42 +35,49 @@ def generate_bookmark_keys(catalog_entry):
     return bookmark_keys
 
 
-def pks_are_auto_incrementing(mysql_conn, catalog_entry):
-    database_name = common.get_database_name(catalog_entry)
-    key_properties = common.get_key_properties(catalog_entry)
+def open_connection(mysql_conn, snapshot=None):
+    """
+    Returns a connection context manager: a connection borrowed from the consistent snapshot if any,
+    otherwise one borrowed from the connection pool
+    """
+    if snapshot is not None:
+        return snapshot.borrow()
+
+    return borrow_connection(mysql_conn)
 
-    if not key_properties:
-        return False
 
-    sql = """SELECT 1
-               FROM information_schema.columns
-              WHERE table_schema = '{}'
-                AND table_name = '{}'
-                AND column_name = '{}'
-                AND extra LIKE '%auto_increment%'
+def get_keyset_columns(catalog_entry):
     """
+    Returns the columns the table can be extracted in the order of and resumed from: its primary key or, for
+    tables without one, the NOT NULL unique index found by discovery or, for catalogs discovered before
+    unique indexes were, by the preflight of the sync. Views have none.
+    """
+    if common.get_is_view(catalog_entry):
+        return []
 
-    with connect_with_backoff(mysql_conn) as open_conn:
-        with open_conn.cursor() as cur:
-            for primary_key in key_properties:
-                cur.execute(sql.format(database_name,
-                                       catalog_entry.table,
-                                       primary_key))
+    stream_metadata = get_stream_index(catalog_entry).stream_metadata
+    table_metadata = preflight.get_table_metadata(catalog_entry)
 
-                result = cur.fetchone()
+    return get_key_properties(catalog_entry) or stream_metadata.get('unique-index-columns') or \
+        (table_metadata and table_metadata.unique_index_columns) or []
 
-                if not result:
-                    return False
 
-    return True
+def is_resumable(catalog_entry, columns):
+    """
+    Returns True if the table can be extracted in key order and an interrupted sync resumed from the last key
+    fetched, which requires every key column to be selected
+    """
+    keyset_columns = get_keyset_columns(catalog_entry)
 
+    return bool(keyset_columns) and all(column in columns for column in keyset_columns)
 
-def get_max_pk_values(cursor, catalog_entry):
+
+def _get_boundary_pk_values(cursor, catalog_entry, direction):
     database_name = common.get_database_name(catalog_entry)
     escaped_db = common.escape(database_name)
     escaped_table = common.escape(catalog_entry.table)
 
-    key_properties = common.get_key_properties(catalog_entry)
+    key_properties = get_keyset_columns(catalog_entry)
     escaped_columns = [common.escape(c) for c in key_properties]
 
     sql = """SELECT {}
@@ -73,7 +87,7 @@ def get_max_pk_values(cursor, catalog_entry):
     """
 
     select_column_clause = ", ".join(escaped_columns)
-    order_column_clause = ", ".join([primary_key + " DESC" for primary_key in escaped_columns])
+    order_column_clause = ", ".join([primary_key + " " + direction for primary_key in escaped_columns])
 
     cursor.execute(sql.format(select_column_clause,
                               escaped_db,
@@ -82,15 +96,70 @@ def get_max_pk_values(cursor, catalog_entry):
     result = cursor.fetchone()
 
     if result:
-        max_pk_values = dict(zip(key_properties, result))
+        pk_values = {column: common.to_bookmark_value(value) for column, value in zip(key_properties, result)}
     else:
-        max_pk_values = {}
+        pk_values = {}
+
+    return pk_values
 
-    return max_pk_values
+
+def get_max_pk_values(cursor, catalog_entry):
+    return _get_boundary_pk_values(cursor, catalog_entry, 'DESC')
+
+
+def get_min_pk_values(cursor, catalog_entry):
+    return _get_boundary_pk_values(cursor, catalog_entry, 'ASC')
+
+
+def _expand_row_value_comparison(escaped_columns, placeholders, operator):
+    """
+    Expands the row value comparison (a, b) > (x, y) into the equivalent a >= x AND (a > x OR (a = x AND b > y))
+    form. Unlike the row value itself, the bound on the first column and the OR'ed equalities let MySQL run a
+    range scan of the PK index.
+    """
+    strict_operator = operator.rstrip('=')
+    comparison = f'{escaped_columns[-1]} {operator} {placeholders[-1]}'
+
+    for idx in range(len(escaped_columns) - 2, -1, -1):
+        column, placeholder = escaped_columns[idx], placeholders[idx]
+        inner_comparison = comparison if idx == len(escaped_columns) - 2 else f'({comparison})'
+        comparison = f'{column} {strict_operator} {placeholder} OR ({column} = {placeholder} AND {inner_comparison})'
+
+    if len(escaped_columns) == 1:
+        return comparison
+
+    return f'({escaped_columns[0]} {strict_operator}= {placeholders[0]} AND ({comparison}))'
+
+
+def generate_pk_range_clause(key_properties, max_pk_values, last_pk_fetched=None):
+    """
+    Generates the condition selecting the rows after last_pk_fetched and up to max_pk_values in PK order
+
+    Args:
+        key_properties: PK columns of the table
+        max_pk_values: bookmarked PK values of the last row to extract
+        last_pk_fetched: bookmarked PK values of the last row already extracted, None to start from the first row
+
+    Returns: tuple of the condition and its bound parameters
+    """
+    escaped_columns = [common.escape(c) for c in key_properties]
+    params = {f'max_pk_{idx}': common.from_bookmark_value(max_pk_values[pk]) for idx, pk in enumerate(key_properties)}
+
+    pk_comparisons = [_expand_row_value_comparison(escaped_columns, [f'%({p})s' for p in params], '<=')]
+
+    if last_pk_fetched:
+        last_pk_params = {f'last_pk_{idx}': common.from_bookmark_value(last_pk_fetched[pk])
+                          for idx, pk in enumerate(key_properties)}
+        pk_comparisons.insert(0, _expand_row_value_comparison(escaped_columns,
+                                                              [f'%({p})s' for p in last_pk_params],
+                                                              '>'))
+        params.update(last_pk_params)
+
+    return ' AND '.join(pk_comparisons), params
 
 
 def generate_pk_clause(catalog_entry, state):
-    key_properties = common.get_key_properties(catalog_entry)
+    key_properties = get_keyset_columns(catalog_entry)
     escaped_columns = [common.escape(c) for c in key_properties]
 
     max_pk_values = singer.get_bookmark(state,
@@ -101,19 +170,382 @@ def generate_pk_clause(catalog_entry, state):
                                           catalog_entry.tap_stream_id,
                                           'last_pk_fetched')
 
+    pk_condition, params = generate_pk_range_clause(key_properties, max_pk_values, last_pk_fetched)
+
+    sql = f' WHERE {pk_condition} ORDER BY {", ".join(escaped_columns)} ASC'
+
+    return sql, params
+
+
+def generate_keyset_page_query(select_sql, key_properties, max_pk_values, last_pk_fetched, page_size):
+    """
+    Generates the query of one keyset page, ie. the next page_size rows in PK order after last_pk_fetched
+
+    Args:
+        select_sql: SELECT statement of the table without any clause
+        key_properties: PK columns of the table
+        max_pk_values: PK values of the last row to extract
+        last_pk_fetched: PK values of the last row of the previous page, None for the first page
+        page_size: maximum number of rows in the page
+
+    Returns: tuple of the query and its bound parameters
+    """
+    escaped_columns = [common.escape(c) for c in key_properties]
+    pk_condition, params = generate_pk_range_clause(key_properties, max_pk_values, last_pk_fetched)
+
+    sql = f'{select_sql} WHERE {pk_condition} ' \
+          f'ORDER BY {", ".join(escaped_columns)} ASC LIMIT {int(page_size)}'
+
+    return sql, params
+
+
+def sync_table_in_keyset_pages(mysql_conn, catalog_entry, state, columns, stream_version, page_size, snapshot=None):
+    """
+    Extracts the table with a series of bounded queries, each one returning the next page_size rows in PK order.
+
+    Unlike one long streaming SELECT, every page is a short transaction that doesn't pin undo history nor hit
+    net_read_timeout. The query of the next page runs in the background while the current page is converted
+    and written, and the state is checkpointed after every page. Pages read from a consistent snapshot all
+    belong to its transaction.
+    """
+    key_properties = get_keyset_columns(catalog_entry)
+    pk_indexes = [columns.index(pk) for pk in key_properties]
+    pk_converters = [common.get_key_bookmark_converter(catalog_entry, pk) for pk in key_properties]
+
+    row_converter = common.build_row_converter(catalog_entry, columns)
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+    max_pk_values = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'max_pk_values')
+    last_pk_fetched = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'last_pk_fetched')
+
+    def fetch_page(cursor, last_pk_fetched):
+        page_sql, params = generate_keyset_page_query(select_sql,
+                                                      key_properties,
+                                                      max_pk_values,
+                                                      last_pk_fetched,
+                                                      page_size)
+
+        LOGGER.debug('Running %s', cursor.mogrify(page_sql, params))
+        cursor.execute(page_sql, params)
+        rows = cursor.fetchall()
+
+        # end the read transaction between pages
+        if snapshot is None:
+            cursor.connection.commit()
+
+        return rows
+
+    with open_connection(mysql_conn, snapshot) as open_conn:
+        with open_conn.cursor() as cur, ThreadPoolExecutor(max_workers=1) as prefetcher:
+            time_extracted = utils.now()
+            next_page = prefetcher.submit(fetch_page, cur, last_pk_fetched)
+
+            with metrics.record_counter(None) as counter:
+                counter.tags['database'] = common.get_database_name(catalog_entry)
+                counter.tags['table'] = catalog_entry.table
+
+                while next_page:
+                    rows = next_page.result()
+                    next_page = None
+
+                    if not rows:
+                        break
+
+                    last_pk_fetched = {pk: convert(rows[-1][idx])
+                                       for pk, idx, convert in zip(key_properties, pk_indexes, pk_converters)}
+
+                    # a short page is the last one
+                    if len(rows) == page_size:
+                        next_page = prefetcher.submit(fetch_page, cur, last_pk_fetched)
+
+                    for row in rows:
+                        singer.write_message(common.row_to_singer_record(catalog_entry,
+                                                                         stream_version,
+                                                                         row,
+                                                                         columns,
+                                                                         time_extracted,
+                                                                         row_converter))
+                        counter.increment()
+
+                    state = singer.write_bookmark(state,
+                                                  catalog_entry.tap_stream_id,
+                                                  'last_pk_fetched',
+                                                  last_pk_fetched)
+
+                    common.write_state_message(state, [catalog_entry.tap_stream_id])
+
+
+def generate_pk_chunks(lower_pk_value: int, max_pk_value: int, chunk_count: int) -> List[Dict]:
+    """
+    Splits the integer PK range (lower_pk_value, max_pk_value] into at most chunk_count contiguous chunks
+
+    Args:
+        lower_pk_value: exclusive lower bound of the range
+        max_pk_value: inclusive upper bound of the range
+        chunk_count: number of chunks to split the range into
+
+    Returns: list of chunk bookmarks, each one with an exclusive lower bound, an inclusive upper bound and
+        the last PK fetched in the chunk
+    """
+    if max_pk_value <= lower_pk_value:
+        return []
+
+    chunk_count = max(1, min(chunk_count, max_pk_value - lower_pk_value))
+    chunk_size = -(-(max_pk_value - lower_pk_value) // chunk_count)
+
+    chunks = []
+    chunk_lower = lower_pk_value
+
+    while chunk_lower < max_pk_value:
+        chunk_upper = min(chunk_lower + chunk_size, max_pk_value)
+
+        chunks.append({
+            'lower_pk': chunk_lower,
+            'upper_pk': chunk_upper,
+            'last_pk_fetched': None
+        })
+
+        chunk_lower = chunk_upper
+
+    return chunks
+
+
+def generate_pk_chunk_clause(catalog_entry):
+    pk_column = common.escape(get_keyset_columns(catalog_entry)[0])
+
+    return f' WHERE {pk_column} > %(lower_pk)s AND {pk_column} <= %(upper_pk)s ORDER BY {pk_column} ASC'
+
+
+def _sync_pk_chunk(mysql_conn, catalog_entry, state, columns, stream_version, chunk, progress, snapshot=None):
+    """
+    Extracts the rows of one PK chunk over its own connection, or one borrowed from the consistent snapshot.
+
+    Records and the chunk bookmark are written while holding the progress lock so that messages of the
+    concurrent workers never interleave and STATE only ever covers records that were already written.
+    """
+    pk_column = get_keyset_columns(catalog_entry)[0]
+    pk_index = columns.index(pk_column)
+
+    row_converter = common.build_row_converter(catalog_entry, columns)
+    select_sql = common.generate_select_sql(catalog_entry, columns) + generate_pk_chunk_clause(catalog_entry)
+    params = {
+        'lower_pk': chunk['lower_pk'] if chunk['last_pk_fetched'] is None else chunk['last_pk_fetched'],
+        'upper_pk': chunk['upper_pk']
+    }
+
+    with open_connection(mysql_conn, snapshot) as open_conn:
+        # Closing an unbuffered cursor reads the rest of its rows, so the cursor is only closed once the chunk is
+        # complete. The session is closed instead if the chunk is left unfinished, which the pool also does
+        # when the block raises, and closed sessions are never handed out again.
+        cur = open_conn.cursor()
+
+        avg_row_length = preflight.get_avg_row_length(cur, catalog_entry)
+        batch_size = common.get_fetch_batch_size(avg_row_length)
+        time_extracted = utils.now()
+
+        LOGGER.info('Running %s', cur.mogrify(select_sql, params))
+        cur.execute(select_sql, params)
+
+        with metrics.record_counter(None) as counter:
+            counter.tags['database'] = common.get_database_name(catalog_entry)
+            counter.tags['table'] = catalog_entry.table
+
+            rows = cur.fetchmany(batch_size)
+
+            while rows:
+                if progress['failed'].is_set():
+                    open_conn.close()
+                    return
+
+                record_messages = [common.row_to_singer_record(catalog_entry,
+                                                               stream_version,
+                                                               row,
+                                                               columns,
+                                                               time_extracted,
+                                                               row_converter) for row in rows]
+
+                with progress['lock']:
+                    for record_message in record_messages:
+                        singer.write_message(record_message)
+
+                    chunk['last_pk_fetched'] = rows[-1][pk_index]
+                    counter.increment(len(rows))
+
+                    if progress['checkpoint_policy'].add(len(rows), len(rows) * (avg_row_length or 0)):
+                        common.write_state_message(state, [catalog_entry.tap_stream_id])
+                        progress['checkpoint_policy'].reset()
+
+                rows = cur.fetchmany(batch_size)
+
+        cur.close()
+
+    with progress['lock']:
+        singer.get_bookmark(state, catalog_entry.tap_stream_id, 'pk_chunks').remove(chunk)
+        common.write_state_message(state, [catalog_entry.tap_stream_id])
+
+
+def init_pk_chunks(cursor, catalog_entry, state, parallelism) -> bool:
+    """
+    Makes sure the state holds the PK chunks to extract if the table is to be extracted in parallel
+
+    Only tables keyed by a single integer column can be split into PK ranges. Chunks that are
+    already bookmarked from an interrupted sync are always resumed, whatever the configured parallelism.
+
+    Args:
+        cursor: cursor to probe the lowest PK value with
+        catalog_entry: stream catalog entry
+        state: state dict with bookmarks, max_pk_values must be already bookmarked
+        parallelism: number of concurrent workers configured for full table syncs
+
+    Returns: True if the table is to be extracted in PK chunks, False otherwise. max_pk_values is cleared if the
+    table turns out to be empty.
+    """
+    if singer.get_bookmark(state, catalog_entry.tap_stream_id, 'pk_chunks') is not None:
+        return True
+
+    max_pk_values = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'max_pk_values')
+
+    if parallelism <= 1 or len(max_pk_values) != 1:
+        return False
+
+    pk_column, max_pk_value = next(iter(max_pk_values.items()))
+
+    if not isinstance(max_pk_value, int):
+        return False
+
+    last_pk_fetched = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'last_pk_fetched')
+
     if last_pk_fetched:
-        pk_comparisons = [
-            f"({common.escape(pk)} > {last_pk_fetched[pk]} AND {common.escape(pk)} <= {max_pk_values[pk]})"
-            for pk in key_properties]
+        lower_pk_value = last_pk_fetched[pk_column]
     else:
-        pk_comparisons = [f"{common.escape(pk)} <= {max_pk_values[pk]}" for pk in key_properties]
+        min_pk_values = get_min_pk_values(cursor, catalog_entry)
+
+        if not min_pk_values:
+            # the table was emptied since max_pk_values were bookmarked, there is nothing left to extract
+            singer.clear_bookmark(state, catalog_entry.tap_stream_id, 'max_pk_values')
+            return False
 
-    sql = f' WHERE {" AND ".join(pk_comparisons)} ORDER BY {", ".join(escaped_columns)} ASC'
+        lower_pk_value = min_pk_values[pk_column] - 1
 
-    return sql
+    singer.write_bookmark(state,
+                          catalog_entry.tap_stream_id,
+                          'pk_chunks',
+                          generate_pk_chunks(lower_pk_value, max_pk_value, parallelism))
+
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, 'last_pk_fetched')
 
+    return True
+
+
+def sync_table_in_pk_chunks(mysql_conn, catalog_entry, state, columns, stream_version, workers, config=None,
+                            snapshot=None):
+    """
+    Extracts every chunk bookmarked in the state's pk_chunks concurrently, using one connection per worker.
 
-def sync_table(mysql_conn, catalog_entry, state, columns, stream_version):
+    A chunk is removed from the bookmark once all of its rows are written, so an interrupted sync only
+    extracts the remainder of the unfinished chunks.
+    """
+    chunks = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'pk_chunks')
+
+    LOGGER.info('Extracting %s PK chunk(s) of table %s using %s workers', len(chunks), catalog_entry.table, workers)
+
+    progress = {
+        'lock': threading.Lock(),
+        'failed': threading.Event(),
+        'checkpoint_policy': common.CheckpointPolicy(config)
+    }
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_sync_pk_chunk,
+                                   mysql_conn,
+                                   catalog_entry,
+                                   state,
+                                   columns,
+                                   stream_version,
+                                   chunk,
+                                   progress,
+                                   snapshot) for chunk in list(chunks)]
+
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+        for future in done:
+            if future.exception() is not None:
+                # stop the remaining workers early, the unfinished chunks stay in the state for the next run
+                progress['failed'].set()
+
+                for pending_future in not_done:
+                    pending_future.cancel()
+
+                raise future.exception()
+
+
+def sync_table_to_parquet(mysql_conn, catalog_entry, state, columns, stream_version, config, snapshot=None):
+    """
+    Exports the table into Parquet files of at most parquet_export_rows_per_file rows instead of emitting
+    RECORD messages. Every complete file is listed in the parquet_manifest bookmark of the state.
+
+    Tables with a bookmarked max_pk_values are exported one PK range per file and an interrupted export
+    resumes after the last complete file. Other tables are exported from scratch by every sync.
+    """
+    tap_stream_id = catalog_entry.tap_stream_id
+    rows_per_file = int(config.get('parquet_export_rows_per_file', parquet_export.DEFAULT_ROWS_PER_FILE))
+    export_dir = os.path.join(config['parquet_export_dir'], tap_stream_id, str(stream_version))
+
+    key_properties = get_keyset_columns(catalog_entry)
+    pk_indexes = [columns.index(pk) for pk in key_properties]
+    pk_converters = [common.get_key_bookmark_converter(catalog_entry, pk) for pk in key_properties]
+    max_pk_values = singer.get_bookmark(state, tap_stream_id, 'max_pk_values')
+    last_pk_fetched = singer.get_bookmark(state, tap_stream_id, 'last_pk_fetched')
+
+    manifest = singer.get_bookmark(state, tap_stream_id, 'parquet_manifest') if last_pk_fetched else None
+    manifest = manifest or []
+    state = singer.write_bookmark(state, tap_stream_id, 'parquet_manifest', manifest)
+
+    select_sql = common.generate_select_sql(catalog_entry, columns)
+
+    with open_connection(mysql_conn, snapshot) as open_conn:
+        with open_conn.cursor() as cur:
+            batch_size = common.get_fetch_batch_size(preflight.get_avg_row_length(cur, catalog_entry))
+            exporter = parquet_export.ParquetExporter(catalog_entry, columns, export_dir, batch_size)
+
+            if not max_pk_values:
+                LOGGER.info('Running %s', select_sql)
+                cur.execute(select_sql)
+
+            with metrics.record_counter(None) as counter:
+                counter.tags['database'] = common.get_database_name(catalog_entry)
+                counter.tags['table'] = catalog_entry.table
+
+                while True:
+                    if max_pk_values:
+                        page_sql, params = generate_keyset_page_query(select_sql,
+                                                                      key_properties,
+                                                                      max_pk_values,
+                                                                      last_pk_fetched,
+                                                                      rows_per_file)
+                        LOGGER.info('Running %s', cur.mogrify(page_sql, params))
+                        cur.execute(page_sql, params)
+
+                    path, row_count, last_row = exporter.write_file(cur, f'part-{len(manifest):05d}.parquet',
+                                                                    rows_per_file)
+
+                    if not row_count:
+                        break
+
+                    counter.increment(row_count)
+                    manifest.append({'path': path, 'rows': row_count})
+
+                    if max_pk_values:
+                        last_pk_fetched = {pk: convert(last_row[idx])
+                                           for pk, idx, convert in zip(key_properties, pk_indexes, pk_converters)}
+                        state = singer.write_bookmark(state, tap_stream_id, 'last_pk_fetched', last_pk_fetched)
+
+                    common.write_state_message(state, [tap_stream_id])
+
+                    if row_count < rows_per_file:
+                        break
+
+
+def sync_table(mysql_conn, catalog_entry, state, columns, stream_version, config=None, snapshot=None):
     common.whitelist_bookmark_keys(generate_bookmark_keys(catalog_entry), catalog_entry.tap_stream_id, state)
 
     bookmark = state.get('bookmarks', {}).get(catalog_entry.tap_stream_id, {})
@@ -132,48 +564,83 @@ def sync_table(mysql_conn, catalog_entry, state, columns, stream_version):
         version=stream_version
     )
 
+    config = config or {}
+
+    # Exported tables are loaded from the files, not versioned with messages
+    export_to_parquet = parquet_export.is_enabled(catalog_entry, config)
+
     # For the initial replication, emit an ACTIVATE_VERSION message
     # at the beginning so the records show up right away.
-    if not initial_full_table_complete and not (version_exists and state_version is None):
+    if not export_to_parquet and not initial_full_table_complete and not (version_exists and state_version is None):
         singer.write_message(activate_version_message)
 
-    key_props_are_auto_incrementing = pks_are_auto_incrementing(mysql_conn, catalog_entry)
+    parallelism = int(config.get('full_table_parallelism', 1))
+    page_size = int(config.get('full_table_page_size', 0))
+    sync_in_key_order = is_resumable(catalog_entry, columns)
+    sync_in_pk_chunks = False
+    sync_in_keyset_pages = False
+    params = {}
 
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with open_connection(mysql_conn, snapshot) as open_conn:
         with open_conn.cursor() as cur:
             select_sql = common.generate_select_sql(catalog_entry, columns)
 
-            if key_props_are_auto_incrementing:
-                LOGGER.info("Detected auto-incrementing primary key(s) - will replicate incrementally")
+            if sync_in_key_order:
+                LOGGER.info("Detected key column(s) %s - will replicate incrementally",
+                            get_keyset_columns(catalog_entry))
                 max_pk_values = singer.get_bookmark(state,
                                                     catalog_entry.tap_stream_id,
                                                     'max_pk_values') or get_max_pk_values(cur, catalog_entry)
 
-                if not max_pk_values:
-                    LOGGER.info("No max value for auto-incrementing PK found for table %s", catalog_entry.table)
-                else:
+                if max_pk_values:
                     state = singer.write_bookmark(state,
                                                   catalog_entry.tap_stream_id,
                                                   'max_pk_values',
                                                   max_pk_values)
 
-                    pk_clause = generate_pk_clause(catalog_entry, state)
+                    sync_in_pk_chunks = not export_to_parquet and init_pk_chunks(cur, catalog_entry, state, parallelism)
+                    max_pk_values = singer.get_bookmark(state, catalog_entry.tap_stream_id, 'max_pk_values')
 
-                    select_sql += pk_clause
-
-            params = {}
-
-            # pylint:disable=duplicate-code
-            common.sync_query(cur,
-                              catalog_entry,
-                              state,
-                              select_sql,
-                              columns,
-                              stream_version,
-                              params)
+                if not max_pk_values:
+                    LOGGER.info("No max value for key column(s) found for table %s", catalog_entry.table)
+                elif not (export_to_parquet or sync_in_pk_chunks):
+                    sync_in_keyset_pages = page_size > 0
+
+                    if not sync_in_keyset_pages:
+                        pk_clause, params = generate_pk_clause(catalog_entry, state)
+
+                        select_sql += pk_clause
+
+            if not (export_to_parquet or sync_in_pk_chunks or sync_in_keyset_pages):
+                # pylint:disable=duplicate-code
+                common.sync_query(cur,
+                                  catalog_entry,
+                                  state,
+                                  select_sql,
+                                  columns,
+                                  stream_version,
+                                  params,
+                                  config,
+                                  preflight.get_avg_row_length(cur, catalog_entry))
+
+    if export_to_parquet:
+        sync_table_to_parquet(mysql_conn, catalog_entry, state, columns, stream_version, config, snapshot)
+    elif sync_in_pk_chunks:
+        sync_table_in_pk_chunks(mysql_conn,
+                                catalog_entry,
+                                state,
+                                columns,
+                                stream_version,
+                                max(parallelism, 1),
+                                config,
+                                snapshot)
+    elif sync_in_keyset_pages:
+        sync_table_in_keyset_pages(mysql_conn, catalog_entry, state, columns, stream_version, page_size, snapshot)
 
     # clear max pk value and last pk fetched upon successful sync
     singer.clear_bookmark(state, catalog_entry.tap_stream_id, 'max_pk_values')
     singer.clear_bookmark(state, catalog_entry.tap_stream_id, 'last_pk_fetched')
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, 'pk_chunks')
 
-    singer.write_message(activate_version_message)
+    if not export_to_parquet:
+        singer.write_message(activate_version_message)
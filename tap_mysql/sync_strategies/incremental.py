@@ -3,22 +3,20 @@
 
 import pendulum
 import singer
-from singer import metadata
 
-from tap_mysql.connection import connect_with_backoff
+from tap_mysql import preflight
+from tap_mysql.catalog_index import get_stream_index
+from tap_mysql.connection import borrow_connection
 from tap_mysql.sync_strategies import common
 
 
-BOOKMARK_KEYS = {'replication_key', 'replication_key_value', 'version'}
+BOOKMARK_KEYS = {'replication_key', 'replication_key_value', 'version', 'sync_stats'}
 
 
-def sync_table(mysql_conn, catalog_entry, state, columns):
+def sync_table(mysql_conn, catalog_entry, state, columns, config=None):
     common.whitelist_bookmark_keys(BOOKMARK_KEYS, catalog_entry.tap_stream_id, state)
 
-    catalog_metadata = metadata.to_map(catalog_entry.metadata)
-    stream_metadata = catalog_metadata.get((), {})
-
-    replication_key_metadata = stream_metadata.get('replication-key')
+    replication_key_metadata = get_stream_index(catalog_entry).replication_key
     replication_key_state = singer.get_bookmark(state,
                                                 catalog_entry.tap_stream_id,
                                                 'replication_key')
@@ -49,7 +47,7 @@ def sync_table(mysql_conn, catalog_entry, state, columns):
 
     singer.write_message(activate_version_message)
 
-    with connect_with_backoff(mysql_conn) as open_conn:
+    with borrow_connection(mysql_conn) as open_conn:
         with open_conn.cursor() as cur:
             select_sql = common.generate_select_sql(catalog_entry, columns)
             params = {}
@@ -71,4 +69,6 @@ def sync_table(mysql_conn, catalog_entry, state, columns):
                               select_sql,
                               columns,
                               stream_version,
-                              params)
+                              params,
+                              config,
+                              preflight.get_avg_row_length(cur, catalog_entry))
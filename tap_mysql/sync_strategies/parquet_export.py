@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# pylint: disable=missing-function-docstring,import-outside-toplevel
+"""
+Columnar export of FULL_TABLE syncs to local Parquet files
+
+Writing the rows of a large initial load straight into Parquet files saves both the JSON encoding of every
+RECORD message and its parsing by the target. Requires the optional pyarrow dependency:
+
+    pip install pipelinewise-tap-mysql[parquet]
+"""
+import datetime
+import json
+import math
+import os
+import re
+
+from typing import Optional, Tuple
+from tap_mysql.catalog_index import get_stream_index
+from tap_mysql.sync_strategies import common
+
+DEFAULT_ROWS_PER_FILE = 1000000
+
+MAX_INT64 = 2 ** 63 - 1
+
+# DECIMAL columns are exported with the maximum precision of 128 bits decimals, and the ones of a greater
+# precision, up to the 65 digits of MySQL, as 256 bits decimals
+DECIMAL_PRECISION = 38
+
+DECIMAL_SQL_DATATYPE_RE = re.compile(r'^decimal\((\d+)')
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise Exception('Parquet export requires pyarrow, '
+                        'install it with: pip install pipelinewise-tap-mysql[parquet]') from exc
+
+    return pyarrow
+
+
+def is_enabled(catalog_entry, config) -> bool:
+    """
+    Returns True if the stream is to be exported to Parquet files, which is the case of every stream synced
+    with a full table query when parquet_export_dir is configured, unless its parquet-export metadata is false
+    """
+    if not (config or {}).get('parquet_export_dir'):
+        return False
+
+    return bool(get_stream_index(catalog_entry).stream_metadata.get('parquet-export', True))
+
+
+def _to_datetime(elem):
+    if isinstance(elem, datetime.datetime) or elem is None:
+        return elem
+
+    if isinstance(elem, datetime.date):
+        return datetime.datetime.combine(elem, datetime.time())
+
+    # pymysql returns the zero dates of some versions as timedeltas from the epoch
+    if isinstance(elem, datetime.timedelta):
+        return datetime.datetime.utcfromtimestamp(0) + elem
+
+    # and the dates it can't convert, e.g. '0000-00-00 00:00:00', as strings, which no timestamp can hold
+    return None
+
+
+def _to_text(elem):
+    if isinstance(elem, bytes):
+        return elem.decode('utf-8')
+
+    return elem
+
+
+def _to_json(elem):
+    if elem is None or isinstance(elem, str):
+        return elem
+
+    return json.dumps(elem)
+
+
+def _get_decimal_precision(sql_datatype: Optional[str]) -> Optional[int]:
+    match = DECIMAL_SQL_DATATYPE_RE.match(sql_datatype or '')
+
+    return int(match.group(1)) if match else None
+
+
+def arrow_type_for_property(pyarrow, property_schema, sql_datatype: Optional[str] = None):
+    # pylint: disable=too-many-return-statements
+    """
+    Maps the JSON schema that discovery generates for a column, and its sql-datatype metadata if known, to the
+    Arrow type of the exported column
+
+    Returns: tuple of the Arrow type and the function converting values read from MySQL, None if values
+        are exported as they are
+    """
+    property_type = property_schema.type or []
+
+    # binary and spatial columns are selected as hex strings and GeoJSON, like for the RECORD messages
+    if property_schema.format in ('binary', 'spatial'):
+        return pyarrow.string(), _to_text
+
+    if property_schema.format == 'date-time':
+        return pyarrow.timestamp('us', tz='UTC'), _to_datetime
+
+    if property_schema.format == 'time':
+        return pyarrow.duration('us'), None
+
+    if 'boolean' in property_type:
+        return pyarrow.bool_(), common.get_column_converter(property_schema)
+
+    if 'integer' in property_type:
+        if property_schema.maximum is not None and property_schema.maximum > MAX_INT64:
+            return pyarrow.uint64(), None
+
+        return pyarrow.int64(), None
+
+    if 'number' in property_type:
+        if property_schema.multipleOf:
+            scale = round(-math.log10(property_schema.multipleOf))
+            precision = _get_decimal_precision(sql_datatype)
+
+            if precision is not None and precision > DECIMAL_PRECISION:
+                return pyarrow.decimal256(precision, scale), None
+
+            return pyarrow.decimal128(DECIMAL_PRECISION, scale), None
+
+        return pyarrow.float64(), None
+
+    if 'object' in property_type:
+        return pyarrow.string(), _to_json
+
+    return pyarrow.string(), None
+
+
+class ParquetExporter:
+    """
+    Writes the rows of a query into Parquet files with one typed column per selected column
+    """
+
+    def __init__(self, catalog_entry, columns, export_dir, batch_size):
+        self.pyarrow = import_pyarrow()
+        self.export_dir = export_dir
+        self.batch_size = batch_size
+
+        md_map = get_stream_index(catalog_entry).md_map
+        fields = []
+        self.converters = []
+
+        for column in columns:
+            arrow_type, converter = arrow_type_for_property(self.pyarrow,
+                                                            catalog_entry.schema.properties[column],
+                                                            md_map.get(('properties', column), {}).get('sql-datatype'))
+            fields.append(self.pyarrow.field(column, arrow_type))
+            self.converters.append(converter)
+
+        self.schema = self.pyarrow.schema(fields)
+
+    def to_record_batch(self, rows):
+        arrays = []
+
+        for idx, (field, convert) in enumerate(zip(self.schema, self.converters)):
+            values = [row[idx] for row in rows] if convert is None else [convert(row[idx]) for row in rows]
+            arrays.append(self.pyarrow.array(values, type=field.type))
+
+        return self.pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def write_file(self, cursor, file_name, max_rows: Optional[int] = None) -> Tuple[str, int, Optional[tuple]]:
+        """
+        Writes the next rows of the cursor, at most max_rows of them, into one Parquet file.
+
+        The file is written under a temporary name and only renamed once complete, so an interrupted export
+        never leaves a partial file behind. No file is written if the cursor has no more rows.
+
+        Returns: tuple of the path of the file, the number of rows written and the last row written
+        """
+        path = os.path.join(self.export_dir, file_name)
+        tmp_path = path + '.tmp'
+        row_count = 0
+        last_row = None
+        writer = None
+
+        try:
+            while max_rows is None or row_count < max_rows:
+                rows = cursor.fetchmany(self.batch_size if max_rows is None
+                                        else min(self.batch_size, max_rows - row_count))
+
+                if not rows:
+                    break
+
+                if writer is None:
+                    os.makedirs(self.export_dir, exist_ok=True)
+                    writer = self.pyarrow.parquet.ParquetWriter(tmp_path, self.schema)
+
+                writer.write_table(self.pyarrow.Table.from_batches([self.to_record_batch(rows)]))
+                row_count += len(rows)
+                last_row = rows[-1]
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is not None:
+            os.replace(tmp_path, path)
+
+        return path, row_count, last_row
@@ -0,0 +1,66 @@
+"""
+Fixtures shared by the unit tests
+"""
+from collections import namedtuple
+from typing import Dict, Optional
+from unittest.mock import Mock
+
+from singer import CatalogEntry, Schema
+
+Column = namedtuple('Column', ['name', 'type'])
+
+
+def get_id_and_name_properties() -> Dict[str, Schema]:
+    return {'id': Schema(inclusion='automatic', type=['null', 'integer']),
+            'name': Schema(inclusion='available', type=['null', 'string'])}
+
+
+def get_catalog_entry(table: str = 'table_1',
+                      database_name: Optional[str] = 'my_db',
+                      properties: Optional[Dict[str, Schema]] = None,
+                      property_metadata: Optional[Dict[str, Dict]] = None,
+                      tap_stream_id: Optional[str] = None,
+                      stream: Optional[str] = None,
+                      **stream_metadata) -> CatalogEntry:
+    """
+    Returns the catalog entry of a table of the given properties, by default an integer id column, with the given
+    stream metadata and metadata of its properties
+
+    The tap_stream_id of the entry is the qualified name of the table, which is also its stream name by default
+    """
+    if tap_stream_id is None:
+        tap_stream_id = f'{database_name}-{table}' if database_name else table
+
+    if properties is None:
+        properties = {'id': Schema(inclusion='automatic', type=['null', 'integer'])}
+
+    if database_name is not None:
+        stream_metadata = {'database-name': database_name, **stream_metadata}
+
+    return CatalogEntry(
+        table=table,
+        stream=stream or tap_stream_id,
+        tap_stream_id=tap_stream_id,
+        schema=Schema(type='object', properties=properties),
+        metadata=[{'breadcrumb': (), 'metadata': stream_metadata}] +
+        [{'breadcrumb': ('properties', name), 'metadata': md} for name, md in (property_metadata or {}).items()])
+
+
+def get_keyed_catalog_entry(key_properties, replication_method='FULL_TABLE', **stream_metadata) -> CatalogEntry:
+    """
+    Returns the catalog entry of a table of id and name columns, keyed by the given columns
+    """
+    return get_catalog_entry(properties=get_id_and_name_properties(),
+                             **{'is-view': False,
+                                'replication-method': replication_method,
+                                'table-key-properties': key_properties,
+                                **stream_metadata})
+
+
+def get_binlogevent(class_name, attrs: Dict):
+    mock = Mock(spec=class_name)
+
+    for att, val in attrs.items():
+        setattr(mock, att, val)
+
+    return mock
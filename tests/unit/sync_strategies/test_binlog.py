@@ -4,32 +4,21 @@ import socket
 import pytz
 import os
 
-from collections import namedtuple
-from typing import Dict
 from unittest import TestCase
 from unittest.mock import patch, Mock, call, MagicMock
 
 from pymysql import InternalError
 from pymysql.cursors import Cursor
 from pymysqlreplication.constants import FIELD_TYPE
-from pymysqlreplication.event import RotateEvent, MariadbGtidEvent, GtidEvent
-from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+from pymysqlreplication.event import RotateEvent, MariadbGtidEvent, GtidEvent, HeartbeatLogEvent, QueryEvent, XidEvent
+from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, TableMapEvent
 from singer import CatalogEntry, Schema, Catalog, RecordMessage, StateMessage, SchemaMessage
 
+from helpers import Column, get_binlogevent
 from tap_mysql import connection
 from tap_mysql.connection import MySQLConnection
-from tap_mysql.sync_strategies import binlog
-
-Column = namedtuple('Column', ['name', 'type'])
-
-
-def get_binlogevent(class_name, attrs: Dict):
-    mock = Mock(spec=class_name)
-
-    for att, val in attrs.items():
-        setattr(mock, att, val)
-
-    return mock
+from tap_mysql.sync_strategies import binlog, binlog_records
+from tap_mysql.sync_strategies.binlog_schema import TableMap
 
 
 class TestBinlogSyncStrategy(TestCase):
@@ -616,8 +605,8 @@ class TestBinlogSyncStrategy(TestCase):
                 )
 
                 discover_catalog_mock.assert_has_calls([
-                    call(mysql_con, None, 'stream1'),
-                    call(mysql_con, None, 'stream2'),
+                    call(mysql_con, None, schema_tables=[('my_db', 'stream1')]),
+                    call(mysql_con, None, schema_tables=[('my_db', 'stream2')]),
                 ], any_order=False)
 
                 self.assertListEqual([type(msg) for msg in singer_messages], [
@@ -833,7 +822,10 @@ class TestBinlogSyncStrategy(TestCase):
                         'is_mariadb': False,
                         'server_id': 123,
                         'report_slave': socket.gethostname(),
-                        'only_events': [WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, RotateEvent],
+                        'only_events': [WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, TableMapEvent, QueryEvent,
+                                        XidEvent, RotateEvent],
+                        'only_tables': ['stream1', 'stream2'],
+                        'only_schemas': ['my_db'],
                         'log_file': 'binlog0001',
                         'log_pos': 50,
                         'resume_stream': True,
@@ -1404,8 +1396,8 @@ class TestBinlogSyncStrategy(TestCase):
                 )
 
                 discover_catalog_mock.assert_has_calls([
-                    call(mysql_con, None, 'stream1'),
-                    call(mysql_con, None, 'stream2'),
+                    call(mysql_con, None, schema_tables=[('my_db', 'stream1')]),
+                    call(mysql_con, None, schema_tables=[('my_db', 'stream2')]),
                 ], any_order=False)
 
                 self.assertListEqual([type(msg) for msg in singer_messages], [
@@ -1623,15 +1615,18 @@ class TestBinlogSyncStrategy(TestCase):
                         'is_mariadb': True,
                         'server_id': 123,
                         'report_slave': socket.gethostname(),
-                        'only_events': [WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, GtidEvent, MariadbGtidEvent],
+                        'only_events': [WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, TableMapEvent, QueryEvent,
+                                        XidEvent, GtidEvent, MariadbGtidEvent],
+                        'only_tables': ['stream1', 'stream2'],
+                        'only_schemas': ['my_db'],
                         'auto_position': '0-123-555',
                     }
                 )
 
                 self.assertEqual(1, reader_mock.return_value.close.call_count)
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_verify_binlog_config_success(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_verify_binlog_config_success(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
 
@@ -1643,11 +1638,11 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         binlog.verify_binlog_config(mysql_con)
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SELECT  @@binlog_format'),
@@ -1655,8 +1650,8 @@ class TestBinlogSyncStrategy(TestCase):
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_verify_binlog_config_fail_if_not_FULL(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_verify_binlog_config_fail_if_not_FULL(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
 
@@ -1668,7 +1663,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         with self.assertRaises(Exception) as context:
             binlog.verify_binlog_config(mysql_con)
@@ -1676,7 +1671,7 @@ class TestBinlogSyncStrategy(TestCase):
         self.assertEqual("Unable to replicate binlog stream because binlog_row_image is not set to 'FULL': "
                          "Not-FULL.", str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SELECT  @@binlog_format'),
@@ -1684,8 +1679,8 @@ class TestBinlogSyncStrategy(TestCase):
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_verify_binlog_config_fail_if_not_ROW(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_verify_binlog_config_fail_if_not_ROW(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
 
@@ -1696,7 +1691,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         with self.assertRaises(Exception) as context:
             binlog.verify_binlog_config(mysql_con)
@@ -1704,15 +1699,15 @@ class TestBinlogSyncStrategy(TestCase):
         self.assertEqual("Unable to replicate binlog stream because binlog_format is not set to 'ROW': Not-ROW.",
                          str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SELECT  @@binlog_format'),
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_verify_binlog_config_fail_if_binlog_row_image_not_supported(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_verify_binlog_config_fail_if_binlog_row_image_not_supported(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
 
@@ -1728,7 +1723,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         with self.assertRaises(Exception) as context:
             binlog.verify_binlog_config(mysql_con)
@@ -1738,7 +1733,7 @@ class TestBinlogSyncStrategy(TestCase):
                          "least 5.6.2 to use binlog replication.",
                          str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SELECT  @@binlog_format'),
@@ -1746,8 +1741,8 @@ class TestBinlogSyncStrategy(TestCase):
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_verify_gtid_config_success(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_verify_gtid_config_success(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
 
@@ -1758,19 +1753,19 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         binlog.verify_gtid_config(mysql_con)
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('select @@gtid_mode;'),
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_verify_gtid_config_fail_if_not_on(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_verify_gtid_config_fail_if_not_on(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
 
@@ -1781,22 +1776,22 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         with self.assertRaises(Exception) as context:
             binlog.verify_gtid_config(mysql_con)
 
         self.assertEqual("Unable to replicate binlog stream because GTID mode is not enabled.", str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('select @@gtid_mode;'),
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_fetch_current_log_file_and_pos_success(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_fetch_current_log_file_and_pos_success(self, borrow_connection):
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
         cur_mock.__enter__.return_value.fetchone.side_effect = [
@@ -1805,21 +1800,21 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         result = binlog.fetch_current_log_file_and_pos(mysql_con)
 
         self.assertEqual(result, ('binlog.000033', 345))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SHOW MASTER STATUS'),
             ]
         )
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_fetch_current_log_file_and_pos_fail_if_no_result(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_fetch_current_log_file_and_pos_fail_if_no_result(self, borrow_connection):
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
         cur_mock.__enter__.return_value.fetchone.side_effect = [
@@ -1828,14 +1823,14 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         with self.assertRaises(Exception) as context:
             binlog.fetch_current_log_file_and_pos(mysql_con)
 
         self.assertEqual('MySQL binary logging is not enabled.', str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SHOW MASTER STATUS'),
@@ -1843,9 +1838,9 @@ class TestBinlogSyncStrategy(TestCase):
         )
 
     @patch('tap_mysql.sync_strategies.binlog.connection.fetch_server_uuid')
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
     def test_fetch_current_gtid_pos_for_mysql_not_found_expect_exception(
-            self, connect_with_backoff, fetch_server_uuid):
+            self, borrow_connection, fetch_server_uuid):
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
         cur_mock.__enter__.return_value.fetchone.side_effect = [
@@ -1855,13 +1850,13 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
         fetch_server_uuid.return_value = '3E11FA47-71CA-11E1-9E33-C80AA9429562'
 
         with self.assertRaises(Exception):
             binlog.fetch_current_gtid_pos(mysql_con, connection.MYSQL_ENGINE)
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         fetch_server_uuid.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
@@ -1870,9 +1865,9 @@ class TestBinlogSyncStrategy(TestCase):
         )
 
     @patch('tap_mysql.sync_strategies.binlog.connection.fetch_server_uuid')
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
     def test_fetch_current_gtid_pos_for_mysql_succeeds(
-            self, connect_with_backoff, fetch_server_uuid):
+            self, borrow_connection, fetch_server_uuid):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
@@ -1883,14 +1878,14 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
         fetch_server_uuid.return_value = '3E11FA47-71CA-11E1-9E33-C80AA9429562'
 
         result = binlog.fetch_current_gtid_pos(mysql_con, connection.MYSQL_ENGINE)
 
         self.assertEqual('3E11FA47-71CA-11E1-9E33-C80AA9429562:1', result)
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         fetch_server_uuid.assert_called_with(mysql_con)
 
         cur_mock.__enter__.return_value.execute.assert_has_calls(
@@ -1900,9 +1895,9 @@ class TestBinlogSyncStrategy(TestCase):
         )
 
     @patch('tap_mysql.sync_strategies.binlog.connection.fetch_server_id')
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
     def test_fetch_current_gtid_pos_for_mariadb_no_gtid_found_expect_exception(
-            self, connect_with_backoff, fetch_server_id):
+            self, borrow_connection, fetch_server_id):
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
         cur_mock.__enter__.return_value.fetchone.side_effect = [
@@ -1911,7 +1906,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
         fetch_server_id.return_value = 2
 
         with self.assertRaises(Exception) as context:
@@ -1919,7 +1914,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         self.assertIn('GTID is not present on this server!', str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         fetch_server_id.assert_called_with(mysql_con)
 
         cur_mock.__enter__.return_value.execute.assert_has_calls(
@@ -1929,9 +1924,9 @@ class TestBinlogSyncStrategy(TestCase):
         )
 
     @patch('tap_mysql.sync_strategies.binlog.connection.fetch_server_id')
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
     def test_fetch_current_gtid_pos_no_gtid_found_for_given_server_expect_exception(
-            self, connect_with_backoff, fetch_server_id):
+            self, borrow_connection, fetch_server_id):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
@@ -1941,7 +1936,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         fetch_server_id.return_value = 2
 
@@ -1950,7 +1945,7 @@ class TestBinlogSyncStrategy(TestCase):
 
         self.assertIn('No suitable GTID was found for server', str(context.exception))
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
         fetch_server_id.assert_called_with(mysql_con)
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
@@ -1983,8 +1978,8 @@ class TestBinlogSyncStrategy(TestCase):
 
         self.assertEqual(result, '0-20-12')
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
-    def test_calculate_gtid_bookmark_for_mariadb_no_gtid_found_would_infer_from_binlog(self, connect_with_backoff):
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
+    def test_calculate_gtid_bookmark_for_mariadb_no_gtid_found_would_infer_from_binlog(self, borrow_connection):
 
         binlog_streams = {
             'stream1': {'schema': {}},
@@ -2017,7 +2012,8 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
+        mysql_con.pool.borrow.return_value = mysql_con
 
         result = binlog.calculate_gtid_bookmark(mysql_con, binlog_streams, state, connection.MARIADB_ENGINE)
 
@@ -2031,9 +2027,9 @@ class TestBinlogSyncStrategy(TestCase):
 
         self.assertEqual(result, '0-4-222')
 
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
     def test_calculate_gtid_bookmark_for_mariadb_no_gtid_found_would_infer_from_binlog_returns_many_gtids(self,
-                                                                                              connect_with_backoff):
+                                                                                              borrow_connection):
 
         binlog_streams = {
             'stream1': {'schema': {}},
@@ -2066,7 +2062,8 @@ class TestBinlogSyncStrategy(TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
+        mysql_con.pool.borrow.return_value = mysql_con
 
         result = binlog.calculate_gtid_bookmark(mysql_con, binlog_streams, state, connection.MARIADB_ENGINE)
 
@@ -2081,9 +2078,9 @@ class TestBinlogSyncStrategy(TestCase):
         self.assertEqual(result, '6-89-7222')
 
     @patch('tap_mysql.sync_strategies.binlog.calculate_bookmark')
-    @patch('tap_mysql.sync_strategies.binlog.connect_with_backoff')
+    @patch('tap_mysql.sync_strategies.binlog.borrow_connection')
     def test_calculate_gtid_bookmark_for_mariadb_no_gtid_nor_binlog_found_expect_exception(self,
-                                                                                           connect_with_backoff,
+                                                                                           borrow_connection,
                                                                                            calculate_bookmark):
 
         binlog_streams = {
@@ -2096,7 +2093,7 @@ class TestBinlogSyncStrategy(TestCase):
             'bookmarks': {}
         }
         mysql_conn = Mock(spec_set=MySQLConnection)
-        connect_with_backoff.return_value = mysql_conn
+        borrow_connection.return_value = mysql_conn
         calculate_bookmark.return_value = None, None
 
         with self.assertRaises(Exception) as context:
@@ -2147,3 +2144,446 @@ class TestBinlogSyncStrategy(TestCase):
 
         self.assertEqual("Couldn't find any gtid in state bookmarks to resume logical replication",
                          str(context.exception))
+
+    def test_binlog_row_converter(self):
+        catalog_entry = CatalogEntry(
+            table='stream1',
+            stream='my_db-stream1',
+            tap_stream_id='my_db-stream1',
+            schema=Schema(properties={
+                'c_int': Schema(type=['null', 'integer']),
+                'c_bool': Schema(type=['null', 'boolean']),
+                'c_bit': Schema(type=['null', 'boolean']),
+                'c_timestamp': Schema(type=['null', 'string'], format='date-time'),
+                'c_date': Schema(type=['null', 'string'], format='date-time'),
+                'c_time': Schema(type=['null', 'string'], format='time'),
+                'c_blob': Schema(type=['null', 'string']),
+                'c_json': Schema(type=['null', 'string']),
+            }))
+        db_column_types = {
+            'c_int': FIELD_TYPE.LONG,
+            'c_bool': FIELD_TYPE.TINY,
+            'c_bit': FIELD_TYPE.BIT,
+            'c_timestamp': FIELD_TYPE.TIMESTAMP2,
+            'c_date': FIELD_TYPE.DATE,
+            'c_time': FIELD_TYPE.TIME2,
+            'c_blob': FIELD_TYPE.BLOB,
+            'c_json': FIELD_TYPE.JSON,
+        }
+
+        row_converter = binlog_records.BinlogRowConverter(catalog_entry,
+                                                          5,
+                                                          list(db_column_types),
+                                                          db_column_types,
+                                                          pytz.timezone('Europe/Helsinki'))
+
+        self.assertIsNone(row_converter.converters['c_int'])
+
+        time_extracted = datetime.datetime(2020, 10, 13, 8, 29, 58, tzinfo=pytz.UTC)
+        record_message = row_converter.to_record({
+            'c_int': 3,
+            'c_bool': 2,
+            'c_bit': '0',
+            'c_timestamp': datetime.datetime(2020, 7, 1, 12, 0, 0),
+            'c_date': datetime.date(2020, 7, 1),
+            'c_time': datetime.timedelta(hours=1, minutes=2, seconds=3),
+            'c_blob': b'\x01\xff',
+            'c_json': {b'a': [b'b', 1]},
+            'c_not_selected': 1,
+        }, time_extracted)
+
+        self.assertEqual(RecordMessage(stream='my_db-stream1', version=5, time_extracted=time_extracted, record={
+            'c_int': 3,
+            'c_bool': True,
+            'c_bit': False,
+            'c_timestamp': '2020-07-01T09:00:00+00:00',
+            'c_date': '2020-07-01T00:00:00+00:00',
+            'c_time': '1:02:03',
+            'c_blob': '01ff',
+            'c_json': '{"a": ["b", 1]}',
+        }), record_message)
+
+        self.assertIsNone(row_converter.to_record({'c_bool': None, 'c_timestamp': None}, time_extracted)
+                          .record['c_timestamp'])
+
+    def test_get_row_converter_is_cached_by_table_map_and_schema(self):
+        catalog_entry = CatalogEntry(tap_stream_id='my_db-stream1', stream='my_db-stream1',
+                                     schema=Schema(properties={'c_int': Schema(type=['null', 'integer'])}))
+        state = {'bookmarks': {'my_db-stream1': {'version': 7}}}
+        row_converters = {}
+
+        table_map = TableMap([Column('c_int', FIELD_TYPE.LONG)], 'my_db-stream1')
+        row_converter = binlog.get_row_converter(table_map, catalog_entry, ['c_int'], state, row_converters, pytz.UTC)
+
+        self.assertEqual(7, row_converter.version)
+        self.assertIs(row_converter, table_map.row_converter)
+
+        # a new table map of the same columns gets the same converter
+        table_map = TableMap([Column('c_int', FIELD_TYPE.LONG)], 'my_db-stream1')
+        self.assertIs(row_converter,
+                      binlog.get_row_converter(table_map, catalog_entry, ['c_int'], state, row_converters, pytz.UTC))
+
+        new_catalog_entry = CatalogEntry(tap_stream_id='my_db-stream1', stream='my_db-stream1',
+                                         schema=catalog_entry.schema)
+        self.assertIsNot(row_converter, binlog.get_row_converter(table_map, new_catalog_entry, ['c_int'], state,
+                                                                 row_converters, pytz.UTC))
+
+    @patch('tap_mysql.sync_strategies.binlog.make_connection_wrapper')
+    def test_create_binlog_stream_reader_with_filter_dbs(self, make_connection_wrapper_mock):
+        config = {
+            'server_id': '123',
+            'use_gtid': False,
+            'engine': connection.MYSQL_ENGINE,
+            'filter_dbs': 'db1,db2,db3',
+        }
+
+        with patch('tap_mysql.sync_strategies.binlog.BinLogStreamReader', autospec=True) as reader_mock:
+            binlog.create_binlog_stream_reader(config, 'binlog0001', 50, None, [('db1', 'b'), ('db2', 'a'), ('db1', 'a')])
+
+        self.assertListEqual(['db1', 'db2', 'db3'], reader_mock.call_args[1]['only_schemas'])
+        self.assertListEqual(['a', 'b'], reader_mock.call_args[1]['only_tables'])
+
+    @patch('tap_mysql.sync_strategies.binlog.make_connection_wrapper')
+    def test_create_binlog_stream_reader_continuous(self, make_connection_wrapper_mock):
+        config = {
+            'server_id': '123',
+            'use_gtid': False,
+            'engine': connection.MYSQL_ENGINE,
+            'binlog_continuous': True,
+            'binlog_heartbeat_seconds': 2,
+        }
+
+        with patch('tap_mysql.sync_strategies.binlog.BinLogStreamReader', autospec=True) as reader_mock:
+            binlog.create_binlog_stream_reader(config, 'binlog0001', 50, None)
+
+        reader_mock.assert_called_once_with(
+            connection_settings={},
+            pymysql_wrapper=make_connection_wrapper_mock.return_value,
+            is_mariadb=False,
+            server_id=123,
+            report_slave=socket.gethostname(),
+            only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, TableMapEvent, QueryEvent, XidEvent,
+                         HeartbeatLogEvent, RotateEvent],
+            blocking=True,
+            slave_heartbeat=2.0,
+            log_file='binlog0001',
+            log_pos=50,
+            resume_stream=True,
+        )
+
+    @patch('tap_mysql.sync_strategies.binlog.discover_catalog')
+    def test_run_binlog_sync_continuous(self, discover_catalog_mock):
+        def get_catalog_entry(*columns):
+            return CatalogEntry(
+                table='stream1',
+                stream='my_db-stream1',
+                tap_stream_id='my_db-stream1',
+                schema=Schema(properties={column: Schema(inclusion='available', type=['null', 'integer'])
+                                          for column in columns}),
+                metadata=[
+                    {'breadcrumb': [], 'metadata': {'database-name': 'my_db', 'selected': True,
+                                                    'replication-method': 'LOG_BASED'}},
+                ] + [{'breadcrumb': ['properties', column], 'metadata': {'selected-by-default': True}}
+                     for column in columns])
+
+        binlog_streams_map = binlog.generate_streams_map([get_catalog_entry('c_int')])
+        discover_catalog_mock.return_value = Catalog([get_catalog_entry('c_int', 'c_new')])
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+        stop = Mock()
+        stop.is_set.side_effect = [False, False, False, False, True]
+
+        reader = Mock()
+        reader.auto_position = None
+        reader.__iter__ = Mock(return_value=iter([
+            get_binlogevent(WriteRowsEvent, {'schema': 'my_db', 'table': 'stream1', 'columns': [Column('c_int', 3)],
+                                             'rows': [{'values': {'c_int': 1}}]}),
+            get_binlogevent(HeartbeatLogEvent, {}),
+            get_binlogevent(QueryEvent, {'schema': b'my_db', 'query': 'ALTER TABLE stream1 ADD c_new int'}),
+            get_binlogevent(HeartbeatLogEvent, {}),
+            get_binlogevent(HeartbeatLogEvent, {}),
+        ]))
+        reader.log_file = 'binlog0001'
+        reader.log_pos = 10
+
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message') as write_msg, \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC):
+            write_msg.side_effect = singer_messages.append
+
+            binlog._run_binlog_sync(Mock(spec_set=MySQLConnection),
+                                    reader,
+                                    binlog_streams_map,
+                                    state,
+                                    {'checkpoint_rows': 0, 'checkpoint_interval_seconds': 0.000001},
+                                    None,
+                                    None,
+                                    binlog.RecordWriter(),
+                                    stop)
+
+        # STATE messages are due after every event, heartbeats included, and the altered table is discovered again
+        self.assertListEqual([RecordMessage, StateMessage, StateMessage, SchemaMessage, StateMessage, StateMessage],
+                             [type(msg) for msg in singer_messages])
+        self.assertEqual({'version': 1, 'log_file': 'binlog0001', 'log_pos': 10},
+                         singer_messages[1].value['bookmarks']['my_db-stream1'])
+        self.assertIn('c_new', binlog_streams_map['my_db-stream1']['desired_columns'])
+
+    @patch('tap_mysql.sync_strategies.binlog.discover_catalog')
+    def test_events_written_before_ddl_are_decoded_with_current_columns(self, discover_catalog_mock):
+        binlog_streams_map = binlog.generate_streams_map([CatalogEntry(
+            table='stream1',
+            stream='my_db-stream1',
+            tap_stream_id='my_db-stream1',
+            schema=Schema(properties={'c_int': Schema(inclusion='available', type=['null', 'integer'])}),
+            metadata=[
+                {'breadcrumb': [], 'metadata': {'database-name': 'my_db', 'selected': True,
+                                                'replication-method': 'LOG_BASED'}},
+                {'breadcrumb': ['properties', 'c_int'], 'metadata': {'selected-by-default': True}},
+            ])])
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+        singer_messages = []
+
+        # the event was written before `c_old` was dropped, whose value it still carries
+        write_rows_event = get_binlogevent(WriteRowsEvent, {
+            'table_id': 7, 'schema': 'my_db', 'table': 'stream1',
+            'columns': [Column('c_int', 3), Column('__dropped_col_1__', 252)],
+            'rows': [{'values': {'c_int': 1, '__dropped_col_1__': b'old'}}]})
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message') as write_msg, \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC):
+            write_msg.side_effect = singer_messages.append
+
+            handler = binlog.BinlogEventHandler(Mock(spec_set=MySQLConnection), {}, binlog_streams_map, state,
+                                                binlog.RecordWriter())
+            handler.handle_event(write_rows_event, Mock(), False)
+
+        discover_catalog_mock.assert_not_called()
+        self.assertListEqual([{'c_int': 1}], [msg.record for msg in singer_messages])
+
+    def test_run_binlog_sync_checkpoints_between_transactions(self):
+        binlog_streams_map = binlog.generate_streams_map([CatalogEntry(
+            table='stream1',
+            stream='my_db-stream1',
+            tap_stream_id='my_db-stream1',
+            schema=Schema(properties={'c_int': Schema(inclusion='available', type=['null', 'integer'])}),
+            metadata=[
+                {'breadcrumb': [], 'metadata': {'database-name': 'my_db', 'selected': True,
+                                                'replication-method': 'LOG_BASED'}},
+                {'breadcrumb': ['properties', 'c_int'], 'metadata': {'selected-by-default': True}},
+            ])])
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+
+        def get_write_rows_event(value):
+            return get_binlogevent(WriteRowsEvent, {'schema': 'my_db', 'table': 'stream1',
+                                                    'columns': [Column('c_int', 3)],
+                                                    'rows': [{'values': {'c_int': value}}]})
+
+        stop = Mock()
+        # stopping in the middle of the second transaction waits for its commit
+        stop.is_set.side_effect = [False] * 5 + [True] * 4
+
+        reader = Mock()
+        reader.auto_position = None
+        reader.__iter__ = Mock(return_value=iter([
+            get_binlogevent(QueryEvent, {'schema': b'my_db', 'query': 'BEGIN'}),
+            get_write_rows_event(1),
+            get_write_rows_event(2),
+            get_binlogevent(XidEvent, {'xid': 1}),
+            get_binlogevent(GtidEvent, {'gtid': 'abc:2'}),
+            get_write_rows_event(3),
+            get_binlogevent(QueryEvent, {'schema': b'my_db', 'query': 'COMMIT'}),
+            get_write_rows_event(4),
+        ]))
+        reader.log_file = 'binlog0001'
+        reader.log_pos = 10
+
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message') as write_msg, \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC):
+            write_msg.side_effect = singer_messages.append
+
+            binlog._run_binlog_sync(Mock(spec_set=MySQLConnection),
+                                    reader,
+                                    binlog_streams_map,
+                                    state,
+                                    {'checkpoint_rows': 1},
+                                    None,
+                                    None,
+                                    binlog.RecordWriter(),
+                                    stop)
+
+        self.assertListEqual([RecordMessage, RecordMessage, StateMessage, RecordMessage, StateMessage],
+                             [type(msg) for msg in singer_messages])
+        self.assertEqual([1, 2, 3], [msg.record['c_int'] for msg in singer_messages
+                                     if isinstance(msg, RecordMessage)])
+        self.assertEqual({'version': 1, 'log_file': 'binlog0001', 'log_pos': 10, 'gtid': 'abc:2'},
+                         singer_messages[4].value['bookmarks']['my_db-stream1'])
+
+    def test_run_binlog_sync_advances_past_filtered_events(self):
+        binlog_streams_map = binlog.generate_streams_map([CatalogEntry(
+            table='stream1',
+            stream='my_db-stream1',
+            tap_stream_id='my_db-stream1',
+            schema=Schema(properties={'c_int': Schema(inclusion='available', type=['null', 'integer'])}),
+            metadata=[
+                {'breadcrumb': [], 'metadata': {'database-name': 'my_db', 'selected': True,
+                                                'replication-method': 'LOG_BASED'}},
+                {'breadcrumb': ['properties', 'c_int'], 'metadata': {'selected-by-default': True}},
+            ])])
+
+        reader = Mock()
+        reader.auto_position = None
+        reader.log_file = 'binlog0001'
+
+        def iter_events(log_positions):
+            # the reader skips the events of the other tables, its position moving past them
+            for log_pos, binlog_event in log_positions:
+                reader.log_pos = log_pos
+
+                if binlog_event is not None:
+                    yield binlog_event
+
+        write_rows_event = get_binlogevent(WriteRowsEvent, {'schema': 'my_db', 'table': 'stream1',
+                                                            'columns': [Column('c_int', 3)],
+                                                            'rows': [{'values': {'c_int': 1}}]})
+
+        # the events after the last synced one were filtered out
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+        reader.__iter__ = Mock(return_value=iter_events([(10, write_rows_event), (20, None), (30, None)]))
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message'), \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC):
+            binlog._run_binlog_sync(Mock(spec_set=MySQLConnection), reader, binlog_streams_map, state, {},
+                                    'binlog0002', 4, binlog.RecordWriter())
+
+        self.assertEqual({'version': 1, 'log_file': 'binlog0001', 'log_pos': 30},
+                         state['bookmarks']['my_db-stream1'])
+
+        # continuous syncs checkpoint at the position of the heartbeats
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+        reader.__iter__ = Mock(return_value=iter_events([(10, write_rows_event), (20, None),
+                                                         (30, get_binlogevent(HeartbeatLogEvent, {}))]))
+        stop = Mock()
+        stop.is_set.side_effect = [False, False, True]
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message') as write_msg, \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC):
+            write_msg.side_effect = singer_messages.append
+
+            binlog._run_binlog_sync(Mock(spec_set=MySQLConnection), reader, binlog_streams_map, state,
+                                    {'checkpoint_rows': 1000, 'checkpoint_interval_seconds': 0.000001}, None, None,
+                                    binlog.RecordWriter(), stop)
+
+        self.assertListEqual([RecordMessage, StateMessage, StateMessage], [type(msg) for msg in singer_messages])
+        self.assertListEqual([10, 30], [msg.value['bookmarks']['my_db-stream1']['log_pos']
+                                        for msg in singer_messages[1:]])
+
+    def test_run_binlog_sync_compacts_records(self):
+        binlog_streams_map = binlog.generate_streams_map([CatalogEntry(
+            table='stream1',
+            stream='my_db-stream1',
+            tap_stream_id='my_db-stream1',
+            schema=Schema(properties={'c_pk': Schema(inclusion='automatic', type=['null', 'integer']),
+                                      'c_int': Schema(inclusion='available', type=['null', 'integer'])}),
+            metadata=[
+                {'breadcrumb': [], 'metadata': {'database-name': 'my_db', 'selected': True,
+                                                'replication-method': 'LOG_BASED',
+                                                'table-key-properties': ['c_pk']}},
+                {'breadcrumb': ['properties', 'c_pk'], 'metadata': {'inclusion': 'automatic'}},
+                {'breadcrumb': ['properties', 'c_int'], 'metadata': {'selected-by-default': True}},
+            ])])
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+
+        def get_update_rows_event(*rows):
+            return get_binlogevent(UpdateRowsEvent, {
+                'schema': 'my_db', 'table': 'stream1', 'columns': [Column('c_pk', 3), Column('c_int', 3)],
+                'rows': [{'after_values': {'c_pk': c_pk, 'c_int': c_int}} for c_pk, c_int in rows]})
+
+        reader = Mock()
+        reader.auto_position = None
+        reader.__iter__ = Mock(return_value=iter([
+            get_binlogevent(QueryEvent, {'schema': b'my_db', 'query': 'BEGIN'}),
+            get_update_rows_event((1, 1), (2, 1)),
+            get_update_rows_event((1, 2)),
+            get_binlogevent(XidEvent, {'xid': 1}),
+            get_binlogevent(QueryEvent, {'schema': b'my_db', 'query': 'BEGIN'}),
+            get_update_rows_event((1, 3)),
+            get_binlogevent(XidEvent, {'xid': 2}),
+            get_update_rows_event((2, 2)),
+        ]))
+        reader.log_file = 'binlog0001'
+        reader.log_pos = 10
+
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message') as write_msg, \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC):
+            write_msg.side_effect = singer_messages.append
+
+            record_writer = binlog_records.get_record_writer({'binlog_compaction_window_transactions': 2})
+
+            binlog._run_binlog_sync(Mock(spec_set=MySQLConnection),
+                                    reader,
+                                    binlog_streams_map,
+                                    state,
+                                    {'checkpoint_rows': 0},
+                                    'binlog0002',
+                                    4,
+                                    record_writer)
+            record_writer.flush()
+
+        # the window of two transactions closes at the second commit, the last event is written at the end
+        self.assertListEqual([RecordMessage, RecordMessage, StateMessage, RecordMessage],
+                             [type(msg) for msg in singer_messages])
+        self.assertListEqual([{'c_pk': 2, 'c_int': 1}, {'c_pk': 1, 'c_int': 3}, {'c_pk': 2, 'c_int': 2}],
+                             [msg.record for msg in singer_messages if isinstance(msg, RecordMessage)])
+
+    def test_run_binlog_sync_writes_closed_compaction_window_when_idle(self):
+        binlog_streams_map = binlog.generate_streams_map([CatalogEntry(
+            table='stream1',
+            stream='my_db-stream1',
+            tap_stream_id='my_db-stream1',
+            schema=Schema(properties={'c_int': Schema(inclusion='available', type=['null', 'integer'])}),
+            metadata=[
+                {'breadcrumb': [], 'metadata': {'database-name': 'my_db', 'selected': True,
+                                                'replication-method': 'LOG_BASED',
+                                                'table-key-properties': ['c_int']}},
+                {'breadcrumb': ['properties', 'c_int'], 'metadata': {'selected-by-default': True}},
+            ])])
+        state = {'bookmarks': {'my_db-stream1': {'version': 1}}}
+        stop = Mock()
+        stop.is_set.side_effect = [False, False, True]
+
+        reader = Mock()
+        reader.auto_position = None
+        reader.__iter__ = Mock(return_value=iter([
+            get_binlogevent(WriteRowsEvent, {'schema': 'my_db', 'table': 'stream1', 'columns': [Column('c_int', 3)],
+                                             'rows': [{'values': {'c_int': 1}}]}),
+            get_binlogevent(HeartbeatLogEvent, {}),
+            get_binlogevent(HeartbeatLogEvent, {}),
+        ]))
+        reader.log_file = 'binlog0001'
+        reader.log_pos = 10
+
+        singer_messages = []
+        record_writer = binlog_records.get_record_writer({'binlog_compaction_window_seconds': 60})
+
+        with patch('tap_mysql.sync_strategies.binlog.singer.write_message') as write_msg, \
+                patch('tap_mysql.sync_strategies.binlog.tzlocal.get_localzone', return_value=pytz.UTC), \
+                patch.object(record_writer, 'is_window_closed', side_effect=[False, True]):
+            write_msg.side_effect = singer_messages.append
+
+            binlog._run_binlog_sync(Mock(spec_set=MySQLConnection),
+                                    reader,
+                                    binlog_streams_map,
+                                    state,
+                                    {'checkpoint_rows': 0, 'checkpoint_interval_seconds': 1000},
+                                    None,
+                                    None,
+                                    record_writer,
+                                    stop)
+
+        # the window closed while the server was idle
+        self.assertListEqual([RecordMessage, StateMessage], [type(msg) for msg in singer_messages])
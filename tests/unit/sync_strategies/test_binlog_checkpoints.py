@@ -0,0 +1,90 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from pymysqlreplication.event import GtidEvent, MariadbGtidEvent, QueryEvent, XidEvent
+
+from helpers import get_binlogevent
+from tap_mysql.sync_strategies import binlog_checkpoints
+from tap_mysql.sync_strategies.common import CheckpointPolicy
+
+
+class TestTransactionTracker(TestCase):
+
+    def test_on_event(self):
+        tracker = binlog_checkpoints.TransactionTracker()
+
+        tracker.on_event(get_binlogevent(MariadbGtidEvent, {'gtid': '0-1-2', 'flags': 0}))
+        self.assertTrue(tracker.in_transaction)
+
+        # savepoints don't end a transaction, MariaDB GTID events of transactions stand for BEGIN
+        tracker.on_event(get_binlogevent(QueryEvent, {'query': 'SAVEPOINT sp1'}))
+        self.assertTrue(tracker.in_transaction)
+
+        self.assertTrue(tracker.on_event(get_binlogevent(XidEvent, {'xid': 3})))
+        self.assertFalse(tracker.in_transaction)
+
+        # DDL statements are transactions of their own
+        tracker.on_event(get_binlogevent(GtidEvent, {'gtid': 'abc:3'}))
+        self.assertTrue(tracker.in_transaction)
+        self.assertTrue(tracker.on_event(get_binlogevent(QueryEvent, {'query': 'ALTER TABLE stream1 ADD c int'})))
+        self.assertFalse(tracker.in_transaction)
+
+    def test_savepoint_in_transaction_without_begin(self):
+        tracker = binlog_checkpoints.TransactionTracker()
+
+        # MariaDB GTID events flagged standalone, or without flags, are followed by no BEGIN statement
+        tracker.on_event(get_binlogevent(MariadbGtidEvent, {'gtid': '0-1-2', 'flags': 0x01}))
+        self.assertTrue(tracker.in_transaction)
+
+        for query in ('SAVEPOINT sp1', 'ROLLBACK TO SAVEPOINT sp1', 'RELEASE SAVEPOINT sp1'):
+            self.assertFalse(tracker.on_event(get_binlogevent(QueryEvent, {'query': query})))
+            self.assertTrue(tracker.in_transaction)
+
+        self.assertTrue(tracker.on_event(get_binlogevent(QueryEvent, {'query': 'COMMIT'})))
+        self.assertFalse(tracker.in_transaction)
+
+
+class TestBinlogCheckpoints(TestCase):
+
+    def setUp(self):
+        self.record_writer = Mock()
+        self.record_writer.is_window_closed.return_value = False
+        self.checkpoints = binlog_checkpoints.BinlogCheckpoints(CheckpointPolicy({'checkpoint_rows': 2}),
+                                                                self.record_writer,
+                                                                {'my_db-stream1': {}},
+                                                                'abc:1')
+
+    def test_checkpoints_only_in_between_transactions(self):
+        self.checkpoints.on_event(get_binlogevent(GtidEvent, {'gtid': 'abc:2'}))
+        self.assertEqual('abc:2', self.checkpoints.gtid_pos)
+
+        self.assertFalse(self.checkpoints.add(2))
+
+        self.checkpoints.on_event(get_binlogevent(XidEvent, {'xid': 2}))
+        self.record_writer.end_transaction.assert_called_once_with()
+
+        self.assertTrue(self.checkpoints.add(0))
+
+    def test_no_checkpoint_after_savepoint_in_transaction(self):
+        self.checkpoints.on_event(get_binlogevent(MariadbGtidEvent, {'gtid': '0-1-3', 'flags': 0x01}))
+        self.checkpoints.on_event(get_binlogevent(QueryEvent, {'query': 'SAVEPOINT sp1'}))
+
+        self.assertFalse(self.checkpoints.add(2))
+        self.record_writer.end_transaction.assert_not_called()
+
+        self.checkpoints.on_event(get_binlogevent(XidEvent, {'xid': 3}))
+        self.assertTrue(self.checkpoints.add(0))
+
+    def test_write(self):
+        state = {}
+
+        # nothing synced yet
+        self.assertDictEqual({}, self.checkpoints.write(state))
+        self.record_writer.write_state.assert_called_once()
+
+        self.checkpoints.move_to('binlog.000002', 40)
+
+        self.assertDictEqual({'bookmarks': {'my_db-stream1': {'log_file': 'binlog.000002',
+                                                              'log_pos': 40,
+                                                              'gtid': 'abc:1'}}},
+                             self.checkpoints.write(state))
@@ -0,0 +1,128 @@
+import datetime
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import pytz
+
+from pymysqlreplication.constants import FIELD_TYPE
+from singer import CatalogEntry, Schema, RecordMessage, StateMessage
+
+from tap_mysql.sync_strategies import binlog, binlog_records
+from tap_mysql.sync_strategies.binlog_compaction import CompactingRecordWriter
+from tap_mysql.sync_strategies.binlog_pipeline import RecordWriter
+
+
+def get_row_converter(stream, key_properties):
+    catalog_entry = CatalogEntry(
+        tap_stream_id=f'my_db-{stream}',
+        stream=stream,
+        schema=Schema(properties={
+            'id': Schema(type=['null', 'integer']),
+            'counter': Schema(type=['null', 'integer']),
+            binlog.SDC_DELETED_AT: Schema(type=['null', 'string'], format='date-time'),
+        }),
+        metadata=[{'breadcrumb': [], 'metadata': {'table-key-properties': key_properties}}])
+
+    return binlog_records.BinlogRowConverter(catalog_entry,
+                                             1,
+                                             ['id', 'counter', binlog.SDC_DELETED_AT],
+                                             {'id': FIELD_TYPE.LONG, 'counter': FIELD_TYPE.LONG},
+                                             pytz.UTC)
+
+
+class TestCompactingRecordWriter(TestCase):
+
+    def setUp(self):
+        self.time_extracted = datetime.datetime(2020, 10, 13, 8, 29, 58, tzinfo=pytz.UTC)
+        self.messages = []
+
+        patcher = patch('tap_mysql.sync_strategies.binlog_pipeline.singer.write_message',
+                        side_effect=self.messages.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_writes_last_image_of_every_row_in_binlog_order(self):
+        counters = get_row_converter('counters', ['id'])
+        logs = get_row_converter('logs', [])
+        record_writer = CompactingRecordWriter(RecordWriter())
+
+        record_writer.write_records(counters, [{'id': 1, 'counter': 1}, {'id': 2, 'counter': 1}], self.time_extracted)
+        record_writer.write_records(logs, [{'id': 1, 'counter': 1}], self.time_extracted)
+        record_writer.write_records(counters, [{'id': 1, 'counter': 2}], self.time_extracted)
+        record_writer.write_records(logs, [{'id': 1, 'counter': 1}], self.time_extracted)
+        record_writer.write_records(counters, [{'id': 2, 'counter': 2, binlog.SDC_DELETED_AT: '2020-10-13'}],
+                                    self.time_extracted)
+
+        self.assertEqual(4, record_writer.buffered_rows)
+        self.assertListEqual([], self.messages)
+
+        record_writer.write_state({'bookmarks': {'my_db-counters': {'log_pos': 1}}}, ['my_db-counters'])
+
+        self.assertListEqual([RecordMessage] * 4 + [StateMessage], [type(message) for message in self.messages])
+        self.assertListEqual([
+            ('logs', {'id': 1, 'counter': 1}),
+            ('counters', {'id': 1, 'counter': 2}),
+            ('logs', {'id': 1, 'counter': 1}),
+            ('counters', {'id': 2, 'counter': 2, binlog.SDC_DELETED_AT: '2020-10-13'}),
+        ], [(message.stream, message.record) for message in self.messages[:4]])
+        self.assertEqual(0, record_writer.buffered_rows)
+
+    def test_window_closes_after_transactions(self):
+        counters = get_row_converter('counters', ['id'])
+        record_writer = CompactingRecordWriter(RecordWriter(), window_transactions=2)
+
+        record_writer.end_transaction()
+        self.assertFalse(record_writer.is_window_closed())
+
+        record_writer.write_records(counters, [{'id': 1, 'counter': 1}], self.time_extracted)
+        self.assertFalse(record_writer.is_window_closed())
+
+        record_writer.end_transaction()
+        self.assertTrue(record_writer.is_window_closed())
+
+        record_writer.flush()
+        self.assertFalse(record_writer.is_window_closed())
+        self.assertListEqual([{'id': 1, 'counter': 1}], [message.record for message in self.messages])
+
+    def test_window_closes_after_seconds(self):
+        counters = get_row_converter('counters', ['id'])
+        record_writer = CompactingRecordWriter(RecordWriter(), window_seconds=60)
+
+        with patch('tap_mysql.sync_strategies.binlog_compaction.time.monotonic', side_effect=[100, 130, 161]):
+            record_writer.write_records(counters, [{'id': 1, 'counter': 1}], self.time_extracted)
+
+            self.assertFalse(record_writer.is_window_closed())
+            self.assertTrue(record_writer.is_window_closed())
+
+    def test_writes_records_once_too_many_are_buffered(self):
+        counters = get_row_converter('counters', ['id'])
+        record_writer = CompactingRecordWriter(RecordWriter(), window_transactions=10, max_rows=2)
+
+        record_writer.write_records(counters, [{'id': 1, 'counter': 1}, {'id': 1, 'counter': 2}], self.time_extracted)
+        self.assertListEqual([], self.messages)
+
+        # in the middle of a transaction, without STATE message
+        record_writer.write_records(counters, [{'id': 2, 'counter': 1}], self.time_extracted)
+        self.assertListEqual([{'id': 1, 'counter': 2}, {'id': 2, 'counter': 1}],
+                             [message.record for message in self.messages])
+        self.assertEqual(0, record_writer.buffered_rows)
+
+    def test_idle_keeps_the_records_buffered(self):
+        record_writer = CompactingRecordWriter(RecordWriter(), window_seconds=60)
+
+        record_writer.write_records(get_row_converter('counters', ['id']), [{'id': 1, 'counter': 1}],
+                                    self.time_extracted)
+        record_writer.idle()
+
+        self.assertListEqual([], self.messages)
+        self.assertEqual(1, record_writer.buffered_rows)
+
+    def test_get_record_writer(self):
+        self.assertNotIsInstance(binlog_records.get_record_writer({}), CompactingRecordWriter)
+
+        record_writer = binlog_records.get_record_writer({'binlog_compaction_window_seconds': '30'})
+
+        self.assertIsInstance(record_writer, CompactingRecordWriter)
+        self.assertEqual(30, record_writer.window_seconds)
+        self.assertEqual(0, record_writer.window_transactions)
@@ -0,0 +1,49 @@
+import os
+import signal
+import threading
+
+from unittest import TestCase
+
+from tap_mysql.sync_strategies import binlog_continuous
+
+
+class TestBinlogContinuous(TestCase):
+
+    def test_get_checkpoint_config(self):
+        config = {'binlog_continuous': True}
+
+        self.assertDictEqual({'binlog_continuous': True, 'checkpoint_interval_seconds': 10},
+                             binlog_continuous.get_checkpoint_config(config))
+        self.assertDictEqual({'binlog_continuous': True}, config)
+
+        self.assertEqual(60, binlog_continuous.get_checkpoint_config(
+            {'checkpoint_interval_seconds': 60})['checkpoint_interval_seconds'])
+
+    def test_get_heartbeat_seconds(self):
+        self.assertEqual(1, binlog_continuous.get_heartbeat_seconds({}))
+        self.assertEqual(2.5, binlog_continuous.get_heartbeat_seconds({'binlog_heartbeat_seconds': '2.5'}))
+
+    def test_stop_on_signals(self):
+        previous_handler = signal.getsignal(signal.SIGTERM)
+
+        with binlog_continuous.stop_on_signals() as stop:
+            self.assertFalse(stop.is_set())
+
+            os.kill(os.getpid(), signal.SIGTERM)
+
+            self.assertTrue(stop.wait(1))
+
+        self.assertIs(previous_handler, signal.getsignal(signal.SIGTERM))
+
+    def test_stop_on_signals_outside_main_thread(self):
+        stops = []
+
+        def run():
+            with binlog_continuous.stop_on_signals() as stop:
+                stops.append(stop)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+        self.assertFalse(stops[0].is_set())
@@ -0,0 +1,107 @@
+import datetime
+import io
+import json
+
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+import pytz
+
+from pymysqlreplication.constants import FIELD_TYPE
+from pymysqlreplication.event import GtidEvent
+from singer import CatalogEntry, Schema
+
+from tap_mysql.sync_strategies import binlog, binlog_pipeline, binlog_records
+
+
+class FakeReader:
+
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+        self.log_file = 'binlog.000001'
+        self.log_pos = 0
+        self.auto_position = None
+
+    def __iter__(self):
+        for idx, event in enumerate(self.events):
+            self.log_pos = (idx + 1) * 10
+            yield event
+
+        if self.error:
+            raise self.error
+
+
+class TestReadEvents(TestCase):
+
+    def test_yields_events_with_their_position(self):
+        gtid_event = Mock(spec=GtidEvent)
+        gtid_event.gtid = 'abc:12'
+        reader = FakeReader(['a', gtid_event, 'c'])
+
+        self.assertListEqual([
+            ('a', 'binlog.000001', 10),
+            (gtid_event, 'binlog.000001', 20),
+            ('c', 'binlog.000001', 30),
+        ], list(binlog_pipeline.read_events(reader, read_ahead=1)))
+        self.assertEqual('abc:12', reader.auto_position)
+
+    def test_raises_errors_of_the_reader(self):
+        events = binlog_pipeline.read_events(FakeReader(['a'], error=ValueError('lost connection')))
+
+        self.assertEqual('a', next(events)[0])
+
+        with self.assertRaises(ValueError):
+            next(events)
+
+    def test_stops_reading_when_closed(self):
+        events = binlog_pipeline.read_events(FakeReader(list(range(100))), read_ahead=2)
+
+        self.assertEqual(0, next(events)[0])
+        events.close()
+
+
+class TestPipelinedRecordWriter(TestCase):
+
+    def test_writes_records_and_state_in_order(self):
+        catalog_entry = CatalogEntry(
+            tap_stream_id='my_db-stream1',
+            stream='my_db-stream1',
+            schema=Schema(properties={
+                'c_int': Schema(type=['null', 'integer']),
+                'c_datetime': Schema(type=['null', 'string'], format='date-time'),
+            }))
+        row_converter = binlog_records.BinlogRowConverter(catalog_entry,
+                                                          3,
+                                                          ['c_int', 'c_datetime'],
+                                                          {'c_int': FIELD_TYPE.LONG, 'c_datetime': FIELD_TYPE.DATETIME2},
+                                                          pytz.UTC)
+        time_extracted = datetime.datetime(2020, 10, 13, 8, 29, 58, tzinfo=pytz.UTC)
+        state = {'bookmarks': {'my_db-stream1': {'log_pos': 1}}}
+
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+                patch.object(binlog_pipeline, 'BATCH_ROWS', 3):
+            record_writer = binlog_pipeline.PipelinedRecordWriter(2, binlog_records.convert_record_batch)
+
+            try:
+                for i in range(5):
+                    record_writer.write_records(row_converter,
+                                                [{'c_int': i, 'c_datetime': datetime.datetime(2020, 1, 1, i)}],
+                                                time_extracted)
+
+                record_writer.write_state(state, ['my_db-stream1'])
+                state['bookmarks']['my_db-stream1']['log_pos'] = 2
+
+                record_writer.write_records(row_converter, [{'c_int': 5, 'c_other': 1}], time_extracted)
+                record_writer.flush()
+            finally:
+                record_writer.close()
+
+            messages = [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+        self.assertListEqual(['RECORD'] * 5 + ['STATE', 'RECORD'], [message['type'] for message in messages])
+        self.assertListEqual(list(range(5)), [message['record']['c_int'] for message in messages[:5]])
+        self.assertDictEqual({'c_int': 1, 'c_datetime': '2020-01-01T01:00:00+00:00'}, messages[1]['record'])
+        self.assertEqual(3, messages[1]['version'])
+        self.assertDictEqual({'bookmarks': {'my_db-stream1': {'log_pos': 1}}}, messages[5]['value'])
+        self.assertDictEqual({'c_int': 5}, messages[6]['record'])
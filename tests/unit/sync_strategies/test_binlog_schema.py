@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from pymysqlreplication.event import QueryEvent
+from pymysqlreplication.row_event import TableMapEvent, WriteRowsEvent
+
+from helpers import Column, get_binlogevent
+from tap_mysql.sync_strategies import binlog_schema
+from tap_mysql.sync_strategies.binlog_schema import BinlogSchemaCache
+
+
+class TestGetDdlTable(TestCase):
+
+    def test_parses_table_of_ddl_statements(self):
+        self.assertEqual(('db', 'tbl'), binlog_schema.get_ddl_table('ALTER TABLE tbl ADD COLUMN c int', 'db'))
+        self.assertEqual(('db2', 'my tbl'),
+                         binlog_schema.get_ddl_table('alter online table `db2`.`my tbl` drop c', 'db'))
+        self.assertEqual(('db', 'tbl'), binlog_schema.get_ddl_table('DROP TABLE IF EXISTS db.tbl', None))
+        self.assertEqual(('db', 'tbl'), binlog_schema.get_ddl_table('\nRENAME TABLE tbl TO tbl2', 'db'))
+
+    def test_ignores_other_statements(self):
+        self.assertIsNone(binlog_schema.get_ddl_table('BEGIN', 'db'))
+        self.assertIsNone(binlog_schema.get_ddl_table('CREATE DATABASE db', 'db'))
+        self.assertIsNone(binlog_schema.get_ddl_table('ALTER USER u', 'db'))
+
+
+class TestBinlogSchemaCache(TestCase):
+
+    def test_reads_columns_once_per_table_map(self):
+        schema_cache = BinlogSchemaCache()
+        columns = [Column('id', 3), Column('name', 15)]
+
+        table_map = get_binlogevent(TableMapEvent, {'table_id': 7, 'schema': 'db', 'table': 'tbl',
+                                                    'columns': columns})
+        self.assertEqual(('id', 'name'), schema_cache.get_columns(table_map))
+
+        # the row events share the columns list of their table map
+        columns.append(Column('ignored', 3))
+        row_event = get_binlogevent(WriteRowsEvent, {'table_id': 7, 'schema': 'db', 'table': 'tbl',
+                                                     'columns': columns})
+        self.assertEqual(('id', 'name'), schema_cache.get_columns(row_event))
+
+    def test_ddl_invalidates_table_maps(self):
+        schema_cache = BinlogSchemaCache()
+
+        schema_cache.get_columns(get_binlogevent(TableMapEvent, {'table_id': 7, 'schema': 'db', 'table': 'tbl',
+                                                                 'columns': [Column('id', 3)]}))
+        schema_cache.get_columns(get_binlogevent(TableMapEvent, {'table_id': 9, 'schema': 'db', 'table': 'other',
+                                                                 'columns': [Column('id', 3)]}))
+        self.assertEqual('db-tbl', schema_cache.on_query(
+            get_binlogevent(QueryEvent, {'schema': b'db', 'query': 'ALTER TABLE tbl ADD COLUMN c int'}),
+            'binlog.001',
+            100))
+        self.assertListEqual([9], list(schema_cache.table_maps))
+
+        self.assertEqual(('id', 'c'), schema_cache.get_columns(
+            get_binlogevent(TableMapEvent, {'table_id': 8, 'schema': 'db', 'table': 'tbl',
+                                            'columns': [Column('id', 3), Column('c', 3)]})))
+        self.assertListEqual([9, 8], list(schema_cache.table_maps))
+
+    def test_ddl_invalidates_checked_columns(self):
+        schema_cache = BinlogSchemaCache()
+        catalog_entry = object()
+
+        schema_cache.mark_checked('db-tbl', ('id',), catalog_entry)
+        self.assertTrue(schema_cache.is_checked('db-tbl', ('id',), catalog_entry))
+        self.assertFalse(schema_cache.is_checked('db-tbl', ('id', 'c'), catalog_entry))
+        self.assertFalse(schema_cache.is_checked('db-tbl', ('id',), object()))
+
+        self.assertIsNone(schema_cache.on_query(get_binlogevent(QueryEvent, {'schema': b'db', 'query': 'BEGIN'}),
+                                                'binlog.001',
+                                                4))
+        self.assertTrue(schema_cache.is_checked('db-tbl', ('id',), catalog_entry))
+
+        schema_cache.on_query(get_binlogevent(QueryEvent, {'schema': b'', 'query': 'TRUNCATE TABLE db.tbl'}),
+                              'binlog.001',
+                              8)
+        self.assertFalse(schema_cache.is_checked('db-tbl', ('id',), catalog_entry))
@@ -0,0 +1,226 @@
+import datetime
+import decimal
+import json
+import unittest
+
+from unittest.mock import patch, MagicMock
+from singer import Schema, RecordMessage, StateMessage
+
+from helpers import get_catalog_entry, get_keyed_catalog_entry
+from tap_mysql.sync_strategies import common
+
+
+class TestCommon(unittest.TestCase):
+
+    def test_get_fetch_batch_size_from_avg_row_length(self):
+        self.assertEqual(8192, common.get_fetch_batch_size(1024))
+        self.assertEqual(common.MAX_FETCH_BATCH_SIZE, common.get_fetch_batch_size(10))
+        self.assertEqual(common.MIN_FETCH_BATCH_SIZE, common.get_fetch_batch_size(10 * 1024 * 1024))
+        self.assertEqual(common.MIN_FETCH_BATCH_SIZE, common.get_fetch_batch_size(None))
+
+    @patch('tap_mysql.sync_strategies.common.fetch_avg_row_length', return_value=None)
+    @patch('tap_mysql.sync_strategies.common.get_fetch_batch_size', return_value=2)
+    def test_sync_query_in_batches(self, *args):
+        cur_mock = MagicMock()
+        cur_mock.fetchmany.side_effect = [[(1, 'a'), (2, 'b')], [(3, 'c')], []]
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 3}}}}
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.common.singer.write_message') as write_msg:
+            write_msg.side_effect = singer_messages.append
+
+            common.sync_query(cur_mock, get_keyed_catalog_entry(['id']), state, 'SELECT', ['id', 'name'], 1, {})
+
+        self.assertListEqual([msg.record for msg in singer_messages if isinstance(msg, RecordMessage)],
+                             [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}, {'id': 3, 'name': 'c'}])
+
+        self.assertIsInstance(singer_messages[-1], StateMessage)
+        self.assertDictEqual({'id': 3}, state['bookmarks']['my_db-table_1']['last_pk_fetched'])
+
+        cur_mock.fetchmany.assert_called_with(2)
+
+    @patch('tap_mysql.sync_strategies.common.fetch_avg_row_length', return_value=None)
+    @patch('tap_mysql.sync_strategies.common.get_fetch_batch_size', return_value=3)
+    def test_sync_query_bookmarks_last_record_written_when_batch_fails(self, *args):
+        cur_mock = MagicMock()
+        cur_mock.fetchmany.side_effect = [[(1, 'a'), (2, 'b'), (3, 'c')]]
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 3}}}}
+
+        def write_message(message):
+            if isinstance(message, RecordMessage) and message.record['id'] == 2:
+                raise Exception('simulated exception')
+
+        with patch('tap_mysql.sync_strategies.common.singer.write_message') as write_msg:
+            write_msg.side_effect = write_message
+
+            with self.assertRaises(Exception):
+                common.sync_query(cur_mock, get_keyed_catalog_entry(['id']), state, 'SELECT', ['id', 'name'], 1, {})
+
+        self.assertDictEqual({'id': 1}, state['bookmarks']['my_db-table_1']['last_pk_fetched'])
+
+    def test_build_row_converter(self):
+        catalog_entry = get_catalog_entry(properties={
+            'c_int': Schema(inclusion='automatic', type=['null', 'integer']),
+            'c_datetime': Schema(inclusion='available', type=['null', 'string'], format='date-time'),
+            'c_date': Schema(inclusion='available', type=['null', 'string'], format='date-time'),
+            'c_time': Schema(inclusion='available', type=['null', 'string'], format='time'),
+            'c_bool': Schema(inclusion='available', type=['null', 'boolean']),
+            'c_bit': Schema(inclusion='available', type=['null', 'boolean']),
+        })
+
+        columns = ['c_int', 'c_datetime', 'c_date', 'c_time', 'c_bool', 'c_bit']
+        row_converter = common.build_row_converter(catalog_entry, columns)
+
+        self.assertDictEqual(row_converter((1,
+                                            datetime.datetime(2021, 3, 24, 12, 12, 56),
+                                            datetime.date(2021, 3, 24),
+                                            datetime.timedelta(hours=20, minutes=1, seconds=14),
+                                            1,
+                                            b'\x00')),
+                             {'c_int': 1,
+                              'c_datetime': '2021-03-24T12:12:56+00:00',
+                              'c_date': '2021-03-24T00:00:00+00:00',
+                              'c_time': '20:01:14',
+                              'c_bool': True,
+                              'c_bit': False})
+
+        self.assertDictEqual(row_converter((None, None, None, None, None, None)),
+                             dict.fromkeys(columns))
+
+    def test_build_row_converter_passthrough_columns(self):
+        row_converter = common.build_row_converter(get_keyed_catalog_entry(['id']), ['id', 'name'])
+
+        self.assertDictEqual({'id': 1, 'name': 'a'}, row_converter((1, 'a')))
+
+    @patch('tap_mysql.sync_strategies.common.fetch_avg_row_length', return_value=None)
+    @patch('tap_mysql.sync_strategies.common.get_fetch_batch_size', return_value=2)
+    def test_sync_query_bookmarks_replication_key_value(self, *args):
+        catalog_entry = get_keyed_catalog_entry(['id'], 'INCREMENTAL')
+        catalog_entry.schema.properties['updated_at'] = Schema(inclusion='available',
+                                                               type=['null', 'string'],
+                                                               format='date-time')
+
+        cur_mock = MagicMock()
+        cur_mock.fetchmany.side_effect = [[(1, datetime.datetime(2021, 1, 1, 10)),
+                                           (2, datetime.datetime(2021, 1, 2, 10))],
+                                          [(3, datetime.datetime(2021, 1, 3, 10))],
+                                          []]
+
+        state = {'bookmarks': {'my_db-table_1': {'replication_key': 'updated_at'}}}
+
+        with patch('tap_mysql.sync_strategies.common.singer.write_message'):
+            common.sync_query(cur_mock, catalog_entry, state, 'SELECT', ['id', 'updated_at'], 1, {})
+
+        self.assertDictEqual({'replication_key': 'updated_at',
+                              'replication_key_value': '2021-01-03T10:00:00+00:00'},
+                             state['bookmarks']['my_db-table_1'])
+
+    def test_state_snapshot_copies_only_given_streams(self):
+        state = {
+            'currently_syncing': 'stream_1',
+            'bookmarks': {
+                'stream_1': {'last_pk_fetched': {'id': 1}},
+                'stream_2': {'version': 1},
+            }
+        }
+
+        snapshot = common.state_snapshot(state, ['stream_1'])
+
+        self.assertDictEqual(state, snapshot)
+        self.assertIsNot(state['bookmarks']['stream_1'], snapshot['bookmarks']['stream_1'])
+        self.assertIsNot(state['bookmarks']['stream_1']['last_pk_fetched'],
+                         snapshot['bookmarks']['stream_1']['last_pk_fetched'])
+        self.assertIs(state['bookmarks']['stream_2'], snapshot['bookmarks']['stream_2'])
+
+        state['currently_syncing'] = None
+        state['bookmarks']['stream_1']['last_pk_fetched']['id'] = 2
+        state['bookmarks']['stream_3'] = {}
+
+        self.assertDictEqual({
+            'currently_syncing': 'stream_1',
+            'bookmarks': {
+                'stream_1': {'last_pk_fetched': {'id': 1}},
+                'stream_2': {'version': 1},
+            }
+        }, snapshot)
+
+    def test_checkpoint_policy_by_rows(self):
+        policy = common.CheckpointPolicy({'checkpoint_rows': 10})
+
+        self.assertFalse(policy.add(6))
+        self.assertTrue(policy.add(6))
+
+        policy.reset()
+        self.assertFalse(policy.add(9))
+
+    def test_checkpoint_policy_by_bytes(self):
+        policy = common.CheckpointPolicy({'checkpoint_rows': 0, 'checkpoint_bytes': 1000})
+
+        self.assertFalse(policy.add(100, 600))
+        self.assertTrue(policy.add(1, 600))
+
+    @patch('tap_mysql.sync_strategies.common.time.monotonic', side_effect=[100, 105, 111])
+    def test_checkpoint_policy_by_interval(self, *args):
+        policy = common.CheckpointPolicy({'checkpoint_rows': 0, 'checkpoint_interval_seconds': 10})
+
+        self.assertFalse(policy.add(1))
+        self.assertTrue(policy.add(1))
+
+    def test_bookmark_values_keep_their_type(self):
+        values = [
+            1,
+            'abc',
+            datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+            datetime.date(2020, 1, 2),
+            datetime.timedelta(hours=25, seconds=1),
+            decimal.Decimal('12345678901234567890.123'),
+            b'\x00\xff\x10',
+        ]
+
+        for value in values:
+            bookmark_value = json.loads(json.dumps(common.to_bookmark_value(value)))
+
+            self.assertEqual(value, common.from_bookmark_value(bookmark_value))
+            self.assertIs(type(value), type(common.from_bookmark_value(bookmark_value)))
+
+        self.assertDictEqual({'type': 'bytes', 'value': '00ff10'}, common.to_bookmark_value(b'\x00\xff\x10'))
+
+    def test_concurrent_state_writer_merges_stream_states(self):
+        state = {'bookmarks': {'stream_1': {'version': 1}}}
+        writer = common.ConcurrentStateWriter(state)
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.common.singer.write_message') as write_msg:
+            write_msg.side_effect = singer_messages.append
+
+            stream_1_state = writer.start_stream('stream_1')
+            stream_2_state = writer.start_stream('stream_2')
+
+            self.assertDictEqual({'bookmarks': {'stream_1': {'version': 1}}}, stream_1_state)
+
+            stream_1_state['bookmarks']['stream_1']['last_pk_fetched'] = {'id': 2}
+            self.assertDictEqual({'version': 1}, state['bookmarks']['stream_1'])
+
+            common.write_state_message(stream_1_state, ['stream_1'])
+            writer.finish_stream(stream_1_state)
+
+            stream_2_state['bookmarks']['stream_2']['replication_key_value'] = 5
+            writer.merge(stream_2_state)
+
+        self.assertListEqual([msg.value['currently_syncing_streams'] for msg in singer_messages],
+                             [['stream_1'], ['stream_1', 'stream_2'], ['stream_1', 'stream_2']])
+        self.assertDictEqual(singer_messages[-1].value['bookmarks'], {
+            'stream_1': {'version': 1, 'last_pk_fetched': {'id': 2}},
+            'stream_2': {}
+        })
+
+        self.assertDictEqual(state, {
+            'currently_syncing': 'stream_2',
+            'currently_syncing_streams': ['stream_2'],
+            'bookmarks': {
+                'stream_1': {'version': 1, 'last_pk_fetched': {'id': 2}},
+                'stream_2': {'replication_key_value': 5}
+            }
+        })
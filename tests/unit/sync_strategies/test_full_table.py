@@ -0,0 +1,332 @@
+import datetime
+import threading
+import unittest
+
+from unittest.mock import patch, MagicMock
+from singer import Catalog, Schema, RecordMessage, StateMessage
+
+from helpers import get_keyed_catalog_entry
+from tap_mysql.catalog_index import compile_catalog
+from tap_mysql.sync_strategies import common
+from tap_mysql.sync_strategies import full_table
+
+
+def get_binary_keyed_catalog_entry():
+    catalog_entry = get_keyed_catalog_entry(['id'])
+    catalog_entry.schema.properties['id'] = Schema(inclusion='automatic', type=['null', 'string'], format='binary')
+
+    return catalog_entry
+
+
+class TestFullTableSyncStrategy(unittest.TestCase):
+
+    def test_generate_pk_chunks_splits_range_evenly(self):
+        self.assertListEqual(full_table.generate_pk_chunks(0, 100, 4), [
+            {'lower_pk': 0, 'upper_pk': 25, 'last_pk_fetched': None},
+            {'lower_pk': 25, 'upper_pk': 50, 'last_pk_fetched': None},
+            {'lower_pk': 50, 'upper_pk': 75, 'last_pk_fetched': None},
+            {'lower_pk': 75, 'upper_pk': 100, 'last_pk_fetched': None},
+        ])
+
+    def test_generate_pk_chunks_covers_uneven_range(self):
+        chunks = full_table.generate_pk_chunks(9, 19, 3)
+
+        self.assertEqual(9, chunks[0]['lower_pk'])
+        self.assertEqual(19, chunks[-1]['upper_pk'])
+
+        for previous_chunk, chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(previous_chunk['upper_pk'], chunk['lower_pk'])
+
+    def test_generate_pk_chunks_with_fewer_values_than_chunks(self):
+        self.assertListEqual(full_table.generate_pk_chunks(0, 2, 8), [
+            {'lower_pk': 0, 'upper_pk': 1, 'last_pk_fetched': None},
+            {'lower_pk': 1, 'upper_pk': 2, 'last_pk_fetched': None},
+        ])
+
+    def test_generate_pk_chunks_with_empty_range(self):
+        self.assertListEqual(full_table.generate_pk_chunks(10, 10, 4), [])
+
+    def test_init_pk_chunks_resumes_existing_chunks(self):
+        chunks = [{'lower_pk': 0, 'upper_pk': 10, 'last_pk_fetched': 5}]
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}, 'pk_chunks': chunks}}}
+
+        self.assertTrue(full_table.init_pk_chunks(None, get_keyed_catalog_entry(['id']), state, 1))
+        self.assertIs(chunks, state['bookmarks']['my_db-table_1']['pk_chunks'])
+
+    def test_init_pk_chunks_without_parallelism(self):
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}}}}
+
+        self.assertFalse(full_table.init_pk_chunks(None, get_keyed_catalog_entry(['id']), state, 1))
+        self.assertNotIn('pk_chunks', state['bookmarks']['my_db-table_1'])
+
+    def test_init_pk_chunks_continues_from_last_pk_fetched(self):
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}, 'last_pk_fetched': {'id': 6}}}}
+
+        self.assertTrue(full_table.init_pk_chunks(None, get_keyed_catalog_entry(['id']), state, 2))
+        self.assertDictEqual(state['bookmarks']['my_db-table_1'], {
+            'max_pk_values': {'id': 10},
+            'pk_chunks': [
+                {'lower_pk': 6, 'upper_pk': 8, 'last_pk_fetched': None},
+                {'lower_pk': 8, 'upper_pk': 10, 'last_pk_fetched': None},
+            ]
+        })
+
+    def test_init_pk_chunks_of_emptied_table(self):
+        cur_mock = MagicMock()
+        cur_mock.fetchone.return_value = None
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}}}}
+
+        self.assertFalse(full_table.init_pk_chunks(cur_mock, get_keyed_catalog_entry(['id']), state, 2))
+        self.assertDictEqual({}, state['bookmarks']['my_db-table_1'])
+
+    def test_init_pk_chunks_with_non_integer_pk(self):
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 'abc'}}}}
+
+        self.assertFalse(full_table.init_pk_chunks(None, get_keyed_catalog_entry(['id']), state, 4))
+        self.assertNotIn('pk_chunks', state['bookmarks']['my_db-table_1'])
+
+    def test_get_keyset_columns(self):
+        self.assertListEqual(['id'], full_table.get_keyset_columns(get_keyed_catalog_entry(['id'])))
+        self.assertListEqual(['name'], full_table.get_keyset_columns(get_keyed_catalog_entry([], **{
+            'unique-index-columns': ['name']
+        })))
+        self.assertListEqual([], full_table.get_keyset_columns(get_keyed_catalog_entry([])))
+
+    def test_is_resumable_requires_selected_key_columns(self):
+        catalog_entry = get_keyed_catalog_entry([], **{'unique-index-columns': ['name']})
+
+        self.assertTrue(full_table.is_resumable(catalog_entry, ['id', 'name']))
+        self.assertFalse(full_table.is_resumable(catalog_entry, ['id']))
+
+    def test_generate_pk_range_clause_binds_typed_values(self):
+        _, params = full_table.generate_pk_range_clause(
+            ['created_at'],
+            {'created_at': {'type': 'datetime', 'value': '2020-01-02T03:04:05'}},
+            {'created_at': {'type': 'datetime', 'value': '2020-01-01T00:00:00'}})
+
+        self.assertDictEqual({'max_pk_0': datetime.datetime(2020, 1, 2, 3, 4, 5),
+                              'last_pk_0': datetime.datetime(2020, 1, 1)}, params)
+
+    def test_generate_keyset_page_query_first_page(self):
+        sql, params = full_table.generate_keyset_page_query('SELECT `id` FROM `my_db`.`table_1`',
+                                                            ['id'],
+                                                            {'id': 100},
+                                                            None,
+                                                            50)
+
+        self.assertEqual('SELECT `id` FROM `my_db`.`table_1` WHERE `id` <= %(max_pk_0)s ORDER BY `id` ASC LIMIT 50',
+                         sql)
+        self.assertDictEqual({'max_pk_0': 100}, params)
+
+    def test_generate_keyset_page_query_next_page_with_composite_pk(self):
+        sql, params = full_table.generate_keyset_page_query('SELECT `a`, `b` FROM `my_db`.`table_1`',
+                                                            ['a', 'b'],
+                                                            {'a': 10, 'b': 5},
+                                                            {'a': 3, 'b': 1},
+                                                            50)
+
+        self.assertEqual('SELECT `a`, `b` FROM `my_db`.`table_1` '
+                         'WHERE (`a` >= %(last_pk_0)s AND (`a` > %(last_pk_0)s OR '
+                         '(`a` = %(last_pk_0)s AND `b` > %(last_pk_1)s))) '
+                         'AND (`a` <= %(max_pk_0)s AND (`a` < %(max_pk_0)s OR '
+                         '(`a` = %(max_pk_0)s AND `b` <= %(max_pk_1)s))) '
+                         'ORDER BY `a`, `b` ASC LIMIT 50',
+                         sql)
+        self.assertDictEqual({'max_pk_0': 10, 'max_pk_1': 5, 'last_pk_0': 3, 'last_pk_1': 1}, params)
+
+    def test_generate_pk_clause_with_single_pk(self):
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}, 'last_pk_fetched': {'id': 4}}}}
+
+        sql, params = full_table.generate_pk_clause(get_keyed_catalog_entry(['id']), state)
+
+        self.assertEqual(' WHERE `id` > %(last_pk_0)s AND `id` <= %(max_pk_0)s ORDER BY `id` ASC', sql)
+        self.assertDictEqual({'max_pk_0': 10, 'last_pk_0': 4}, params)
+
+    def test_generate_pk_clause_resumes_binary_pk(self):
+        catalog_entry = get_binary_keyed_catalog_entry()
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': {'type': 'bytes', 'value': 'ff00'}}}}}
+
+        # binary columns are selected as hex strings
+        descriptor = common.SyncQueryDescriptor(catalog_entry, state, ['id', 'name'])
+        state = descriptor.write_bookmarks(state, ('0A1B', 'a'))
+
+        self.assertDictEqual({'id': {'type': 'bytes', 'value': '0a1b'}},
+                             state['bookmarks']['my_db-table_1']['last_pk_fetched'])
+
+        _, params = full_table.generate_pk_clause(catalog_entry, state)
+
+        self.assertDictEqual({'max_pk_0': b'\xff\x00', 'last_pk_0': b'\x0a\x1b'}, params)
+
+    def test_generate_pk_range_clause_expands_composite_pk(self):
+        condition, params = full_table.generate_pk_range_clause(['a', 'b', 'c'],
+                                                                {'a': 9, 'b': 9, 'c': 9},
+                                                                {'a': 1, 'b': 2, 'c': 3})
+
+        self.assertEqual('(`a` >= %(last_pk_0)s AND (`a` > %(last_pk_0)s OR (`a` = %(last_pk_0)s AND '
+                         '(`b` > %(last_pk_1)s OR (`b` = %(last_pk_1)s AND `c` > %(last_pk_2)s))))) '
+                         'AND (`a` <= %(max_pk_0)s AND (`a` < %(max_pk_0)s OR (`a` = %(max_pk_0)s AND '
+                         '(`b` < %(max_pk_1)s OR (`b` = %(max_pk_1)s AND `c` <= %(max_pk_2)s)))))',
+                         condition)
+        self.assertDictEqual({'max_pk_0': 9, 'max_pk_1': 9, 'max_pk_2': 9,
+                              'last_pk_0': 1, 'last_pk_1': 2, 'last_pk_2': 3}, params)
+
+    @patch('tap_mysql.sync_strategies.full_table.borrow_connection')
+    def test_sync_table_in_keyset_pages_checkpoints_every_page(self, borrow_connection):
+        cur_mock = MagicMock()
+        cur_mock.fetchall.side_effect = [[(1, 'a'), (2, 'b')], [(3, 'c')]]
+        borrow_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value = cur_mock
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 3}}}}
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.full_table.singer.write_message') as write_msg:
+            write_msg.side_effect = singer_messages.append
+
+            full_table.sync_table_in_keyset_pages(MagicMock(), get_keyed_catalog_entry(['id']), state,
+                                                  ['id', 'name'], 1, 2)
+
+        self.assertListEqual([type(msg) for msg in singer_messages],
+                             [RecordMessage, RecordMessage, StateMessage, RecordMessage, StateMessage])
+
+        self.assertListEqual([msg.record for msg in singer_messages if isinstance(msg, RecordMessage)],
+                             [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}, {'id': 3, 'name': 'c'}])
+
+        self.assertListEqual([msg.value['bookmarks']['my_db-table_1']['last_pk_fetched']
+                              for msg in singer_messages if isinstance(msg, StateMessage)],
+                             [{'id': 2}, {'id': 3}])
+
+        self.assertEqual(2, cur_mock.execute.call_count)
+        self.assertDictEqual({'max_pk_0': 3, 'last_pk_0': 2}, cur_mock.execute.call_args[0][1])
+
+    @patch('tap_mysql.sync_strategies.full_table.borrow_connection')
+    def test_sync_table_in_keyset_pages_with_binary_pk(self, borrow_connection):
+        cur_mock = MagicMock()
+        cur_mock.fetchall.side_effect = [[('0A01', 'a'), ('0A02', 'b')], [('0B00', 'c')]]
+        borrow_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value = cur_mock
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': {'type': 'bytes', 'value': '0b00'}}}}}
+
+        with patch('tap_mysql.sync_strategies.full_table.singer.write_message'):
+            full_table.sync_table_in_keyset_pages(MagicMock(), get_binary_keyed_catalog_entry(), state,
+                                                  ['id', 'name'], 1, 2)
+
+        # the next page starts after the bytes of the last key, not after its hex text
+        self.assertEqual(2, cur_mock.execute.call_count)
+        self.assertDictEqual({'max_pk_0': b'\x0b\x00', 'last_pk_0': b'\x0a\x02'}, cur_mock.execute.call_args[0][1])
+
+        self.assertDictEqual({'id': {'type': 'bytes', 'value': '0b00'}},
+                             state['bookmarks']['my_db-table_1']['last_pk_fetched'])
+
+    @patch('tap_mysql.sync_strategies.full_table.preflight.get_avg_row_length', return_value=None)
+    @patch('tap_mysql.sync_strategies.full_table.borrow_connection')
+    def test_sync_pk_chunk_closes_connection_when_another_chunk_failed(self, borrow_connection, *args):
+        conn_mock = borrow_connection.return_value.__enter__.return_value
+        cur_mock = conn_mock.cursor.return_value
+        cur_mock.fetchmany.side_effect = [[(1, 'a')], [(2, 'b')]]
+
+        chunk = {'lower_pk': 0, 'upper_pk': 10, 'last_pk_fetched': None}
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}, 'pk_chunks': [chunk]}}}
+        progress = {'lock': threading.Lock(), 'failed': threading.Event(), 'checkpoint_policy': MagicMock()}
+
+        def write_message(_):
+            progress['failed'].set()
+
+        with patch('tap_mysql.sync_strategies.full_table.singer.write_message') as write_msg:
+            write_msg.side_effect = write_message
+
+            full_table._sync_pk_chunk(MagicMock(), get_keyed_catalog_entry(['id']), state, ['id', 'name'], 1, chunk,
+                                      progress)
+
+        # closing the cursor would read the rest of the chunk
+        conn_mock.close.assert_called_once()
+        cur_mock.close.assert_not_called()
+
+        self.assertEqual(1, chunk['last_pk_fetched'])
+        self.assertListEqual([chunk], state['bookmarks']['my_db-table_1']['pk_chunks'])
+
+    @patch('tap_mysql.sync_strategies.full_table.preflight.get_avg_row_length', return_value=None)
+    @patch('tap_mysql.sync_strategies.full_table.common.sync_query')
+    @patch('tap_mysql.sync_strategies.full_table.borrow_connection')
+    def test_sync_table_of_emptied_table_in_pk_chunks(self, borrow_connection, sync_query, *args):
+        cur_mock = MagicMock()
+        cur_mock.fetchone.return_value = None
+        borrow_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value = cur_mock
+
+        catalog_entry = get_keyed_catalog_entry(['id'])
+        compile_catalog(Catalog([catalog_entry]))
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}, 'version': 1}}}
+
+        with patch('tap_mysql.sync_strategies.full_table.singer.write_message'):
+            full_table.sync_table(MagicMock(), catalog_entry, state, ['id', 'name'], 1,
+                                  {'full_table_parallelism': 2})
+
+        # the table is read without a PK range as when it was already empty before max_pk_values were bookmarked
+        sync_query.assert_called_once()
+        self.assertEqual('SELECT `id`,`name` FROM `my_db`.`table_1`', sync_query.call_args[0][3])
+        self.assertDictEqual({}, sync_query.call_args[0][6])
+        self.assertDictEqual({'version': 1}, state['bookmarks']['my_db-table_1'])
+
+    @patch('tap_mysql.sync_strategies.full_table._sync_pk_chunk')
+    def test_sync_table_in_pk_chunks_stops_workers_on_first_failure(self, sync_pk_chunk):
+        chunks = [{'lower_pk': 0, 'upper_pk': 5, 'last_pk_fetched': None},
+                  {'lower_pk': 5, 'upper_pk': 10, 'last_pk_fetched': None}]
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 10}, 'pk_chunks': list(chunks)}}}
+
+        def sync_chunk(*args):
+            chunk, progress = args[5], args[6]
+
+            if chunk is chunks[1]:
+                raise ValueError('failed')
+
+            # the first chunk only finishes once the failure of the second one is signalled
+            if not progress['failed'].wait(5):
+                raise TimeoutError('not stopped')
+
+        sync_pk_chunk.side_effect = sync_chunk
+
+        with self.assertRaisesRegex(ValueError, 'failed'):
+            full_table.sync_table_in_pk_chunks(MagicMock(), get_keyed_catalog_entry(['id']), state, ['id', 'name'],
+                                               1, 2)
+
+    @patch('tap_mysql.sync_strategies.full_table.parquet_export.ParquetExporter')
+    @patch('tap_mysql.sync_strategies.full_table.borrow_connection')
+    def test_sync_table_to_parquet_bookmarks_every_file(self, borrow_connection, parquet_exporter):
+        cur_mock = MagicMock()
+        cur_mock.fetchall.return_value = [(1000,)]
+        borrow_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value = cur_mock
+
+        parquet_exporter.return_value.write_file.side_effect = [
+            ('/exports/my_db-table_1/1/part-00000.parquet', 2, (2, 'b')),
+            ('/exports/my_db-table_1/1/part-00001.parquet', 1, (3, 'c')),
+        ]
+
+        state = {'bookmarks': {'my_db-table_1': {'max_pk_values': {'id': 3}}}}
+        singer_messages = []
+
+        with patch('tap_mysql.sync_strategies.full_table.singer.write_message') as write_msg:
+            write_msg.side_effect = singer_messages.append
+
+            full_table.sync_table_to_parquet(MagicMock(),
+                                             get_keyed_catalog_entry(['id']),
+                                             state,
+                                             ['id', 'name'],
+                                             1,
+                                             {'parquet_export_dir': '/exports', 'parquet_export_rows_per_file': 2})
+
+        parquet_exporter.assert_called_once()
+        self.assertEqual('/exports/my_db-table_1/1', parquet_exporter.call_args[0][2])
+
+        self.assertListEqual([type(msg) for msg in singer_messages], [StateMessage, StateMessage])
+        self.assertListEqual([msg.value['bookmarks']['my_db-table_1']['last_pk_fetched'] for msg in singer_messages],
+                             [{'id': 2}, {'id': 3}])
+
+        self.assertDictEqual(state['bookmarks']['my_db-table_1'], {
+            'max_pk_values': {'id': 3},
+            'last_pk_fetched': {'id': 3},
+            'parquet_manifest': [
+                {'path': '/exports/my_db-table_1/1/part-00000.parquet', 'rows': 2},
+                {'path': '/exports/my_db-table_1/1/part-00001.parquet', 'rows': 1},
+            ]
+        })
@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import unittest
+
+from singer import Schema
+
+from helpers import get_catalog_entry
+from tap_mysql.sync_strategies import parquet_export
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestParquetExport(unittest.TestCase):
+
+    def test_is_enabled(self):
+        self.assertFalse(parquet_export.is_enabled(get_catalog_entry(), {}))
+        self.assertTrue(parquet_export.is_enabled(get_catalog_entry(), {'parquet_export_dir': '/exports'}))
+        self.assertFalse(parquet_export.is_enabled(get_catalog_entry(**{'parquet-export': False}),
+                                                   {'parquet_export_dir': '/exports'}))
+
+    def test_to_datetime(self):
+        self.assertEqual(datetime.datetime(2020, 1, 2), parquet_export._to_datetime(datetime.date(2020, 1, 2)))
+        self.assertEqual(datetime.datetime(1970, 1, 2), parquet_export._to_datetime(datetime.timedelta(days=1)))
+        self.assertIsNone(parquet_export._to_datetime(None))
+        self.assertIsNone(parquet_export._to_datetime('0000-00-00 00:00:00'))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_type_for_property(self):
+        self.assertEqual(pyarrow.int64(), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'integer'], minimum=0, maximum=2 ** 32 - 1))[0])
+        self.assertEqual(pyarrow.uint64(), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'integer'], minimum=0, maximum=2 ** 64 - 1))[0])
+        self.assertEqual(pyarrow.decimal128(38, 2), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'number'], multipleOf=0.01))[0])
+        self.assertEqual(pyarrow.decimal128(38, 2), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'number'], multipleOf=0.01), 'decimal(10,2) unsigned')[0])
+        self.assertEqual(pyarrow.decimal256(50, 10), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'number'], multipleOf=1e-10), 'decimal(50,10)')[0])
+        self.assertEqual(pyarrow.timestamp('us', tz='UTC'), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'string'], format='date-time'))[0])
+        self.assertEqual(pyarrow.string(), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'object']))[0])
+        self.assertEqual(pyarrow.string(), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'string'], format='binary'))[0])
+        self.assertEqual(pyarrow.string(), parquet_export.arrow_type_for_property(
+            pyarrow, Schema(type=['null', 'object'], format='spatial'))[0])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_record_batch(self):
+        catalog_entry = get_catalog_entry(properties={
+            'id': Schema(inclusion='automatic', type=['null', 'integer']),
+            'c_datetime': Schema(type=['null', 'string'], format='date-time'),
+            'c_binary': Schema(type=['null', 'string'], format='binary'),
+        })
+
+        exporter = parquet_export.ParquetExporter(catalog_entry, ['id', 'c_datetime', 'c_binary'], '/exports', 10)
+        batch = exporter.to_record_batch([
+            (1, datetime.datetime(2020, 1, 2, 3, 4, 5), '0A0B'),
+            (2, '0000-00-00 00:00:00', None),
+        ])
+
+        self.assertListEqual([
+            {'id': 1, 'c_datetime': datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+             'c_binary': '0A0B'},
+            {'id': 2, 'c_datetime': None, 'c_binary': None},
+        ], batch.to_pylist())
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_record_batch_with_wide_decimal(self):
+        catalog_entry = get_catalog_entry(
+            properties={'c_decimal': Schema(type=['null', 'number'], multipleOf=1e-10)},
+            property_metadata={'c_decimal': {'sql-datatype': 'decimal(50,10)'}})
+
+        value = decimal.Decimal('1234567890123456789012345678901234567890.0123456789')
+
+        exporter = parquet_export.ParquetExporter(catalog_entry, ['c_decimal'], '/exports', 10)
+        batch = exporter.to_record_batch([(value,), (None,)])
+
+        self.assertEqual(pyarrow.decimal256(50, 10), batch.schema.field('c_decimal').type)
+        self.assertListEqual([{'c_decimal': value}, {'c_decimal': None}], batch.to_pylist())
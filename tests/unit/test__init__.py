@@ -1,7 +1,11 @@
 import unittest
 
-from singer import CatalogEntry
+from unittest.mock import patch, MagicMock
 
+import singer
+from singer import Catalog, CatalogEntry, Schema
+
+import tap_mysql
 from tap_mysql import binlog_stream_requires_historical
 
 
@@ -102,3 +106,95 @@ class TestTapMysql(unittest.TestCase):
             catalog,
             state
         ))
+
+
+class TestSyncNonBinlogStreams(unittest.TestCase):
+
+    @staticmethod
+    def get_catalog(*tap_stream_ids):
+        return Catalog([CatalogEntry(tap_stream_id=tap_stream_id,
+                                     stream=tap_stream_id,
+                                     metadata=[{'breadcrumb': (), 'metadata': {'data-length': 1000}}],
+                                     schema=Schema(properties={'id': Schema(type=['integer'])}))
+                        for tap_stream_id in tap_stream_ids])
+
+    @patch('tap_mysql.singer.write_message')
+    @patch('tap_mysql.clone_connection')
+    @patch('tap_mysql.sync_non_binlog_stream')
+    def test_sync_streams_concurrently(self, sync_non_binlog_stream, *args):
+        def sync_stream(mysql_conn, catalog_entry, config, state, snapshot):
+            singer.write_bookmark(state, catalog_entry.tap_stream_id, 'initial_full_table_complete', True)
+
+        sync_non_binlog_stream.side_effect = sync_stream
+        state = {}
+
+        tap_mysql.sync_non_binlog_streams(MagicMock(), self.get_catalog('a', 'b', 'c'), {'table_parallelism': 2}, state)
+
+        self.assertEqual(3, sync_non_binlog_stream.call_count)
+        self.assertIsNone(state['currently_syncing'])
+        self.assertNotIn('currently_syncing_streams', state)
+
+        for tap_stream_id in ('a', 'b', 'c'):
+            self.assertTrue(state['bookmarks'][tap_stream_id]['initial_full_table_complete'])
+            self.assertIn('seconds', state['bookmarks'][tap_stream_id]['sync_stats'])
+
+    @patch('tap_mysql.singer.write_message')
+    @patch('tap_mysql.clone_connection')
+    @patch('tap_mysql.sync_non_binlog_stream')
+    def test_sync_streams_concurrently_keeps_failed_streams_in_flight(self, sync_non_binlog_stream, *args):
+        def sync_stream(mysql_conn, catalog_entry, config, state, snapshot):
+            singer.write_bookmark(state, catalog_entry.tap_stream_id, 'last_pk_fetched', {'id': 1})
+            raise Exception('simulated exception')
+
+        sync_non_binlog_stream.side_effect = sync_stream
+        state = {}
+
+        with self.assertRaises(Exception):
+            tap_mysql.sync_non_binlog_streams(MagicMock(), self.get_catalog('a'), {'table_parallelism': 2}, state)
+
+        self.assertDictEqual(state, {
+            'currently_syncing': 'a',
+            'currently_syncing_streams': ['a'],
+            'bookmarks': {'a': {'last_pk_fetched': {'id': 1}}}
+        })
+
+
+    @patch('tap_mysql.singer.write_message')
+    @patch('tap_mysql.sync_non_binlog_stream')
+    def test_sync_streams_sequentially_after_concurrent_sync(self, sync_non_binlog_stream, write_message):
+        sync_non_binlog_stream.side_effect = [None, Exception('simulated exception')]
+        state = {'currently_syncing': 'a', 'currently_syncing_streams': ['a', 'b']}
+
+        with self.assertRaises(Exception):
+            tap_mysql.sync_non_binlog_streams(MagicMock(), self.get_catalog('a', 'b'), {}, state)
+
+        # the next sync resumes the stream that failed, not the streams of the concurrent sync
+        self.assertDictEqual({'currently_syncing': 'b'}, state)
+        self.assertNotIn('currently_syncing_streams', write_message.call_args_list[0][0][0].value)
+
+        sync_non_binlog_stream.side_effect = None
+        tap_mysql.sync_non_binlog_streams(MagicMock(), self.get_catalog('b'), {}, state)
+
+        self.assertDictEqual({'currently_syncing': None}, state)
+
+class TestDoSync(unittest.TestCase):
+
+    @patch('tap_mysql.sync_binlog_streams')
+    @patch('tap_mysql.sync_non_binlog_streams')
+    @patch('tap_mysql.preflight.run_preflight')
+    @patch('tap_mysql.discover_catalog', return_value=Catalog([]))
+    def test_do_sync_discovers_selected_tables_once(self, discover_catalog, *args):
+        catalog = Catalog([
+            CatalogEntry(tap_stream_id=f'{database_name}-{table}',
+                         table=table,
+                         schema=Schema(),
+                         metadata=[{'breadcrumb': (), 'metadata': {'database-name': database_name,
+                                                                   'selected': selected}}])
+            for database_name, table, selected in (('db1', 'a', True), ('db2', 'a', True), ('db2', 'b', False))
+        ])
+
+        tap_mysql.do_sync(MagicMock(), {'filter_dbs': 'db1,db2'}, catalog, {})
+
+        discover_catalog.assert_called_once()
+        self.assertEqual('db1,db2', discover_catalog.call_args[0][1])
+        self.assertSetEqual({('db1', 'a'), ('db2', 'a')}, discover_catalog.call_args[1]['schema_tables'])
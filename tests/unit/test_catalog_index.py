@@ -0,0 +1,75 @@
+import unittest
+
+from singer import Catalog, Schema
+
+from helpers import get_catalog_entry
+from tap_mysql import catalog_index
+from tap_mysql.discover_utils import resolve_catalog
+
+
+def get_selectable_catalog_entry(tap_stream_id, properties, **stream_metadata):
+    """
+    Returns the catalog entry of the integer properties given as {name: (inclusion, selected)}
+    """
+    return get_catalog_entry(tap_stream_id,
+                             None,
+                             properties={p: Schema(type=['null', 'integer'], inclusion=i)
+                                         for p, (i, _) in properties.items()},
+                             property_metadata={p: {'inclusion': i, 'selected': s} for p, (i, s) in properties.items()},
+                             **stream_metadata)
+
+
+class TestCatalogIndex(unittest.TestCase):
+
+    def test_stream_index(self):
+        stream_index = catalog_index.get_stream_index(get_selectable_catalog_entry(
+            'a',
+            {'id': ('automatic', None), 'name': ('available', False), 'code': ('available', True)},
+            **{'database-name': 'db', 'replication-method': 'INCREMENTAL', 'replication-key': 'code',
+               'table-key-properties': ['id'], 'selected': True}))
+
+        self.assertEqual(('db', 'INCREMENTAL', 'code', ['id'], True),
+                         (stream_index.database_name, stream_index.replication_method, stream_index.replication_key,
+                          stream_index.key_properties, stream_index.selected))
+        self.assertTrue(stream_index.is_property_selected('id'))
+        self.assertFalse(stream_index.is_property_selected('name'))
+        self.assertTrue(stream_index.is_property_selected('code'))
+        # columns without metadata are selected
+        self.assertTrue(stream_index.is_property_selected('unknown'))
+
+    def test_compiled_streams_share_their_index_with_resolved_streams(self):
+        catalog = Catalog([get_selectable_catalog_entry('a', {'id': ('automatic', None), 'name': ('available', True)},
+                                                        **{'database-name': 'db', 'selected': True}),
+                           get_selectable_catalog_entry('b', {'id': ('automatic', None)}, **{'database-name': 'db'})])
+        discovered = catalog_index.CatalogIndex(Catalog([
+            get_selectable_catalog_entry('a', {'id': ('automatic', None), 'name': ('available', None),
+                                               'new_column': ('available', None)})
+        ]))
+
+        index = catalog_index.compile_catalog(catalog)
+        resolved = resolve_catalog(discovered, catalog.streams)
+
+        self.assertIs(catalog.streams[0], index.get_stream('a'))
+        self.assertListEqual(['a'], [stream.tap_stream_id for stream in resolved.streams])
+        self.assertSetEqual({'id', 'name'}, set(resolved.streams[0].schema.properties))
+        self.assertIs(index.get_stream_index('a'), catalog_index.get_stream_index(resolved.streams[0]))
+
+    def test_compile_catalog_replaces_streams_compiled_before(self):
+        stream_metadata = {'database-name': 'db', 'selected': True}
+        old_index = catalog_index.compile_catalog(Catalog([get_catalog_entry('a', None, **stream_metadata)]))
+        index = catalog_index.compile_catalog(Catalog([get_catalog_entry('b', None, **stream_metadata)]))
+
+        self.assertIsNot(old_index.get_stream_index('a'),
+                         catalog_index.get_stream_index(old_index.get_stream('a')))
+        self.assertIs(index.get_stream_index('b'), catalog_index.get_stream_index(index.get_stream('b')))
+
+    def test_compile_stream_replaces_index_of_rediscovered_stream(self):
+        index = catalog_index.compile_catalog(Catalog([get_catalog_entry('a', None, **{'database-name': 'db'})]))
+        rediscovered = get_catalog_entry('a', None, **{'database-name': 'db2'})
+
+        stream_index = catalog_index.compile_stream(rediscovered)
+
+        self.assertEqual('db2', stream_index.database_name)
+        self.assertIs(stream_index, catalog_index.get_stream_index(rediscovered))
+        # the entry replaced isn't given the index of the rediscovered one
+        self.assertEqual('db', catalog_index.get_stream_index(index.get_stream('a')).database_name)
@@ -2,7 +2,7 @@ import unittest
 
 from unittest.mock import patch, MagicMock, call
 
-from pymysql.cursors import Cursor
+from pymysql.cursors import Cursor, DictCursor, SSCursor
 from singer import CatalogEntry
 
 from tap_mysql.connection import MySQLConnection, fetch_server_id, fetch_server_uuid
@@ -12,8 +12,8 @@ import tap_mysql.connection
 
 class TestConnection(unittest.TestCase):
 
-    @patch('tap_mysql.connection.connect_with_backoff')
-    def test_fetch_server_id(self, connect_with_backoff):
+    @patch('tap_mysql.connection.borrow_connection')
+    def test_fetch_server_id(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
@@ -21,13 +21,13 @@ class TestConnection(unittest.TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         result = fetch_server_id(mysql_con)
 
         self.assertEqual(111, result)
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
 
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
@@ -35,8 +35,8 @@ class TestConnection(unittest.TestCase):
             ]
         )
 
-    @patch('tap_mysql.connection.connect_with_backoff')
-    def test_fetch_server_uuid(self, connect_with_backoff):
+    @patch('tap_mysql.connection.borrow_connection')
+    def test_fetch_server_uuid(self, borrow_connection):
 
         mysql_con = MagicMock(spec_set=MySQLConnection).return_value
         cur_mock = MagicMock(spec_set=Cursor).return_value
@@ -44,16 +44,113 @@ class TestConnection(unittest.TestCase):
 
         mysql_con.__enter__.return_value.cursor.return_value = cur_mock
 
-        connect_with_backoff.return_value = mysql_con
+        borrow_connection.return_value = mysql_con
 
         result = fetch_server_uuid(mysql_con)
 
         self.assertEqual('dkfhdsf0-ejr-dfbsf-dnfnsbdmfbdf', result)
 
-        connect_with_backoff.assert_called_with(mysql_con)
+        borrow_connection.assert_called_with(mysql_con)
 
         cur_mock.__enter__.return_value.execute.assert_has_calls(
             [
                 call('SELECT @@server_uuid'),
             ]
         )
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = tap_mysql.connection.ConnectionPool({})
+        self.new_connections = []
+
+        def new_connection():
+            self.new_connections.append(MagicMock())
+            return self.new_connections[-1]
+
+        self.pool.new_connection = new_connection
+
+    def test_borrow_reuses_released_connection(self):
+        with self.pool.borrow() as first_conn:
+            pass
+
+        with self.pool.borrow() as second_conn:
+            pass
+
+        self.assertIs(first_conn, second_conn)
+        self.assertEqual(1, len(self.new_connections))
+        first_conn.rollback.assert_has_calls([call(), call()])
+        first_conn.close.assert_not_called()
+
+    def test_concurrent_borrows_get_distinct_connections(self):
+        with self.pool.borrow() as first_conn, self.pool.borrow() as second_conn:
+            self.assertIsNot(first_conn, second_conn)
+
+        self.pool.close()
+
+        first_conn.close.assert_called_once()
+        second_conn.close.assert_called_once()
+
+    def test_borrow_discards_connection_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.pool.borrow() as first_conn:
+                raise ValueError('failed')
+
+        with self.pool.borrow() as second_conn:
+            pass
+
+        self.assertIsNot(first_conn, second_conn)
+        first_conn.close.assert_called_once()
+
+    def test_borrow_drops_connection_closed_by_borrower(self):
+        with self.pool.borrow() as first_conn:
+            first_conn.open = False
+
+        with self.pool.borrow() as second_conn:
+            pass
+
+        self.assertIsNot(first_conn, second_conn)
+        first_conn.rollback.assert_not_called()
+
+    @patch('tap_mysql.connection.time.monotonic')
+    def test_borrow_pings_idle_connections(self, monotonic):
+        monotonic.return_value = 1000
+
+        with self.pool.borrow() as first_conn:
+            pass
+
+        monotonic.return_value = 1000 + tap_mysql.connection.POOL_HEALTH_CHECK_SECONDS
+        first_conn.ping.side_effect = tap_mysql.connection.pymysql.err.OperationalError(2013, 'Lost connection')
+
+        with self.pool.borrow() as second_conn:
+            pass
+
+        first_conn.ping.assert_called_once_with(reconnect=False)
+        first_conn.close.assert_called_once()
+        self.assertIsNot(first_conn, second_conn)
+
+    @patch('tap_mysql.connection.connect_with_backoff', side_effect=lambda connection: connection)
+    def test_pool_connections_keep_streaming_cursor_after_connection_wrapper(self, _connect_with_backoff):
+        config = {'user': 'user', 'password': 'password', 'host': 'localhost', 'port': 3306}
+        mysql_conn = MySQLConnection(config)
+
+        wrapper_conn = tap_mysql.connection.make_connection_wrapper(config)(cursorclass=DictCursor)
+        pool_conn = mysql_conn.pool.new_connection()
+
+        self.assertIs(DictCursor, wrapper_conn.cursorclass)
+        self.assertIs(SSCursor, pool_conn.cursorclass)
+        self.assertNotIn('cursorclass', config)
+
+    def test_tls_session_is_resumed(self):
+        ctx = MagicMock()
+        ctx.wrap_socket.return_value.session = 'session-1'
+
+        tls_context = tap_mysql.connection.TLSSessionReuseContext(ctx)
+        tls_context.wrap_socket('sock-1', server_hostname='db')
+        tls_context.wrap_socket('sock-2', server_hostname='db')
+
+        ctx.wrap_socket.assert_has_calls([
+            call('sock-1', session=None, server_hostname='db'),
+            call('sock-2', session='session-1', server_hostname='db'),
+        ])
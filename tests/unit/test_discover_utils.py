@@ -0,0 +1,117 @@
+import io
+import json
+import unittest
+
+from unittest.mock import patch, MagicMock
+
+from singer import Catalog, CatalogEntry, Schema
+
+from tap_mysql import discover_utils
+from tap_mysql.discover_utils import Column
+
+
+def get_cursor(table_rows, unique_index_rows, column_rows):
+    cur = MagicMock()
+    cur.fetchall.side_effect = [table_rows]
+    results = iter([unique_index_rows])
+
+    def execute(sql):
+        if 'information_schema.statistics' in sql:
+            cur.fetchall.side_effect = [next(results)]
+        elif 'information_schema.columns' in sql:
+            rows = [row for row in column_rows if f"table_schema = '{row[0]}'" in sql]
+            cur.fetchone.side_effect = rows + [None]
+
+    cur.execute.side_effect = execute
+
+    return cur
+
+
+class TestDiscoverUtils(unittest.TestCase):
+
+    def test_schema_for_column_is_memoized_per_column_type(self):
+        first = discover_utils.schema_for_column(Column('db', 'a', 'id', 'int', None, 10, 0, 'int(11)', 'PRI'))
+        second = discover_utils.schema_for_column(Column('db', 'b', 'id', 'INT', None, 10, 0, 'int(11)', 'PRI'))
+        other = discover_utils.schema_for_column(Column('db', 'b', 'code', 'int', None, 10, 0, 'int(11)', ''))
+
+        self.assertIs(first, second)
+        self.assertEqual('automatic', first.inclusion)
+        self.assertEqual('available', other.inclusion)
+        self.assertEqual(2 ** 31 - 1, first.maximum)
+
+    @patch('tap_mysql.discover_utils.borrow_connection')
+    def test_iter_catalog_entries_discovers_every_schema(self, borrow_connection):
+        table_cursor = MagicMock()
+        table_cursor.fetchall.return_value = [('db2', 'b', 'BASE TABLE', 1, 16384, 16384, 0, None),
+                                              ('db1', 'a', 'BASE TABLE', 2, 16384, 8192, 0, None)]
+        schema_cursors = {
+            db: get_cursor([], [], [(db, table, 'id', 'int', None, 10, 0, 'int(11)', 'PRI')])
+            for db, table in (('db1', 'a'), ('db2', 'b'))
+        }
+        cursors = iter([table_cursor, schema_cursors['db1'], schema_cursors['db2']])
+
+        def borrow(_):
+            conn = MagicMock()
+            conn.__enter__.return_value.cursor.return_value.__enter__.return_value = next(cursors)
+            return conn
+
+        borrow_connection.side_effect = borrow
+
+        entries = list(discover_utils.iter_catalog_entries(MagicMock(), 'db1,db2'))
+
+        self.assertListEqual(['db1-a', 'db2-b'], [entry.tap_stream_id for entry in entries])
+        self.assertListEqual(['id'], list(entries[1].schema.properties))
+
+    @patch('tap_mysql.discover_utils.borrow_connection')
+    @patch('tap_mysql.discover_utils.fetch_table_info')
+    @patch('tap_mysql.discover_utils.discover_tables')
+    def test_iter_catalog_entries_submits_schemas_as_they_are_yielded(self, discover_tables, fetch_table_info, _):
+        fetch_table_info.return_value = {db: {'a': {}} for db in ('db1', 'db2', 'db3', 'db4')}
+        discover_tables.side_effect = lambda cur, filter_clause, table_info: [
+            CatalogEntry(tap_stream_id=filter_clause.rsplit("'", 2)[1], table='a')]
+
+        entries = discover_utils.iter_catalog_entries(MagicMock(config={'discovery_parallelism': 2}))
+
+        self.assertEqual('db1', next(entries).tap_stream_id)
+        # the next two schemas, at most
+        self.assertLessEqual(discover_tables.call_count, 3)
+
+        self.assertListEqual(['db2', 'db3', 'db4'], [entry.tap_stream_id for entry in entries])
+        self.assertEqual(4, discover_tables.call_count)
+
+    @patch('tap_mysql.discover_utils.iter_catalog_entries', return_value=iter([]))
+    def test_discover_catalog_saves_cache_once(self, iter_catalog_entries):
+        cache = MagicMock()
+
+        discover_utils.discover_catalog(MagicMock(), 'db1', cache=cache)
+
+        iter_catalog_entries.assert_called_once()
+        cache.save.assert_called_once_with()
+
+    def test_fetch_table_fingerprints(self):
+        cur = MagicMock()
+        cur.fetchall.side_effect = [[('db', 'a', 2, 123), ('db', 'b', 1, 456)], [('db', 'a', 789)]]
+
+        self.assertDictEqual({('db', 'a'): '2-123-789', ('db', 'b'): '1-456-0'},
+                             discover_utils.fetch_table_fingerprints(cur, "WHERE table_schema IN ('db')"))
+
+        columns_sql, indexes_sql = (args[0] for args, _ in cur.execute.call_args_list)
+        self.assertIn('is_nullable', columns_sql)
+        self.assertIn('information_schema.statistics', indexes_sql)
+        self.assertIn('non_unique', indexes_sql)
+
+    def test_dump_catalog_entries(self):
+        entries = [CatalogEntry(tap_stream_id=f'db-{table}', stream=table, table=table,
+                                schema=Schema(type='object', properties={'id': Schema(type=['null', 'integer'])}),
+                                metadata=[{'breadcrumb': (), 'metadata': {'database-name': 'db'}}])
+                   for table in ('a', 'b')]
+        out = io.StringIO()
+
+        discover_utils.dump_catalog_entries(iter(entries), out)
+
+        self.assertDictEqual(json.loads(json.dumps(Catalog(entries).to_dict())), json.loads(out.getvalue()))
+
+        out = io.StringIO()
+        discover_utils.dump_catalog_entries([], out)
+
+        self.assertDictEqual({'streams': []}, json.loads(out.getvalue()))
@@ -0,0 +1,76 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from singer import metadata
+
+from helpers import get_catalog_entry
+from tap_mysql.discovery_cache import DiscoveryCache
+
+
+def get_table_info(create_time, row_count=10):
+    return {'row_count': row_count, 'data_length': 16384, 'avg_row_length': 1638, 'index_length': 0,
+            'is_view': False, 'create_time': create_time}
+
+
+class TestDiscoveryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'discovery_cache.json')
+        self.create_time = datetime.datetime(2026, 1, 1, 12, 0)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def populate_cache(self):
+        cache = DiscoveryCache(self.path)
+        table_info = {'db': {'a': get_table_info(self.create_time), 'b': get_table_info(self.create_time)}}
+        fingerprints = {('db', 'a'): '1-123', ('db', 'b'): '1-456'}
+
+        entries, changed = cache.lookup(table_info, fingerprints)
+
+        self.assertListEqual([], entries)
+        self.assertSetEqual({('db', 'a'), ('db', 'b')}, changed)
+
+        cache.update([get_catalog_entry('a', 'db'), get_catalog_entry('b', 'db')], table_info, fingerprints)
+        cache.save()
+
+    def test_unchanged_tables_are_served_from_the_cache(self):
+        self.populate_cache()
+
+        cache = DiscoveryCache(self.path)
+        entries, changed = cache.lookup({'db': {'a': get_table_info(self.create_time, row_count=20),
+                                                'b': get_table_info(self.create_time + datetime.timedelta(hours=1))},
+                                         'other_db': {'c': get_table_info(None)}},
+                                        {('db', 'a'): '1-123', ('db', 'b'): '1-456', ('other_db', 'c'): '2-789'})
+
+        self.assertListEqual(['a'], [entry.table for entry in entries])
+        self.assertSetEqual({('db', 'b'), ('other_db', 'c')}, changed)
+
+        # size metadata is refreshed, the schema is served from the cache
+        self.assertEqual(20, metadata.to_map(entries[0].metadata)[()]['row-count'])
+        self.assertEqual('automatic', entries[0].schema.properties['id'].inclusion)
+
+    def test_changed_columns_invalidate_the_cache(self):
+        self.populate_cache()
+
+        entries, changed = DiscoveryCache(self.path).lookup({'db': {'a': get_table_info(self.create_time)}},
+                                                            {('db', 'a'): '2-999'})
+
+        self.assertListEqual([], entries)
+        self.assertSetEqual({('db', 'a')}, changed)
+
+    def test_tables_are_changed_until_reported(self):
+        self.populate_cache()
+
+        cache = DiscoveryCache(self.path)
+        self.assertTrue(cache.is_changed(get_catalog_entry('a', 'db')))
+
+        cache.mark_reported([get_catalog_entry('a', 'db')])
+        cache.save()
+
+        cache = DiscoveryCache(self.path)
+        self.assertFalse(cache.is_changed(get_catalog_entry('a', 'db')))
+        self.assertTrue(cache.is_changed(get_catalog_entry('b', 'db')))
@@ -0,0 +1,59 @@
+import unittest
+
+from unittest.mock import patch, MagicMock
+
+from singer import Catalog
+
+from helpers import get_catalog_entry
+from tap_mysql import preflight
+from tap_mysql.discover_utils import generate_tables_filter_clause
+from tap_mysql.sync_strategies import full_table
+
+
+class TestPreflight(unittest.TestCase):
+
+    def tearDown(self):
+        preflight._TABLE_METADATA.clear()
+
+    def test_generate_tables_filter_clause_groups_tables_per_schema(self):
+        self.assertEqual("WHERE ((t.table_schema = 'db1' AND t.table_name IN ('a','b')) OR "
+                         "(t.table_schema = 'db2' AND t.table_name IN ('it\\'s')))",
+                         generate_tables_filter_clause([('db2', "it's"), ('db1', 'b'), ('db1', 'a')], 't.'))
+
+    @patch('tap_mysql.preflight.borrow_connection')
+    def test_run_preflight_caches_metadata_of_selected_tables(self, borrow_connection):
+        cur = borrow_connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+        cur.fetchall.side_effect = [
+            [('db1', 'a', 'InnoDB', 10, 16384, 1638),
+             ('db1', 'b', 'InnoDB', 5, 16384, 3276)],
+            [('db1', 'b', 'uniq_code', 'code', '')],
+        ]
+
+        preflight.run_preflight(MagicMock(), Catalog([get_catalog_entry('a', 'db1', selected=True),
+                                                     get_catalog_entry('b', 'db1', selected=True),
+                                                     get_catalog_entry('c', 'db1', selected=False)]))
+
+        tables_sql = cur.execute.call_args_list[0][0][0]
+        self.assertIn("(t.table_schema = 'db1' AND t.table_name IN ('a','b'))", tables_sql)
+        self.assertEqual(2, cur.execute.call_count)
+
+        table_a = preflight.get_table_metadata(get_catalog_entry('a', 'db1'))
+        self.assertEqual(('InnoDB', 1638, None),
+                         (table_a.engine, table_a.avg_row_length, table_a.unique_index_columns))
+
+        # tables without a primary key are extracted in the order of their unique index
+        self.assertListEqual(['code'], full_table.get_keyset_columns(get_catalog_entry('b', 'db1')))
+        self.assertIsNone(preflight.get_table_metadata(get_catalog_entry('c', 'db1')))
+
+        # the average row length of the preflight isn't queried again
+        cur.reset_mock()
+        self.assertEqual(1638, preflight.get_avg_row_length(cur, get_catalog_entry('a', 'db1')))
+        cur.execute.assert_not_called()
+
+    @patch('tap_mysql.sync_strategies.common.fetch_avg_row_length', return_value=None)
+    def test_get_avg_row_length_queries_tables_missing_from_preflight(self, fetch_avg_row_length):
+        cur = MagicMock()
+
+        self.assertIsNone(preflight.get_avg_row_length(cur, get_catalog_entry('a', 'db1')))
+
+        fetch_avg_row_length.assert_called_once_with(cur, get_catalog_entry('a', 'db1'))
@@ -0,0 +1,52 @@
+import unittest
+
+from singer import Catalog
+
+from helpers import get_catalog_entry
+from tap_mysql import scheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_get_table_size(self):
+        self.assertEqual(100, scheduler.get_table_size(get_catalog_entry('a', **{'data-length': 100})))
+        self.assertEqual(60, scheduler.get_table_size(get_catalog_entry('a', **{'row-count': 3,
+                                                                                'avg-row-length': 20})))
+        self.assertIsNone(scheduler.get_table_size(get_catalog_entry('a')))
+
+    def test_record_sync_stats(self):
+        state = {}
+
+        scheduler.record_sync_stats(state, get_catalog_entry('a', None, **{'data-length': 1000}), 4)
+        scheduler.record_sync_stats(state, get_catalog_entry('b', None), 2)
+
+        self.assertDictEqual(state['bookmarks'], {
+            'a': {'sync_stats': {'seconds': 4, 'bytes_per_second': 250}},
+            'b': {'sync_stats': {'seconds': 2, 'bytes_per_second': None}},
+        })
+
+    def test_estimate_sync_seconds(self):
+        state = {'bookmarks': {
+            'full': {'sync_stats': {'seconds': 10, 'bytes_per_second': 100}},
+            'incremental': {'sync_stats': {'seconds': 3, 'bytes_per_second': 100}},
+        }}
+
+        self.assertEqual(20, scheduler.estimate_sync_seconds(get_catalog_entry('full', None), state, 2000))
+        self.assertEqual(3, scheduler.estimate_sync_seconds(get_catalog_entry('incremental', None,
+                                                                              **{'replication-method': 'INCREMENTAL'}),
+                                                            state,
+                                                            2000))
+        self.assertEqual(2, scheduler.estimate_sync_seconds(get_catalog_entry('new', None),
+                                                            state,
+                                                            2 * scheduler.DEFAULT_BYTES_PER_SECOND))
+
+    def test_order_longest_first(self):
+        streams = [get_catalog_entry(table, None) for table in ('small', 'interrupted', 'large', 'medium')]
+        discovered = Catalog([get_catalog_entry('small', None, **{'data-length': 10}),
+                              get_catalog_entry('interrupted', None, **{'data-length': 1}),
+                              get_catalog_entry('large', None, **{'data-length': 1000}),
+                              get_catalog_entry('medium', None, **{'data-length': 100})])
+
+        ordered_streams = scheduler.order_longest_first(streams, discovered, {}, ['interrupted'])
+
+        self.assertListEqual([s.tap_stream_id for s in ordered_streams], ['interrupted', 'large', 'medium', 'small'])
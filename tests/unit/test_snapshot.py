@@ -0,0 +1,90 @@
+import unittest
+
+from unittest.mock import patch, MagicMock
+
+from tap_mysql.snapshot import ConsistentSnapshot
+
+
+class TestConsistentSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.executed_sqls = []
+
+        def new_connection(*args):
+            conn = MagicMock()
+            conn.cursor.return_value.__enter__.return_value.execute.side_effect = \
+                lambda sql: self.executed_sqls.append((conn, sql))
+
+            return conn
+
+        self.new_connection = new_connection
+
+    @patch('tap_mysql.snapshot.binlog.fetch_current_gtid_pos', return_value='0-1-100')
+    @patch('tap_mysql.snapshot.binlog.fetch_current_log_file_and_pos', return_value=('binlog.000002', 42))
+    @patch('tap_mysql.snapshot.clone_connection')
+    @patch('tap_mysql.snapshot.connect_with_backoff')
+    def test_open_snapshot_on_every_connection_while_locked(self, connect_with_backoff, *args):
+        connect_with_backoff.side_effect = self.new_connection
+
+        snapshot = ConsistentSnapshot(MagicMock(), 2, use_gtid=True).open()
+
+        self.assertEqual(('binlog.000002', 42, '0-1-100'), (snapshot.log_file, snapshot.log_pos, snapshot.gtid))
+
+        lock_conn = self.executed_sqls[0][0]
+        self.assertListEqual([sql for _, sql in self.executed_sqls], [
+            'FLUSH TABLES WITH READ LOCK',
+            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ',
+            'START TRANSACTION WITH CONSISTENT SNAPSHOT',
+            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ',
+            'START TRANSACTION WITH CONSISTENT SNAPSHOT',
+            'UNLOCK TABLES',
+        ])
+        self.assertIs(lock_conn, self.executed_sqls[-1][0])
+        lock_conn.close.assert_called_once()
+
+        with snapshot.borrow() as first_conn, snapshot.borrow() as second_conn:
+            self.assertIsNot(first_conn, second_conn)
+            self.assertNotIn(lock_conn, (first_conn, second_conn))
+
+            # closed by a borrower that left its read unfinished
+            second_conn.open = False
+
+        snapshot.close()
+
+        first_conn.close.assert_called_once()
+        second_conn.close.assert_not_called()
+
+    @patch('tap_mysql.snapshot.binlog.fetch_current_log_file_and_pos', return_value=('binlog.000002', 42))
+    @patch('tap_mysql.snapshot.clone_connection')
+    @patch('tap_mysql.snapshot.connect_with_backoff')
+    def test_borrow_fails_once_snapshot_connection_is_closed(self, connect_with_backoff, *args):
+        connect_with_backoff.side_effect = self.new_connection
+
+        snapshot = ConsistentSnapshot(MagicMock(), 1).open()
+
+        with snapshot.borrow() as snapshot_conn:
+            snapshot_conn.open = False
+
+        # waiting for the closed connection would block forever
+        with self.assertRaisesRegex(Exception, 'was closed'):
+            with snapshot.borrow():
+                pass
+
+        snapshot.close()
+
+        snapshot_conn.close.assert_not_called()
+
+    @patch('tap_mysql.snapshot.binlog.fetch_current_log_file_and_pos', side_effect=Exception('binlog disabled'))
+    @patch('tap_mysql.snapshot.clone_connection')
+    @patch('tap_mysql.snapshot.connect_with_backoff')
+    def test_open_snapshot_unlocks_and_closes_connections_on_failure(self, connect_with_backoff, *args):
+        connections = []
+        connect_with_backoff.side_effect = lambda *args: connections.append(self.new_connection()) or connections[-1]
+
+        with self.assertRaises(Exception):
+            ConsistentSnapshot(MagicMock(), 1).open()
+
+        self.assertEqual('UNLOCK TABLES', self.executed_sqls[-1][1])
+
+        for conn in connections:
+            conn.close.assert_called_once()